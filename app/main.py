@@ -1,53 +1,135 @@
+import asyncio
+from contextlib import asynccontextmanager
+import os
 from pathlib import Path
-from dotenv import load_dotenv
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
 
-from .routers.camera import router as camera_router
-from .routers.stats import router as stats_router
-from .routers.stepper import router as stepper_router
-from .routers.webrtc import router as webrtc_router
-from .routers.valve import router as valve_router
+from .services.startup import load_env, profile as startup, warmup_enabled
 
-# Load environment variables from .env file
-project_root = Path(__file__).parent.parent
-load_dotenv(project_root / ".env")
+# Load environment variables from .env file before the routers read their config
+load_env()
+
+with startup.phase("import.routers"):
+    from .routers.camera import camera_ids, get_camera, router as camera_router
+    from .routers.hls import router as hls_router, stop_streams
+    from .routers.stats import router as stats_router, sampler
+    from .routers import stepper
+    from .routers.stepper import get_controller, router as stepper_router
+    from .routers.motion import router as motion_router
+    from .routers.timelapse import recording_cameras, router as timelapse_router, start_recording, stop_recording
+    from .routers.webrtc import close_ingress, router as webrtc_router
+    from .routers.valve import open_port as open_valve_port, router as valve_router
+    from .services.executors import run_in
+    from .services.governor import governor
+    from .services.log import get_logger
+    from .services.metrics import TimingMiddleware
+    from .services import motion
+    from .services.static_assets import StaticAssetServer
+
+log = get_logger("api")
+
+
+async def _warmup() -> None:
+    """Create the hardware controllers in parallel, off the request path."""
+    async def init(name: str, pool: str, fn, *args) -> None:
+        try:
+            with startup.phase(f"warmup.{name}", background=True):
+                await run_in(pool, fn, *args)
+        except Exception as e:
+            log.warning("Warm-up of %s failed (will retry on first use): %s", name, e)
+
+    await asyncio.gather(
+        *(init(f"camera.{cid}", "camera", get_camera, cid) for cid in camera_ids()),
+        init("stepper", "motion", get_controller),
+        init("motion", "motion", motion.get_motion),
+        init("valve", "serial", open_valve_port),
+    )
+
+
+async def _start_timelapse() -> None:
+    for camera_id in recording_cameras():
+        try:
+            await run_in("camera", start_recording, camera_id)
+        except Exception as e:
+            log.error("Time-lapse recording of %s not started: %s", camera_id, e)
+
+
+def _motion_active() -> bool:
+    # Never create the controller just to ask; no controller means no motion.
+    controller = stepper._controller
+    axes = motion._motion
+    return (controller is not None and controller.moving) or (axes is not None and axes.moving)
+
+
+def _start_governor() -> None:
+    """Feed CPU temperature/load samples to the governor (GOVERNOR_ENABLED=0 disables it)."""
+    if os.getenv("GOVERNOR_ENABLED", "1") not in ("0", "false", "False"):
+        governor.motion_active = _motion_active
+        governor.write_state()
+        sampler.subscribe(governor.update)
+    sampler.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The API accepts requests right away; camera probing and GPIO setup
+    # continue in the background (HARDWARE_WARMUP=0 defers them to first use).
+    task = asyncio.create_task(_warmup()) if warmup_enabled() else None
+    _start_governor()
+    timelapse = asyncio.create_task(_start_timelapse())
+    startup.mark_ready()
+    yield
+    sampler.stop()
+    if not timelapse.done():
+        timelapse.cancel()
+    await run_in("archive", stop_recording)
+    stop_streams()
+    await close_ingress()
+    if task is not None and not task.done():
+        task.cancel()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="UU Plastination Secure API", docs_url=None, redoc_url=None)
+    app = FastAPI(title="UU Plastination Secure API", docs_url=None, redoc_url=None, lifespan=lifespan)
+    # Per-route latency histograms and in-flight counts (GET /api/metrics/routes)
+    app.add_middleware(TimingMiddleware)
     
     # Mount routers
     app.include_router(stats_router)
     app.include_router(stepper_router)
+    app.include_router(motion_router)
     app.include_router(camera_router)
+    app.include_router(timelapse_router)
+    app.include_router(hls_router)
     app.include_router(webrtc_router)
     app.include_router(valve_router)
     
     # Get the project root directory (parent of app/)
     project_root = Path(__file__).parent.parent
     
-    # Mount static files (assets)
-    assets_path = project_root / "assets"
-    if assets_path.exists():
-        app.mount("/assets", StaticFiles(directory=str(assets_path)), name="assets")
+    # Dashboard: fingerprinted, precompressed build (python -m app.services.static_assets)
+    # when present, else the source tree; cached in memory with ETag/304 handling
+    static = StaticAssetServer(src_root=project_root)
+    app.state.static_assets = static
+    
+    @app.get("/assets/{path:path}", include_in_schema=False)
+    async def serve_asset(path: str, request: Request):
+        return static.asset(path, request)
     
     # Serve index.html at root
     @app.get("/")
-    def serve_index():
-        index_path = project_root / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        return {"message": "Dashboard not found"}
+    async def serve_index(request: Request):
+        return static.index(request)
     
     # Placeholder logout endpoint
     @app.get("/logout")
-    def logout():
+    async def logout():
         return {"message": "Logout endpoint - implement authentication as needed"}
     
     return app
 
 
-app = create_app()
+with startup.phase("create_app"):
+    app = create_app()
+startup.mark_imported()
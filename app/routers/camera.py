@@ -1,50 +1,193 @@
 from __future__ import annotations
 
+import asyncio
 import glob
+import importlib.util
 import io
 import os
 import threading
 import time
-from typing import Optional
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
-from fastapi import APIRouter, Response
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pathlib import Path
-import json
 
 
 router = APIRouter(prefix="/camera", tags=["camera"])
 
 
 # --- Camera abstraction for Raspberry Pi Camera ---
-try:
-    from picamera2 import Picamera2  # type: ignore
-    from picamera2.encoders import JpegEncoder, MJPEGEncoder  # type: ignore
-    from picamera2.outputs import FileOutput  # type: ignore
-    PICAMERA_AVAILABLE = True
-except ImportError:
-    PICAMERA_AVAILABLE = False
-    Picamera2 = None  # type: ignore
-
+# picamera2 and OpenCV take a large share of API start-up time, so they are
+# imported on first camera use (_load_backends). Until then the flags only
+# say whether the packages are installed.
+Picamera2 = None  # type: ignore
+JpegEncoder = MJPEGEncoder = FileOutput = None  # type: ignore
+cv2 = None  # type: ignore
+PICAMERA_AVAILABLE = importlib.util.find_spec("picamera2") is not None
 # Optional OpenCV fallback for non-Pi or when picamera2 is unavailable
-try:  # pragma: no cover
-    import cv2  # type: ignore
-    CV2_AVAILABLE = True
-except Exception:  # pragma: no cover
-    CV2_AVAILABLE = False
+CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
+_backends_loaded = False
+_backends_lock = threading.Lock()
+
+
+def _load_backends() -> None:
+    global Picamera2, JpegEncoder, MJPEGEncoder, FileOutput, cv2
+    global PICAMERA_AVAILABLE, CV2_AVAILABLE, _backends_loaded
+    if _backends_loaded:
+        return
+    with _backends_lock:
+        if _backends_loaded:
+            return
+        if PICAMERA_AVAILABLE:
+            with startup.phase("import.picamera2"):
+                try:
+                    from picamera2 import Picamera2  # type: ignore
+                    from picamera2.encoders import JpegEncoder, MJPEGEncoder  # type: ignore
+                    from picamera2.outputs import FileOutput  # type: ignore
+                except ImportError:
+                    PICAMERA_AVAILABLE = False
+        if CV2_AVAILABLE:
+            with startup.phase("import.cv2"):
+                try:  # pragma: no cover
+                    import cv2  # type: ignore
+                except Exception:  # pragma: no cover
+                    CV2_AVAILABLE = False
+        _backends_loaded = True
+
+from ..services.framebus import FORMAT_JPEG, FrameBusReader
+from ..services import clips
+from ..services.derived import Crop, cache as derived_cache, derive, parse_crop
+from ..services.executors import ExecutorSaturated, get_executor, run_in
+from ..services.health import HealthReader
+from ..services.governor import Level, governor
+from ..services.log import get_logger
+from ..services.startup import profile as startup
+from ..services.streaming import CAMERA_STREAM_RETRY_AFTER_S, DeadlineStreamingResponse, StreamClient, streams
+
+log = get_logger("camera")
+
+
+def _wake_all(futures: List["asyncio.Future[None]"]) -> None:
+    for fut in futures:
+        if not fut.done():
+            fut.set_result(None)
 
 
 class StreamingOutput(io.BufferedIOBase):
-    """Thread-safe output class for MJPEG streaming."""
+    """Thread-safe output class for MJPEG streaming.
+
+    Threads wait on ``condition``; coroutines (one per MJPEG viewer) wait on
+    a future that ``write`` resolves through their loop's
+    ``call_soon_threadsafe``, so a viewer holds no thread while it waits.
+    """
     
     def __init__(self):
         self.frame = None
+        self.timestamp = 0.0  # capture time (time.time() clock) of the current frame
+        self.seq = 0  # frames published so far; lets readers see how many they skipped
         self.condition = threading.Condition()
+        # Event-loop waiters, woken with one call_soon_threadsafe per loop per frame
+        self._waiters: Dict[asyncio.AbstractEventLoop, List["asyncio.Future[None]"]] = {}
+        # Cheap, non-blocking frame hooks fn(jpeg, timestamp), e.g. the time-lapse recorder
+        self.taps: List[Callable[[bytes, float], None]] = []
 
-    def write(self, buf):
+    def write(self, buf, ts: Optional[float] = None):
+        """Publish a frame; ``ts`` is its capture time (default: now)."""
         with self.condition:
             self.frame = buf
+            self.timestamp = ts = ts if ts is not None else time.time()
+            self.seq += 1
             self.condition.notify_all()
+            waiters, self._waiters = self._waiters, {}
+        for loop, futures in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake_all, futures)
+            except RuntimeError:  # loop closed
+                pass
+        for tap in self.taps:
+            try:
+                tap(buf, ts)
+            except Exception as e:
+                log.error("frame tap failed: %s", e)
+
+
+JPEG_QUALITY = 85
+
+
+class EncodeBusy(RuntimeError):
+    """The shared encoder pool is saturated; the frame should be dropped."""
+
+
+def encode_jpeg(frame, quality: int = JPEG_QUALITY, scale: float = 1.0) -> Tuple[Optional[bytes], float]:
+    """JPEG-encode ``frame`` on the ``encode`` pool shared by every camera.
+
+    Returns (jpeg or None, seconds spent encoding). The pool's fixed worker
+    count bounds total encode CPU no matter how many cameras are streaming.
+    ``scale`` < 1 downsizes the frame first (the governor's resolution tier).
+    """
+    def work():
+        t0 = time.perf_counter()
+        img = frame
+        if scale < 1.0:
+            img = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return (buf.tobytes() if ok else None), time.perf_counter() - t0
+
+    try:
+        return get_executor("encode").submit(work).result()
+    except ExecutorSaturated as e:
+        raise EncodeBusy(str(e))
+
+
+class FramePacer:
+    """Paces a camera's capture loop to its frame-rate cap and CPU budget.
+
+    ``cpu_budget`` is the share of one core the camera may use (0.5 = half a
+    core). After each frame the loop reports the CPU time it spent (capture
+    + encode); the pacer stretches the frame period so busy/period stays
+    within budget, so a 1080p camera can't starve a second one or the motor
+    loop.
+    """
+
+    def __init__(self, max_fps: float, cpu_budget: Optional[float] = None):
+        self.max_fps = max(0.1, float(max_fps))
+        self.cpu_budget = cpu_budget if cpu_budget and cpu_budget > 0 else None
+        self._next = time.monotonic()
+        self.frames = 0
+        self.budget_limited = 0
+        self.dropped = 0
+        self.busy_ms = 0.0  # EWMA of CPU ms per frame
+        self.fps = 0.0  # EWMA of achieved frame rate
+        self._last = None
+
+    def frame_done(self, busy_s: float) -> None:
+        """Record a frame that cost ``busy_s`` CPU seconds and sleep until the next slot."""
+        now = time.monotonic()
+        period = 1.0 / self.max_fps
+        if self.cpu_budget is not None and busy_s / self.cpu_budget > period:
+            period = busy_s / self.cpu_budget
+            self.budget_limited += 1
+        self.frames += 1
+        self.busy_ms += 0.1 * (busy_s * 1000.0 - self.busy_ms)
+        if self._last is not None and now > self._last:
+            self.fps += 0.1 * (1.0 / (now - self._last) - self.fps)
+        self._last = now
+        self._next = max(self._next + period, now)  # never bank time after a stall
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def status(self) -> dict:
+        return {
+            "max_fps": self.max_fps,
+            "cpu_budget": self.cpu_budget,
+            "fps": round(self.fps, 2),
+            "cpu_ms_per_frame": round(self.busy_ms, 2),
+            "cpu_share": round(self.busy_ms * self.fps / 1000.0, 3),
+            "frames": self.frames,
+            "budget_limited": self.budget_limited,
+            "encode_dropped": self.dropped,
+        }
 
 
 class CameraController:
@@ -56,7 +199,17 @@ class CameraController:
         resolution: tuple = (1920, 1080),
         framerate: int = 30,
         use_mjpeg: bool = True,
+        framebus: Optional[str] = None,
+        device: Optional[str] = None,
+        camera_id: str = "main",
+        max_fps: Optional[float] = None,
+        cpu_budget: Optional[float] = None,
+        probe_all: bool = True,
+        change_detect: bool = False,
+        low_latency: bool = False,
+        fourcc: Optional[str] = None,
     ):
+        self.camera_id = camera_id
         self.camera_num = camera_num
         self.resolution = resolution
         self.framerate = framerate
@@ -64,48 +217,106 @@ class CameraController:
         self.picam2: Optional[Picamera2] = None
         self.output: Optional[StreamingOutput] = None
         self.cap = None  # OpenCV VideoCapture
+        self.synthetic = False
+        self.framebus = framebus  # shared-memory ring name fed by the capture daemon
+        self.bus: Optional[FrameBusReader] = None
+        # OpenCV device path, or a synthetic source spec such as "synthetic:bars"
+        self.device = device or os.getenv("CAMERA_DEVICE", "/dev/video0")
         self._cv_thread: Optional[threading.Thread] = None
         self.is_running = False
         self._lock = threading.Lock()
+        # Only the primary camera may fall back to "any /dev/video*"; a second
+        # camera must not grab the first one's device.
+        self.probe_all = probe_all
+        self.pacer = FramePacer(min(framerate, max_fps or framerate), cpu_budget)
+        # Limits set by the thermal/load governor (see apply_limits)
+        self.base_max_fps = self.pacer.max_fps
+        self.quality = JPEG_QUALITY
+        self.scale = 1.0
+        # Static-scene frame skipping: only changed frames and keepalives are encoded
+        self.detector = None
+        if change_detect:
+            from ..services.changedetect import ChangeDetector  # imports NumPy
+
+            self.detector = ChangeDetector()
+        self.clients = 0  # connected MJPEG streams, for the bandwidth-saved estimate
+        # OpenCV/V4L2 low-latency capture: one driver buffer (or draining stale ones)
+        # and a native pixel format; see _open_cap and _read_latest
+        self.low_latency = low_latency
+        self.fourcc = fourcc
+        self.drain_stale = False
+        self.stale_drained = 0
+        # What the driver actually granted, read once in _open_cap: VideoCapture
+        # is not thread-safe, so status requests never query it.
+        self.cap_fourcc: Optional[str] = None
+        self.cap_buffer_size: Optional[int] = None
+        self.capture_age_ms = 0.0  # EWMA of capture -> publish
+        self.clip_buffer: Optional[clips.ClipBuffer] = None  # recent frames, frozen on incidents
         
         try:
             self._initialize_camera()
         except Exception as e:
-            print(f"ERROR: Failed to initialize camera: {e}")
+            log.error("Failed to initialize camera: %s", e)
 
     def _initialize_camera(self):
         """Initialize the Raspberry Pi camera."""
         # Initialize picamera2 if available; else prepare OpenCV
         self.output = StreamingOutput()
+        _load_backends()
+        from ..services.synthetic import SyntheticCapture, is_synthetic  # imports OpenCV
+
+        if self.framebus:
+            # The capture daemon owns the sensor and may start after us; attach in start().
+            log.info("Camera frames will be read from frame bus '%s'", self.framebus)
+            return
+        if is_synthetic(self.device):
+            self.synthetic = True
+            self.cap = SyntheticCapture(self.device, self.resolution[0], self.resolution[1], self.framerate)
+            log.info("Synthetic camera ready (%s): %dx%d @ %dfps", self.device, self.resolution[0], self.resolution[1], self.framerate)
+            return
         if PICAMERA_AVAILABLE:
             try:
                 self.picam2 = Picamera2(self.camera_num)
-                # Use simpler config that works with rpicam
+                # Use simpler config that works with rpicam; the hardware encoder
+                # runs at the camera's frame-rate cap
                 video_config = self.picam2.create_video_configuration(
-                    main={"size": self.resolution}
+                    main={"size": self.resolution},
+                    controls={"FrameRate": self.pacer.max_fps},
                 )
                 self.picam2.configure(video_config)
-                print(f"PiCamera {self.camera_num} ready: {self.resolution[0]}x{self.resolution[1]} @ {self.framerate}fps")
+                log.info("PiCamera %s ready: %dx%d @ %dfps", self.camera_num, self.resolution[0], self.resolution[1], self.framerate)
             except Exception as e:
                 self.picam2 = None
-                print(f"picamera2 init failed: {e}")
-                import traceback
-                traceback.print_exc()
+                log.exception("picamera2 init failed: %s", e)
                 if not CV2_AVAILABLE:
                     raise
         if self.picam2 is None and CV2_AVAILABLE:
             # OpenCV device; allow override via env CAMERA_DEVICE or try first available /dev/video*
-            candidates = [os.getenv("CAMERA_DEVICE", "/dev/video0")]
-            candidates += sorted(glob.glob("/dev/video*"))
+            candidates = [self.device]
+            if self.probe_all:
+                candidates += sorted(glob.glob("/dev/video*"))
 
             def _open_cap(dev_path):
-                cap = cv2.VideoCapture(dev_path)
+                v4l2 = self.low_latency and isinstance(dev_path, str) and dev_path.startswith("/dev/video")
+                cap = cv2.VideoCapture(dev_path, cv2.CAP_V4L2) if v4l2 else cv2.VideoCapture(dev_path)
                 if not cap.isOpened():
                     cap.release()
                     return None
+                if self.fourcc:
+                    # Before the size: V4L2 negotiates the mode per pixel format
+                    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
                 cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
                 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
                 cap.set(cv2.CAP_PROP_FPS, self.framerate)
+                if self.low_latency:
+                    # Default V4L2 queues hold several frames; read() would return the oldest.
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                    self.drain_stale = cap.get(cv2.CAP_PROP_BUFFERSIZE) != 1
+                    if self.drain_stale:
+                        log.info("Driver on %s ignores the buffer count; draining stale frames instead", dev_path)
+                fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+                self.cap_fourcc = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or None
+                self.cap_buffer_size = int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
                 return cap
 
             for dev in candidates:
@@ -113,57 +324,198 @@ class CameraController:
                     cap = _open_cap(dev)
                     if cap:
                         self.cap = cap
-                        print(f"OpenCV camera ready on {dev}: {self.resolution[0]}x{self.resolution[1]} @ {self.framerate}fps")
+                        log.info("OpenCV camera ready on %s: %dx%d @ %dfps", dev, self.resolution[0], self.resolution[1], self.framerate)
                         break
                     else:
-                        print(f"OpenCV camera probe failed on {dev}")
+                        log.info("OpenCV camera probe failed on %s", dev)
                 except Exception as e:
-                    print(f"OpenCV camera error on {dev}: {e}")
+                    log.warning("OpenCV camera error on %s: %s", dev, e)
                     continue
 
             if self.cap is None:
                 raise RuntimeError("No usable /dev/video* device found for OpenCV")
 
+    def _read_latest(self) -> Tuple[bool, object, float]:
+        """Read the newest frame from the OpenCV capture as (ok, frame, capture time).
+
+        When the driver kept its default buffer queue, frames already queued
+        are returned by ``grab()`` at once while a fresh one makes it wait for
+        the sensor, so quick grabs are dropped until one blocks (at most a few).
+        """
+        cap = self.cap
+        if self.synthetic or not self.low_latency:
+            ok, frame = cap.read()
+            return ok, frame, time.time()
+        grabs = 0
+        fresh_s = 0.25 / max(1.0, float(self.framerate))
+        while True:
+            t0 = time.monotonic()
+            if not cap.grab():
+                return False, None, 0.0
+            grabs += 1
+            if not self.drain_stale or time.monotonic() - t0 >= fresh_s or grabs >= 4:
+                break
+        self.stale_drained += grabs - 1
+        captured = time.time()
+        # V4L2 buffer timestamps are CLOCK_MONOTONIC (ms); map them onto the wall clock.
+        driver_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if driver_ms > 0:
+            age = time.monotonic() - driver_ms / 1000.0
+            if 0.0 <= age < 2.0:
+                captured -= age
+        ok, frame = cap.retrieve()
+        return ok, frame, captured
+
+    def _capture_status(self) -> Optional[dict]:
+        if self.cap is None or self.synthetic:
+            return None
+        return {
+            "low_latency": self.low_latency,
+            "fourcc": self.cap_fourcc,
+            "buffer_size": self.cap_buffer_size,
+            "drain_stale": self.drain_stale,
+            "stale_drained": self.stale_drained,
+            "capture_age_ms": round(self.capture_age_ms, 1),
+        }
+
     def start(self):
         """Start the camera streaming."""
         with self._lock:
             if self.is_running:
                 return
             try:
-                if self.picam2 is not None:
+                if self.framebus:
+                    self._start_framebus()
+                elif self.picam2 is not None:
                     encoder = MJPEGEncoder() if self.use_mjpeg else JpegEncoder()
                     self.picam2.start_recording(encoder, FileOutput(self.output))
                     self.is_running = True
-                    print(f"Camera streaming started (picamera2) on {self.camera_num}")
+                    log.info("Camera streaming started (picamera2) on %s", self.camera_num)
                 elif self.cap is not None and CV2_AVAILABLE:
                     # Start a background thread to capture frames and encode to JPEG
                     self.is_running = True
+                    pacer = self.pacer
+                    detector = self.detector
+
                     def _cv_loop():
                         try:
-                            interval = 1.0 / max(1, self.framerate)
                             while self.is_running:
-                                ok, frame = self.cap.read()
+                                cpu0 = time.thread_time()
+                                ok, frame, captured = self._read_latest()
                                 if not ok:
                                     time.sleep(0.05)
                                     continue
+                                if detector is not None and detector.check(frame) is None:
+                                    detector.skip(self.clients)
+                                    pacer.frame_done(time.thread_time() - cpu0)
+                                    continue
                                 # Ensure BGR->JPEG encode
-                                ok2, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-                                if ok2:
-                                    with self.output.condition:
-                                        self.output.frame = buf.tobytes()
-                                        self.output.condition.notify_all()
-                                time.sleep(interval)
+                                try:
+                                    jpeg, encode_s = encode_jpeg(frame, self.quality, self.scale)
+                                except EncodeBusy:
+                                    pacer.dropped += 1
+                                    jpeg, encode_s = None, 0.0
+                                if jpeg:
+                                    self.capture_age_ms += 0.1 * ((time.time() - captured) * 1000.0 - self.capture_age_ms)
+                                    self.output.write(jpeg, captured)
+                                    if detector is not None:
+                                        detector.sent(encode_s, len(jpeg))
+                                pacer.frame_done(time.thread_time() - cpu0 + encode_s)
                         except Exception as e:
-                            print(f"OpenCV capture error: {e}")
-                    self._cv_thread = threading.Thread(target=_cv_loop, daemon=True)
+                            log.error("OpenCV capture error on camera %s: %s", self.camera_id, e)
+                    self._cv_thread = threading.Thread(target=_cv_loop, name=f"camera-{self.camera_id}", daemon=True)
                     self._cv_thread.start()
-                    print("Camera streaming started (OpenCV)")
+                    log.info("Camera %s streaming started (OpenCV)", self.camera_id)
                 else:
                     raise RuntimeError("No camera backend available (picamera2 or OpenCV)")
             except Exception as e:
-                print(f"Failed to start camera: {e}")
+                log.error("Failed to start camera: %s", e)
                 raise
 
+    def _start_framebus(self):
+        """Relay frames from the shared-memory ring into the streaming output."""
+        try:
+            self.bus = FrameBusReader(self.framebus)
+        except FileNotFoundError:
+            raise RuntimeError(f"frame bus '{self.framebus}' not found; is the capture daemon running?")
+        bus = self.bus
+        if bus.fmt != FORMAT_JPEG and not CV2_AVAILABLE:
+            self.bus = None
+            bus.close()
+            raise RuntimeError(f"frame bus '{self.framebus}' carries raw frames; OpenCV is required to encode them")
+        pacer = self.pacer
+        detector = self.detector
+        self.is_running = True
+
+        def _bus_loop():
+            last = 0
+            try:
+                while self.is_running:
+                    if bus.fmt == FORMAT_JPEG:
+                        # One copy per frame, shared by every client.
+                        frame = bus.wait(last, timeout=1.0)
+                        if frame is None:
+                            continue
+                        last = frame.seq
+                        self.output.write(frame.data, frame.ts)
+                        pacer.frame_done(0.0)  # frame-rate cap only; the daemon encoded it
+                        continue
+                    if bus.latest_seq() <= last:
+                        time.sleep(0.002)
+                        continue
+                    got = bus.view()
+                    if got is None:  # slot being written or torn; let the writer finish
+                        time.sleep(0.002)
+                        continue
+                    seq, captured, payload = got
+                    import numpy as np
+                    img = np.frombuffer(payload, dtype=np.uint8).reshape(bus.height, bus.width, 3)
+                    if detector is not None and detector.check(img) is None:
+                        detector.skip(self.clients)
+                        del img
+                        payload.release()
+                        last = seq
+                        pacer.frame_done(0.0)
+                        continue
+                    try:
+                        jpeg, encode_s = encode_jpeg(img, self.quality, self.scale)
+                    except EncodeBusy:
+                        pacer.dropped += 1
+                        jpeg, encode_s = None, 0.0
+                    del img
+                    payload.release()
+                    last = seq
+                    if jpeg and bus.valid(seq):
+                        self.output.write(jpeg, captured)
+                        if detector is not None:
+                            detector.sent(encode_s, len(jpeg))
+                    pacer.frame_done(encode_s)
+            except Exception as e:
+                log.error("Frame bus relay error on camera %s: %s", self.camera_id, e)
+
+        self._cv_thread = threading.Thread(target=_bus_loop, name=f"camera-{self.camera_id}", daemon=True)
+        self._cv_thread.start()
+        log.info("Camera streaming started (frame bus '%s')", self.framebus)
+
+    def apply_limits(self, fps_factor: float, quality: int, scale: float) -> None:
+        """Throttle this camera: frame-rate cap, JPEG quality and resolution scale.
+
+        The OpenCV and raw frame-bus paths honour all three; picamera2's
+        hardware encoder and pre-encoded frame-bus frames only the frame rate.
+        """
+        self.pacer.max_fps = max(0.1, self.base_max_fps * fps_factor)
+        self.quality = int(quality)
+        self.scale = float(scale)
+        if self.picam2 is not None and self.is_running:
+            try:
+                self.picam2.set_controls({"FrameRate": self.pacer.max_fps})
+            except Exception as e:
+                log.warning("Cannot change frame rate of camera %s: %s", self.camera_id, e)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.framebus) or (self.picam2 is not None) or (self.cap is not None)
+
     def stop(self):
         """Stop the camera streaming."""
         with self._lock:
@@ -181,10 +533,16 @@ class CameraController:
                         pass
                 if self._cv_thread and self._cv_thread.is_alive():
                     self._cv_thread.join(timeout=0.5)
+                if self.bus is not None:
+                    try:
+                        self.bus.close()
+                    except Exception:
+                        pass
+                    self.bus = None
                 self.is_running = False
-                print("Camera streaming stopped")
+                log.info("Camera streaming stopped")
             except Exception as e:
-                print(f"Failed to stop camera: {e}")
+                log.error("Failed to stop camera: %s", e)
 
     def get_frame(self) -> Optional[bytes]:
         """Get the latest frame from the camera."""
@@ -196,126 +554,436 @@ class CameraController:
             self.output.condition.wait(timeout=5.0)
             return self.output.frame
 
+    async def next_frame(self, after_seq: int, timeout: float = 5.0) -> Optional[Tuple[int, float, bytes]]:
+        """Awaitable :meth:`wait_frame`: same result, but waits on the event loop, not a pool thread."""
+        output = self.output
+        if not output:
+            return None
+        loop = asyncio.get_running_loop()
+        with output.condition:
+            if output.seq <= after_seq:
+                fut = loop.create_future()
+                output._waiters.setdefault(loop, []).append(fut)
+            else:
+                fut = None
+        if fut is not None:
+            try:
+                await asyncio.wait_for(fut, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with output.condition:  # timed out or cancelled: don't leave it registered
+                    pending = output._waiters.get(loop)
+                    if pending is not None and fut in pending:
+                        pending.remove(fut)
+                        if not pending:
+                            del output._waiters[loop]
+        with output.condition:
+            if output.seq <= after_seq or output.frame is None:
+                return None
+            return output.seq, output.timestamp, output.frame
+
+    def wait_frame(self, after_seq: int, timeout: float = 5.0) -> Optional[Tuple[int, float, bytes]]:
+        """Latest frame as (seq, timestamp, jpeg), waiting only if none is newer than ``after_seq``.
+
+        A reader that fell behind gets the newest frame immediately and skips
+        the ones in between, instead of being handed them one by one.
+        """
+        output = self.output
+        if not output:
+            return None
+        with output.condition:
+            if output.seq <= after_seq:
+                output.condition.wait(timeout=timeout)
+            if output.seq <= after_seq or output.frame is None:
+                return None
+            return output.seq, output.timestamp, output.frame
+
+    def _framebus_status(self) -> Optional[dict]:
+        if not self.framebus:
+            return None
+        bus = self.bus
+        if bus is None:
+            return {"name": self.framebus, "attached": False}
+        return {
+            "name": self.framebus,
+            "attached": True,
+            "format": bus.format_name,
+            "resolution": f"{bus.width}x{bus.height}",
+            "latest_seq": bus.latest_seq(),
+            "last_write_age_s": round(bus.last_write_age(), 3),
+            "torn_reads": bus.torn_reads,
+        }
+
     def status(self) -> dict:
         """Get camera status."""
         backend = "none"
-        if self.picam2 is not None:
+        if self.framebus:
+            backend = "framebus"
+        elif self.picam2 is not None:
             backend = "picamera2"
+        elif self.cap is not None and self.synthetic:
+            backend = "synthetic"
         elif self.cap is not None:
             backend = "opencv"
         
         return {
+            "id": self.camera_id,
             "running": self.is_running,
             "camera_num": self.camera_num,
             "resolution": f"{self.resolution[0]}x{self.resolution[1]}",
             "framerate": self.framerate,
-            "available": (self.picam2 is not None) or (self.cap is not None),
+            "available": self.available,
             "backend": backend,
+            "framebus": self._framebus_status(),
+            "capture": self._capture_status(),
+            "pacing": self.pacer.status(),
+            "change_detect": self.detector.status() if self.detector is not None else None,
+            "clients": self.clients,
+            # Per-viewer delivery: frames skipped (slow link), send time and frame age on arrival
+            "streams": [c.status() for c in streams.clients(self.camera_id)],
+            "clip_buffer": self.clip_buffer.status() if self.clip_buffer is not None else None,
+            "limits": {"max_fps": round(self.pacer.max_fps, 2), "jpeg_quality": self.quality, "scale": self.scale},
             "picamera2_available": PICAMERA_AVAILABLE,
             "opencv_available": CV2_AVAILABLE,
         }
 
 
 # --- Configuration from environment ---
+# CAMERAS lists camera ids (default "main"). The first camera reads the
+# classic CAMERA_* / FRAMEBUS_NAME variables; every camera can be configured
+# with CAMERA_<ID>_<KEY>, e.g. for a second camera "chamber":
+#   CAMERA_CHAMBER_DEVICE=/dev/video2  CAMERA_CHAMBER_MAX_FPS=10  CAMERA_CHAMBER_CPU_BUDGET=0.3
 CAMERA_NUM = int(os.getenv("CAMERA_NUM", "0"))
 CAMERA_WIDTH = int(os.getenv("CAMERA_WIDTH", "1920"))
 CAMERA_HEIGHT = int(os.getenv("CAMERA_HEIGHT", "1080"))
 CAMERA_FPS = int(os.getenv("CAMERA_FPS", "30"))
+# When set, read frames from the capture daemon's shared-memory ring instead of the sensor
+FRAMEBUS_NAME = os.getenv("FRAMEBUS_NAME", "") or None
+
+
+class CameraConfig(NamedTuple):
+    camera_id: str
+    camera_num: int
+    device: Optional[str]
+    width: int
+    height: int
+    fps: int
+    framebus: Optional[str]
+    max_fps: Optional[float]
+    cpu_budget: Optional[float]
+    change_detect: bool
+    low_latency: bool
+    fourcc: Optional[str]
+    primary: bool
 
-# Initialize camera controller
-_camera = CameraController(
-    camera_num=CAMERA_NUM,
-    resolution=(CAMERA_WIDTH, CAMERA_HEIGHT),
-    framerate=CAMERA_FPS,
-    use_mjpeg=True,
-)
+
+def load_camera_configs() -> Dict[str, CameraConfig]:
+    ids = [c.strip() for c in os.getenv("CAMERAS", "main").split(",") if c.strip()] or ["main"]
+    configs: Dict[str, CameraConfig] = {}
+    for index, camera_id in enumerate(ids):
+        primary = index == 0
+        prefix = f"CAMERA_{camera_id.upper().replace('-', '_')}_"
+
+        def opt(key: str, legacy: Optional[str] = None, default: Optional[str] = None) -> Optional[str]:
+            value = os.getenv(prefix + key)
+            if value is None and primary and legacy:
+                value = os.getenv(legacy)
+            return value if value not in (None, "") else default
+
+        num = int(opt("NUM", "CAMERA_NUM", str(index)))
+        max_fps = opt("MAX_FPS", "CAMERA_MAX_FPS")
+        budget = opt("CPU_BUDGET", "CAMERA_CPU_BUDGET")
+        configs[camera_id] = CameraConfig(
+            camera_id=camera_id,
+            camera_num=num,
+            device=opt("DEVICE", "CAMERA_DEVICE", None if primary else f"/dev/video{num}"),
+            width=int(opt("WIDTH", "CAMERA_WIDTH", "1920")),
+            height=int(opt("HEIGHT", "CAMERA_HEIGHT", "1080")),
+            fps=int(opt("FPS", "CAMERA_FPS", "30")),
+            framebus=opt("FRAMEBUS", "FRAMEBUS_NAME"),
+            max_fps=float(max_fps) if max_fps else None,
+            cpu_budget=float(budget) if budget else None,
+            change_detect=opt("CHANGE_DETECT", "CAMERA_CHANGE_DETECT", "1") not in ("0", "false", "False"),
+            low_latency=opt("LOW_LATENCY", "CAMERA_LOW_LATENCY", "1") not in ("0", "false", "False"),
+            fourcc=(opt("FOURCC", "CAMERA_FOURCC", "MJPG") or "").upper()[:4] or None,
+            primary=primary,
+        )
+    return configs
+
+
+CAMERA_CONFIGS = load_camera_configs()
+DEFAULT_CAMERA = next(iter(CAMERA_CONFIGS))
+
+# Camera controllers, created on first use (or by the start-up warm-up) because
+# probing /dev/video* and importing the backends takes seconds on a Pi.
+_cameras: Dict[str, CameraController] = {}
+_camera_lock = threading.Lock()
+
+
+def camera_ids() -> List[str]:
+    return list(CAMERA_CONFIGS)
+
+
+def get_camera(camera_id: Optional[str] = None) -> CameraController:
+    """Return a camera controller, creating it on first call (blocking).
+
+    Raises KeyError for an unknown id.
+    """
+    camera_id = camera_id or DEFAULT_CAMERA
+    camera = _cameras.get(camera_id)
+    if camera is not None:
+        return camera
+    cfg = CAMERA_CONFIGS[camera_id]
+    with _camera_lock:
+        camera = _cameras.get(camera_id)
+        if camera is None:
+            with startup.phase(f"camera.init.{camera_id}"):
+                camera = CameraController(
+                    camera_num=cfg.camera_num,
+                    resolution=(cfg.width, cfg.height),
+                    framerate=cfg.fps,
+                    use_mjpeg=True,
+                    framebus=cfg.framebus,
+                    device=cfg.device,
+                    camera_id=camera_id,
+                    max_fps=cfg.max_fps,
+                    cpu_budget=cfg.cpu_budget,
+                    probe_all=cfg.primary,
+                    change_detect=cfg.change_detect,
+                    low_latency=cfg.low_latency,
+                    fourcc=cfg.fourcc if cfg.fourcc != "AUTO" else None,
+                )
+            level = governor.level
+            camera.apply_limits(level.fps_factor, level.quality, level.scale)
+            if clips.CLIP_BUFFER_S > 0 and camera.output is not None:
+                camera.clip_buffer = clips.ClipBuffer(camera_id)
+                camera.output.taps.append(camera.clip_buffer.tap)
+                clips.register(camera.clip_buffer)
+            _cameras[camera_id] = camera
+        return camera
+
+
+def _apply_governor(level: Level) -> None:
+    for camera in list(_cameras.values()):
+        camera.apply_limits(level.fps_factor, level.quality, level.scale)
+
+
+governor.add_listener(_apply_governor)
+
+
+async def _get_camera(camera_id: Optional[str] = None) -> CameraController:
+    camera = _cameras.get(camera_id or DEFAULT_CAMERA)
+    if camera is not None:
+        return camera
+    if (camera_id or DEFAULT_CAMERA) not in CAMERA_CONFIGS:
+        raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_id}'")
+    return await run_in("camera", get_camera, camera_id)
+
+
+# Publisher health record (memory-mapped once, read in place on every poll)
+_publisher_health = HealthReader(Path(os.getenv("PUBLISHER_HEALTH_FILE", "/tmp/publisher_health.mmap")))
+
+NO_STORE = {
+    "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+
+def _camera_status(camera_id: str) -> dict:
+    camera = _cameras.get(camera_id)
+    if camera is None:
+        # Don't make a status poll pay for hardware probing.
+        return {"id": camera_id, "running": False, "available": None, "backend": "uninitialized",
+                "picamera2_available": PICAMERA_AVAILABLE, "opencv_available": CV2_AVAILABLE}
+    return camera.status()
+
+
+def _check_id(camera_id: str) -> None:
+    if camera_id not in CAMERA_CONFIGS:
+        raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_id}'")
 
 
 # --- Routes ---
 @router.get("/status")
-def get_camera_status():
-    """Get camera status."""
-    status = _camera.status()
+async def get_camera_status():
+    """Get camera status (default camera at the top level, every camera under "cameras")."""
+    cameras = {cid: _camera_status(cid) for cid in CAMERA_CONFIGS}
+    status = dict(cameras[DEFAULT_CAMERA])
+    status["cameras"] = cameras
+    status["encoder_pool"] = get_executor("encode").metrics()
+    status["stream_admission"] = streams.status()
+    status["snapshot_cache"] = derived_cache.status()
     # Augment with publisher health if available
-    health_path = Path(os.getenv("PUBLISHER_HEALTH_FILE", "/tmp/publisher_health.json"))
-    if health_path.exists():
-        try:
-            status["publisher"] = json.loads(health_path.read_text())
-        except Exception:
-            status["publisher"] = {"status": "unreadable"}
-    else:
-        status["publisher"] = {"status": "missing"}
+    try:
+        status["publisher"] = _publisher_health.read()
+    except Exception:
+        status["publisher"] = {"status": "unreadable"}
     return status
 
 
+@router.get("/list")
+async def list_cameras():
+    """Configured camera ids and their stream/snapshot URLs."""
+    return {
+        "default": DEFAULT_CAMERA,
+        "cameras": [
+            {"id": cid, "stream": f"/camera/{cid}/stream.mjpg", "snapshot": f"/camera/{cid}/snapshot",
+             "running": bool(_cameras.get(cid) and _cameras[cid].is_running)}
+            for cid in CAMERA_CONFIGS
+        ],
+    }
+
+
 @router.post("/start")
-def start_camera():
+async def start_camera(camera_id: Optional[str] = None):
     """Start camera streaming."""
     try:
-        _camera.start()
+        camera = await _get_camera(camera_id)
+        await run_in("camera", camera.start)
         return {"status": "started"}
+    except HTTPException:
+        raise
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 @router.post("/stop")
-def stop_camera():
+async def stop_camera(camera_id: Optional[str] = None):
     """Stop camera streaming."""
     try:
-        _camera.stop()
+        camera = _cameras.get(camera_id or DEFAULT_CAMERA)
+        if camera is not None:
+            await run_in("camera", camera.stop)
         return {"status": "stopped"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
-def generate_frames():
-    """Generator function for streaming frames."""
+async def _export(frames: List[Tuple[float, bytes]], fmt: str, name: str) -> Response:
+    if not frames:
+        raise HTTPException(status_code=404, detail="No buffered frames in that window")
+    if fmt == "mp4":
+        try:
+            data = await run_in("archive", clips.to_mp4, frames)
+        except clips.ExportUnavailable as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        except ExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        media_type = "video/mp4"
+    else:
+        data, media_type = clips.to_mjpeg(frames), "video/x-motion-jpeg"
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(frames[0][0]))
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={
+            **NO_STORE,
+            "Content-Disposition": f'attachment; filename="{name}-{stamp}.{fmt}"',
+            "X-Frame-Count": str(len(frames)),
+        },
+    )
+
+
+@router.get("/clip")
+async def export_clip(
+    camera_id: Optional[str] = None,
+    seconds: float = Query(60.0, gt=0, le=3600, description="Length of the window"),
+    end: Optional[float] = Query(None, description="Unix time the window ends at; default now"),
+    format: str = Query("mjpeg", pattern="^(mjpeg|mp4)$"),
+):
+    """Export buffered frames (last ``seconds`` up to ``end``) without re-encoding."""
+    camera_id = camera_id or DEFAULT_CAMERA
+    _check_id(camera_id)
+    camera = _cameras.get(camera_id)
+    if camera is None or camera.clip_buffer is None:
+        raise HTTPException(status_code=404, detail=f"Camera '{camera_id}' has no clip buffer")
+    end = end if end is not None else time.time()
+    return await _export(camera.clip_buffer.window(end - seconds, end), format, camera_id)
+
+
+@router.get("/clips")
+async def list_clips():
+    """Per-camera ring buffer state and the frozen incident clips."""
+    return {
+        name: {"buffer": buffer.status(), "clips": buffer.clips()}
+        for name, buffer in clips.buffers().items()
+    }
+
+
+@router.post("/clips/freeze")
+async def freeze_clips(reason: str = Query("manual", max_length=200)):
+    """Freeze every camera's buffer now (as a stepper fault or valve write failure does)."""
+    return {"clips": clips.freeze_all(reason)}
+
+
+@router.get("/clips/{clip_id}")
+async def export_frozen_clip(clip_id: str, format: str = Query("mjpeg", pattern="^(mjpeg|mp4)$")):
+    """Export a frozen incident clip."""
+    frames = clips.find_clip(clip_id)
+    if frames is None:
+        raise HTTPException(status_code=404, detail=f"Unknown clip '{clip_id}'")
+    return await _export(frames, format, clip_id)
+
+
+async def generate_frames(camera: Optional[CameraController] = None, client: Optional[StreamClient] = None):
+    """Async generator for streaming frames; frame waits run on the event loop.
+
+    Each iteration sends the newest frame (one chunk per frame); the time the
+    generator is suspended at ``yield`` is the time the send took, so a slow
+    viewer simply skips the frames published meanwhile.
+    """
+    camera = camera or await _get_camera()
     # Ensure camera is started
-    if not _camera.is_running:
+    if not camera.is_running:
         try:
-            print("Auto-starting camera for stream request...")
-            _camera.start()
+            log.info("Auto-starting camera for stream request")
+            await run_in("camera", camera.start)
             # Give camera a moment to stabilize
-            import time
-            time.sleep(0.3)
+            await asyncio.sleep(0.3)
         except Exception as e:
-            print(f"Failed to start camera in stream: {e}")
+            log.error("Failed to start camera in stream: %s", e)
             # Send a simple error frame as an image
             yield b'--FRAME\r\n'
             yield b'Content-Type: text/plain\r\n\r\n'
             yield f'Camera unavailable: {str(e)}\r\n'.encode()
             return
     
+    camera.clients += 1
     try:
-        frame_count = 0
+        last_seq = 0
         while True:
-            frame = _camera.get_frame()
-            if frame:
-                frame_count += 1
-                yield b'--FRAME\r\n'
-                # Including Content-Length improves compatibility with some proxies/clients
-                header = f"Content-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n\r\n".encode()
-                yield header
-                yield frame
-                yield b'\r\n'
-                
-                # Log periodic confirmation
-                if frame_count % 300 == 0:  # Every ~10 seconds at 30fps
-                    print(f"Camera stream active: {frame_count} frames delivered")
-            else:
+            got = await camera.next_frame(last_seq)
+            if got is None:
                 # No frame available, brief pause
-                import time
-                time.sleep(0.01)
-    except GeneratorExit:
-        print("Client disconnected from camera stream")
+                await asyncio.sleep(0.01)
+                continue
+            seq, ts, frame = got
+            # Including Content-Length improves compatibility with some proxies/clients;
+            # X-Frame-Timestamp is the capture time, for glass-to-glass measurements
+            header = (
+                f"Content-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n"
+                f"X-Frame-Timestamp: {ts:.6f}\r\n\r\n"
+            ).encode()
+            t0 = time.monotonic()
+            yield b'--FRAME\r\n' + header + frame + b'\r\n'
+            if client is not None:
+                client.delivered(seq, ts, len(frame), time.monotonic() - t0)
+            last_seq = seq
+    except (GeneratorExit, asyncio.CancelledError):
+        log.debug("Client disconnected from camera stream")
+        raise
+    except ExecutorSaturated as e:
+        log.warning("Camera stream closed: %s", e)
     except Exception as e:
-        print(f"Error in camera stream: {e}")
+        log.error("Error in camera stream: %s", e)
+    finally:
+        camera.clients -= 1
 
 
-@router.get("/stream.mjpg")
-def video_feed():
-    """MJPEG video streaming endpoint."""
-    if not (PICAMERA_AVAILABLE or CV2_AVAILABLE):
+async def _video_feed(camera_id: Optional[str], request: Request):
+    if not (PICAMERA_AVAILABLE or CV2_AVAILABLE or CAMERA_CONFIGS[camera_id or DEFAULT_CAMERA].framebus):
         return Response(
             content="Camera not available - no backend present (picamera2 or OpenCV)\n"
                     "Install picamera2: pip install picamera2\n"
@@ -325,7 +993,11 @@ def video_feed():
         )
     
     # Check if camera was initialized
-    if _camera.picam2 is None and _camera.cap is None:
+    try:
+        camera = await _get_camera(camera_id)
+    except ExecutorSaturated as e:
+        return Response(content=f"Camera busy: {e}\n", media_type="text/plain", status_code=503)
+    if not camera.available:
         return Response(
             content="Camera hardware not detected. Check:\n"
                     "- Camera is properly connected\n"
@@ -336,64 +1008,140 @@ def video_feed():
             status_code=503
         )
     
+    client = streams.admit(camera.camera_id, request.client.host if request.client else None)
+    if client is None:
+        return Response(
+            content=f"Too many camera streams open (limit {streams.max_streams}); try again shortly\n",
+            media_type="text/plain",
+            status_code=503,
+            headers={**NO_STORE, "Retry-After": str(CAMERA_STREAM_RETRY_AFTER_S)},
+        )
+
     # Stream will auto-start camera if needed
-    return StreamingResponse(
-        generate_frames(),
+    return DeadlineStreamingResponse(
+        generate_frames(camera, client),
+        client=client,
         media_type='multipart/x-mixed-replace; boundary=FRAME',
         headers={
             # Prevent any client/proxy caching of the stream
-            "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0",
-            "Pragma": "no-cache",
-            "Expires": "0",
+            **NO_STORE,
             # Hint for nginx to avoid buffering this upstream
             "X-Accel-Buffering": "no",
         },
     )
 
 
-@router.get("/snapshot")
-def get_snapshot():
-    """Get a single JPEG snapshot from the camera."""
-    if not _camera.is_running:
+class SnapshotParams(NamedTuple):
+    width: Optional[int]
+    height: Optional[int]
+    crop: Optional[Crop]
+    fmt: str
+
+    @property
+    def derived(self) -> bool:
+        return bool(self.width or self.height or self.crop or self.fmt != "jpeg")
+
+
+def _snapshot_params(
+    w: Optional[int] = Query(None, ge=16, le=4096, description="Fit within this width (px)"),
+    h: Optional[int] = Query(None, ge=16, le=4096, description="Fit within this height (px)"),
+    crop: Optional[str] = Query(None, max_length=40, description="x,y,w,h in source pixels, applied before resizing"),
+    fmt: str = Query("jpeg", pattern="^(jpeg|webp)$"),
+) -> SnapshotParams:
+    try:
+        return SnapshotParams(w, h, parse_crop(crop), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid crop: {e}")
+
+
+async def _derived_response(camera_id: str, seq: int, ts: float, frame: bytes, params: SnapshotParams) -> Response:
+    """Resized/cropped/re-encoded snapshot, computed once per source frame and parameter set."""
+    key = (camera_id, seq, params)
+    try:
+        item, state = await derived_cache.get_or_derive(
+            key, lambda: run_in("encode", derive, frame, params.width, params.height, params.crop, params.fmt),
+        )
+    except ExecutorSaturated as e:
+        return Response(content=f"Encoder busy: {e}\n", media_type="text/plain", status_code=503,
+                        headers={**NO_STORE, "Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {**NO_STORE, "X-Frame-Timestamp": f"{ts:.6f}", "X-Derived-Cache": state}
+    if item.crop is not None:
+        headers["X-Crop"] = ",".join(map(str, item.crop)) + (" lossless" if item.lossless else "")
+    return Response(content=item.data, media_type=item.media_type, headers=headers)
+
+
+async def _snapshot(camera_id: Optional[str], params: Optional[SnapshotParams] = None):
+    camera = _cameras.get(camera_id or DEFAULT_CAMERA)
+    if camera is None or not camera.is_running:
         try:
-            print("Auto-starting camera for snapshot request...")
-            _camera.start()
-            time.sleep(0.5)  # Give camera time to warm up
+            log.info("Auto-starting camera %s for snapshot request", camera_id or DEFAULT_CAMERA)
+            camera = await _get_camera(camera_id)
+            await run_in("camera", camera.start)
+            await asyncio.sleep(0.5)  # Give camera time to warm up
+        except HTTPException:
+            raise
         except Exception as e:
             return Response(
                 content=f"Camera unavailable: {e}\n"
                         f"Available backends: picamera2={PICAMERA_AVAILABLE}, opencv={CV2_AVAILABLE}",
                 media_type="text/plain",
                 status_code=503,
-                headers={
-                    "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate",
-                    "Pragma": "no-cache",
-                },
+                headers=NO_STORE,
             )
     
-    # Try to get a frame with timeout
+    # The current frame is served at once (with change detection a static scene
+    # may publish only every few seconds); wait only until there is a first one
     max_attempts = 5
     for attempt in range(max_attempts):
-        frame = _camera.get_frame()
-        if frame:
+        got = await camera.next_frame(0)
+        if got:
+            seq, ts, frame = got
+            if params is not None and params.derived:
+                return await _derived_response(camera.camera_id, seq, ts, frame, params)
             return Response(
                 content=frame,
                 media_type="image/jpeg",
-                headers={
-                    "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0",
-                    "Pragma": "no-cache",
-                    "Expires": "0",
-                    "X-Accel-Buffering": "no",
-                },
+                headers={**NO_STORE, "X-Accel-Buffering": "no", "X-Frame-Timestamp": f"{ts:.6f}"},
             )
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
     
     return Response(
         content="No frame available from camera after multiple attempts",
         media_type="text/plain",
         status_code=503,
-        headers={
-            "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate",
-            "Pragma": "no-cache",
-        },
+        headers=NO_STORE,
     )
+
+
+@router.get("/stream.mjpg")
+async def video_feed(request: Request):
+    """MJPEG video streaming endpoint (default camera)."""
+    return await _video_feed(None, request)
+
+
+@router.get("/snapshot")
+async def get_snapshot(params: SnapshotParams = Depends(_snapshot_params)):
+    """Get a single JPEG snapshot from the default camera (optionally resized, cropped or WebP)."""
+    return await _snapshot(None, params)
+
+
+@router.get("/{camera_id}/stream.mjpg")
+async def camera_video_feed(camera_id: str, request: Request):
+    """MJPEG stream of one configured camera."""
+    _check_id(camera_id)
+    return await _video_feed(camera_id, request)
+
+
+@router.get("/{camera_id}/snapshot")
+async def camera_snapshot(camera_id: str, params: SnapshotParams = Depends(_snapshot_params)):
+    """Single JPEG snapshot from one configured camera (optionally resized, cropped or WebP)."""
+    _check_id(camera_id)
+    return await _snapshot(camera_id, params)
+
+
+@router.get("/{camera_id}/status")
+async def camera_status(camera_id: str):
+    _check_id(camera_id)
+    return _camera_status(camera_id)
@@ -0,0 +1,148 @@
+"""HLS / LL-HLS output of the camera streams.
+
+Encoded once per camera on demand (see :mod:`app.services.hls`) and served
+as cacheable objects so nginx can fan one encode out to many viewers:
+
+    GET /hls/status
+    GET /hls/{camera_id}/index.m3u8[?_HLS_msn=&_HLS_part=]   media playlist (blocking reload)
+    GET /hls/{camera_id}/{name}.ts                          segment or part; immutable, Range-capable
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from ..services.executors import ExecutorSaturated, run_in
+from ..services.governor import governor
+from ..services.hls import HLS_SEGMENT_S, HlsStream, HlsUnavailable
+from .camera import CAMERA_CONFIGS, NO_STORE, get_camera
+
+router = APIRouter(prefix="/hls", tags=["hls"])
+
+PLAYLIST_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_TYPE = "video/mp2t"
+
+_streams: Dict[str, HlsStream] = {}
+_streams_lock = threading.Lock()
+
+
+def get_stream(camera_id: str) -> HlsStream:
+    """HLS stream for ``camera_id``, tapped into the camera and started (blocking)."""
+    stream = _streams.get(camera_id)
+    if stream is None:
+        with _streams_lock:
+            stream = _streams.get(camera_id)
+            if stream is None:
+                cfg = CAMERA_CONFIGS[camera_id]
+                stream = HlsStream(camera_id, fps=min(cfg.fps, cfg.max_fps or cfg.fps),
+                                   bitrate_kbps=lambda: governor.bitrate_kbps)
+                _streams[camera_id] = stream
+    camera = get_camera(camera_id)
+    stream.ensure_started()  # raises HlsUnavailable before the camera is started for nothing
+    if stream.tap not in camera.output.taps:
+        camera.output.taps.append(stream.tap)
+    camera.start()
+    return stream
+
+
+def stop_streams() -> None:
+    for stream in list(_streams.values()):
+        stream.stop()
+
+
+async def _stream(camera_id: str) -> HlsStream:
+    if camera_id not in CAMERA_CONFIGS:
+        raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_id}'")
+    stream = _streams.get(camera_id)
+    if stream is not None and stream.running:
+        stream.last_request = time.monotonic()
+        return stream
+    try:
+        return await run_in("camera", get_stream, camera_id)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HlsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/status")
+async def hls_status() -> Dict[str, Any]:
+    """Encoder and segment-cache state per camera that has been watched."""
+    return {"segment_s": HLS_SEGMENT_S, "cameras": {cid: s.status() for cid, s in _streams.items()}}
+
+
+@router.get("/{camera_id}/{name}.m3u8")
+async def hls_playlist(
+    camera_id: str,
+    name: str,
+    msn: Optional[int] = Query(None, alias="_HLS_msn", ge=0),
+    part: Optional[int] = Query(None, alias="_HLS_part", ge=0),
+):
+    """Live media playlist. With ``_HLS_msn`` the request blocks until that segment/part exists."""
+    stream = await _stream(camera_id)
+    segmenter = stream.segmenter
+    wait_s = 3 * HLS_SEGMENT_S
+    if msn is not None:
+        # Don't hold a pool thread for a blocking reload; poll the condition from the loop.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_s
+        while not segmenter.has(msn, part) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+    else:
+        # First request after a (re)start: wait for the first segment.
+        for _ in range(int(wait_s / 0.1)):
+            if segmenter.playlist() is not None:
+                break
+            await asyncio.sleep(0.1)
+    body = segmenter.playlist()
+    if body is None:
+        raise HTTPException(status_code=503, detail="HLS stream is starting", headers={"Retry-After": "2"})
+    # Short enough to track the live edge; long enough that nginx collapses concurrent reloads.
+    return Response(content=body, media_type=PLAYLIST_TYPE, headers={"Cache-Control": "public, max-age=1"})
+
+
+@router.get("/{camera_id}/{name}.ts")
+async def hls_segment(camera_id: str, name: str, request: Request):
+    """A segment or LL-HLS part. Names are unique per encoder session, so bytes never change."""
+    stream = _streams.get(camera_id)
+    segmenter = stream.segmenter if stream is not None else None
+    data = segmenter.lookup(name + ".ts") if segmenter is not None else None
+    if data is None and segmenter is not None and segmenter.part_s:
+        # A preload-hinted part is requested before it exists; hold the request until it does.
+        for _ in range(int(3 * segmenter.part_s / 0.05)):
+            await asyncio.sleep(0.05)
+            data = segmenter.lookup(name + ".ts")
+            if data is not None:
+                break
+    if data is None:
+        raise HTTPException(status_code=404, detail="Segment expired or not produced yet", headers=NO_STORE)
+    stream.last_request = time.monotonic()  # viewers fetching segments keep the encoder alive
+    etag = '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+    headers = {"Cache-Control": "public, max-age=3600, immutable", "ETag": etag, "Accept-Ranges": "bytes"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    rng = request.headers.get("range")
+    if rng and rng.startswith("bytes=") and "," not in rng:
+        start_s, _, end_s = rng[6:].partition("-")
+        try:
+            if start_s:
+                start = int(start_s)
+                end = min(int(end_s), len(data) - 1) if end_s else len(data) - 1
+            else:
+                start, end = max(0, len(data) - int(end_s)), len(data) - 1
+        except ValueError:
+            start, end = 0, -1
+        if start > end or start >= len(data):
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+        return Response(
+            content=data[start:end + 1],
+            status_code=206,
+            media_type=SEGMENT_TYPE,
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(data)}"},
+        )
+    return Response(content=data, media_type=SEGMENT_TYPE, headers=headers)
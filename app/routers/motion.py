@@ -0,0 +1,63 @@
+"""Coordinated multi-axis moves for the ``STEPPER_AXES`` rig.
+
+Thin HTTP layer over :mod:`app.services.motion`. The controller claims its
+GPIO pins when first created, so that happens on the ``motion`` executor
+(via :func:`.stepper._motion`), never inline on the event loop; once it
+exists, status and abort are answered inline. A malformed ``STEPPER_AXES``
+is a 503, like any other unavailable hardware.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Body
+
+from ..services import motion as motion_svc
+from ..services.motion import get_motion
+from .stepper import _axis_errors, _motion
+
+
+router = APIRouter(prefix="/api/motion", tags=["motion"])
+
+
+@router.get("/status")
+async def status() -> Dict[str, object]:
+    motion = motion_svc._motion
+    if motion is None:
+        return await _motion(_axis_errors, lambda: get_motion().status())
+    return motion.status()
+
+
+@router.post("/move")
+async def move(
+    steps: Dict[str, int] = Body(..., embed=True, description="Relative steps per axis, e.g. {\"pump_a\": 400, \"pump_b\": -200}"),
+    rpm: Optional[float] = Body(None, embed=True, gt=0, description="Speed of the axis with the most steps"),
+    duration_s: Optional[float] = Body(None, embed=True, gt=0, description="Cruise time for the whole move (instead of rpm)"),
+    accel_sps2: Optional[float] = Body(None, embed=True, ge=0, description="Trapezoidal ramp; 0 for constant speed"),
+) -> Dict[str, object]:
+    plan = await _motion(
+        _axis_errors, lambda: get_motion().move(steps, rpm=rpm, duration_s=duration_s, accel_sps2=accel_sps2),
+    )
+    return {"result": "moving", "plan": plan}
+
+
+@router.post("/enable")
+async def enable() -> Dict[str, str]:
+    await _motion(_axis_errors, lambda: get_motion().set_enabled(True))
+    return {"result": "enabled"}
+
+
+@router.post("/disable")
+async def disable() -> Dict[str, str]:
+    await _motion(_axis_errors, lambda: get_motion().set_enabled(False))
+    return {"result": "disabled"}
+
+
+@router.post("/abort")
+async def abort() -> Dict[str, str]:
+    # Inline on the event loop, like /api/stepper/abort; a controller that
+    # was never created has nothing to stop.
+    motion = motion_svc._motion
+    if motion is not None:
+        motion.abort()
+    return {"result": "aborted"}
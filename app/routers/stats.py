@@ -5,12 +5,23 @@ import os
 import platform
 import socket
 import subprocess
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import psutil
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..services.executors import ExecutorSaturated, executor_metrics, run_in
+from ..services import log as log_pipeline
+from ..services.governor import governor
+from ..services.log import get_logger
+from ..services.metrics import route_metrics, sample_profile
+from ..services.procstats import ServiceAccounting
+from ..services.startup import profile as startup_profile
+from ..services.sysmon import CpuUsage, ThermalSensor
 
 
 # Configurable service names and ports (override via environment variables)
@@ -18,78 +29,112 @@ SERVICE_CAMERA = os.getenv("SERVICE_CAMERA", "camera-stream.service")
 SERVICE_STEPPER = os.getenv("SERVICE_STEPPER", "valve-control.service")
 PORT_RTSP = int(os.getenv("PORT_RTSP", "8554"))
 PORT_API = int(os.getenv("PORT_API", "8000"))
+STATS_SAMPLE_INTERVAL_S = float(os.getenv("STATS_SAMPLE_INTERVAL_S", "2.0"))
+# Per-service CPU/RSS/threads/IO and interface rates on every sampler tick
+STATS_SERVICE_ACCOUNTING = os.getenv("STATS_SERVICE_ACCOUNTING", "1") not in ("0", "false", "False")
+
+# Units whose processes are accounted (the API process itself is always added as "api")
+TRACKED_UNITS = {
+    "camera": SERVICE_CAMERA,
+    "stepper": SERVICE_STEPPER,
+    "nginx": "nginx.service",
+    "tailscaled": "tailscaled.service",
+    "webhook_deploy": "webhook-deploy.service",
+}
 
 
 router = APIRouter(prefix="/api", tags=["stats"])
+log = get_logger("stats")
+
+
+# Probed once at import: the working thermal zone stays open; /proc/stat too
+cpu_usage = CpuUsage()
+thermal = ThermalSensor()
 
 
 def _read_cpu_temp_c() -> Optional[float]:
-    """Best-effort CPU temperature in Celsius.
+    """CPU temperature in Celsius from the source found at start-up, or None."""
+    return thermal.read()
+
+
+def _cpu_usage_percent() -> Optional[float]:
+    """Busy % from the sampler's last /proc/stat delta (never waits)."""
+    return cpu_usage.read()
+
 
-    Preference order:
-    1) vcgencmd measure_temp (from libraspberrypi-bin)
-    2) /sys/class/thermal/thermal_zone*/temp
-    3) psutil.sensors_temperatures
-    Returns None if unavailable.
+class StatsSampler:
+    """Background thread sampling CPU temperature and load at a fixed interval.
+
+    Subscribers (the governor) are called with every sample from the
+    sampler thread; ``latest`` holds the most recent one. With an
+    ``accounting`` the sample also carries per-service resource usage and
+    network rates under ``"resources"``.
     """
-    # 1) vcgencmd
-    try:
-        proc = subprocess.run(
-            ["vcgencmd", "measure_temp"],
-            capture_output=True,
-            text=True,
-            timeout=0.4,
-            check=False,
-        )
-        out = (proc.stdout or "").strip()
-        if out:
-            # Format: temp=49.2'C
-            if out.startswith("temp=") and "'C" in out:
-                val = out.split("=", 1)[1].split("'C", 1)[0]
-                return float(val)
-    except Exception:
-        pass
 
-    # 2) thermal zones
-    try:
-        base = Path("/sys/class/thermal")
-        zones = sorted(base.glob("thermal_zone*/temp"))
-        for z in zones:
+    def __init__(self, interval: float = STATS_SAMPLE_INTERVAL_S,
+                 accounting: Optional[ServiceAccounting] = None) -> None:
+        self.interval = interval
+        self.accounting = accounting
+        self.latest: Optional[Dict[str, Any]] = None
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, fn: Callable[[Dict[str, Any]], None]) -> None:
+        if fn not in self._subscribers:
+            self._subscribers.append(fn)
+
+    def sample(self) -> Dict[str, Any]:
+        try:
+            load1 = os.getloadavg()[0]
+        except OSError:
+            load1 = None
+        cpu = cpu_usage.tick()  # since the previous sample
+        sample = {"ts": time.time(), "cpu_temp_c": _read_cpu_temp_c(), "cpu_percent": cpu, "load1": load1}
+        if self.accounting is not None:
             try:
-                raw = z.read_text().strip()
-                if raw:
-                    v = float(raw)
-                    # Some report millidegrees
-                    if v > 1000:
-                        v = v / 1000.0
-                    # Basic sanity
-                    if 0.0 < v < 120.0:
-                        return v
-            except Exception:
-                continue
-    except Exception:
-        pass
+                sample["resources"] = self.accounting.sample()
+            except Exception as e:
+                log.error("service accounting failed: %s", e)
+        self.latest = sample
+        for fn in list(self._subscribers):
+            try:
+                fn(sample)
+            except Exception as e:
+                log.error("stats subscriber failed: %s", e)
+        return sample
 
-    # 3) psutil (may be empty on many Linux distros)
-    try:
-        temps = psutil.sensors_temperatures(fahrenheit=False)
-        if temps:
-            for _, entries in temps.items():
-                for e in entries:
-                    if e.current is not None and 0.0 < e.current < 120.0:
-                        return float(e.current)
-    except Exception:
-        pass
+    def _run(self) -> None:
+        cpu_usage.tick()  # prime the delta
+        while not self._stop.wait(self.interval):
+            self.sample()
 
-    return None
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-sampler", daemon=True)
+        self._thread.start()
 
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
 
-def _cpu_usage_percent() -> Optional[float]:
-    try:
-        # fast sample; psutil will use last interval
-        return float(psutil.cpu_percent(interval=0.05))
-    except Exception:
+
+sampler = StatsSampler(accounting=ServiceAccounting(TRACKED_UNITS) if STATS_SERVICE_ACCOUNTING else None)
+
+
+def _resources() -> Optional[Dict[str, Any]]:
+    """Latest per-service usage: the sampler's if it is running, else measured now (no rates yet)."""
+    accounting = sampler.accounting
+    if accounting is None:
         return None
+    latest = accounting.latest
+    if latest is not None and time.time() - latest["ts"] < 2 * sampler.interval + 1.0:
+        return latest
+    return accounting.sample()
 
 
 def _memory_stats() -> Dict[str, Optional[float]]:
@@ -212,11 +257,10 @@ def _format_uptime(seconds: Optional[float]) -> str:
     return " ".join(parts)
 
 
-@router.get("/stats")
-def get_stats() -> Dict[str, Any]:
+def _collect_stats() -> Dict[str, Any]:
     # Build payload with graceful fallbacks and short timeouts
     cpu_temp = _read_cpu_temp_c()
-    cpu_usage = _cpu_usage_percent()
+    cpu_busy = _cpu_usage_percent()
     mem = _memory_stats()
     uptime = _uptime_seconds()
     ipv4 = _ipv4_addresses()
@@ -242,23 +286,28 @@ def get_stats() -> Dict[str, Any]:
     except Exception:
         ts = None
 
+    resources = _resources()
     return {
-        "cpu": {"temp_c": cpu_temp, "usage_percent": cpu_usage},
+        "cpu": {"temp_c": cpu_temp, "usage_percent": cpu_busy, "per_core_percent": cpu_usage.per_core,
+                "temp_source": thermal.source},
         "memory": mem,
         "uptime_seconds": uptime,
-        "network": {"ipv4_addresses": ipv4, "internet_reachable": internet},
+        "network": {
+            "ipv4_addresses": ipv4,
+            "internet_reachable": internet,
+            "interfaces": resources["network"] if resources else None,
+        },
         "services": services,
+        "service_resources": resources["services"] if resources else None,
         "ports": ports,
         "os": osi,
         "timestamp": ts,
     }
 
 
-@router.get("/system/metrics")
-def get_system_metrics() -> Dict[str, Any]:
-    """Simplified system metrics endpoint for frontend dashboard."""
+def _collect_system_metrics() -> Dict[str, Any]:
     cpu_temp = _read_cpu_temp_c()
-    cpu_usage = _cpu_usage_percent()
+    cpu_busy = _cpu_usage_percent()
     mem = _memory_stats()
     uptime_sec = _uptime_seconds()
     
@@ -268,8 +317,92 @@ def get_system_metrics() -> Dict[str, Any]:
     
     return {
         "cpuTemp": cpu_temp or 0.0,
-        "cpuUsage": cpu_usage or 0.0,
+        "cpuUsage": cpu_busy or 0.0,
         "memoryUsage": mem_used_gb,
         "memoryTotal": mem_total_gb,
         "uptime": _format_uptime(uptime_sec),
     }
+
+
+@router.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    try:
+        return await run_in("stats", _collect_stats)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/system/metrics")
+async def get_system_metrics() -> Dict[str, Any]:
+    """Simplified system metrics endpoint for frontend dashboard."""
+    try:
+        return await run_in("stats", _collect_system_metrics)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/resources")
+async def get_resources() -> Dict[str, Any]:
+    """Per-service CPU %, RSS, threads and I/O rates (by systemd cgroup) and per-interface throughput."""
+    if sampler.accounting is None:
+        raise HTTPException(status_code=404, detail="Service accounting is disabled (STATS_SERVICE_ACCOUNTING=0)")
+    try:
+        resources = await run_in("stats", _resources)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**resources, "interval_s": sampler.interval, "units": sampler.accounting.units}
+
+
+@router.get("/executors")
+async def get_executor_metrics() -> Dict[str, Any]:
+    """Saturation metrics for the per-subsystem I/O executors."""
+    return executor_metrics()
+
+
+@router.get("/logging")
+async def get_logging_stats() -> Dict[str, Any]:
+    """Log pipeline backlog and records dropped because the queue was full."""
+    return log_pipeline.stats()
+
+
+@router.get("/startup")
+async def get_startup_profile() -> Dict[str, Any]:
+    """API start-up breakdown: import, ready and per-phase (incl. background warm-up) timings."""
+    return startup_profile.report()
+
+
+@router.get("/governor")
+async def get_governor() -> Dict[str, Any]:
+    """Thermal/load governor level, current stream limits and recent decisions."""
+    status = governor.status()
+    status["sampler"] = {"running": sampler._thread is not None, "interval_s": sampler.interval}
+    return status
+
+
+@router.get("/metrics/routes")
+async def get_route_metrics(reset: bool = Query(False, description="Clear the histograms after reading")) -> Dict[str, Any]:
+    """Per-route latency histograms (time to first byte and total) and in-flight counts."""
+    snapshot = route_metrics.snapshot()
+    if reset:
+        route_metrics.reset()
+    return snapshot
+
+
+@router.get("/debug/profile")
+async def get_profile(
+    seconds: float = Query(5.0, gt=0, le=60, description="Sampling duration"),
+    hz: float = Query(100.0, ge=1, le=1000, description="Samples per second"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+):
+    """Sample every thread's stack for a while; collapsed output feeds flamegraph.pl / speedscope."""
+    try:
+        result = await run_in("profiler", sample_profile, seconds, hz)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    if format == "json":
+        return result
+    name = time.strftime("api-%Y%m%d-%H%M%S.folded")
+    return PlainTextResponse(
+        result["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "X-Profile-Samples": str(result["samples"])},
+    )
@@ -2,45 +2,25 @@ from __future__ import annotations
 
 import os
 import threading
-import time
 from typing import Dict, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
+from ..services.clips import freeze_all
+from ..services.executors import ExecutorSaturated, run_in
+from ..services.gpio import GpioBackend, GpioUnavailable, get_backend
+from ..services.journal import STEPPER_JOURNAL, PositionJournal
+from ..services import motion as motion_svc
+from ..services.motion import MotionUnavailable, get_motion
+from ..services.simulation import REAL_CLOCK, Clock
+from ..services.startup import profile as startup
 
-router = APIRouter(prefix="/api/stepper", tags=["stepper"])
-
-
-# --- GPIO abstraction -------------------------------------------------------
-try:
-    import RPi.GPIO as GPIO  # type: ignore
-except Exception:  # pragma: no cover - not on dev machine
-    GPIO = None  # type: ignore
-
-
-class _GPIOLike:
-    BCM = 0
-    OUT = 0
-    HIGH = 1
-    LOW = 0
-
-    def setmode(self, *_args, **_kwargs):
-        pass
-
-    def setwarnings(self, *_args, **_kwargs):
-        pass
-
-    def setup(self, *_args, **_kwargs):
-        pass
 
-    def output(self, *_args, **_kwargs):
-        pass
-
-    def cleanup(self, *_args, **_kwargs):
-        pass
+router = APIRouter(prefix="/api/stepper", tags=["stepper"])
 
 
-GPIO_IF = GPIO if GPIO is not None else _GPIOLike()  # type: ignore
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000.0, 3) if seconds is not None else None
 
 
 # --- Controller -------------------------------------------------------------
@@ -59,6 +39,9 @@ class StepperController:
         default_rpm: float = 60.0,
         invert_enable: bool = True,
         duty_cycle: float = 0.5,
+        gpio: Optional[GpioBackend] = None,
+        clock: Optional[Clock] = None,
+        journal: Optional[PositionJournal] = None,
     ) -> None:
         self.pin_step = pin_step
         self.pin_dir = pin_dir
@@ -71,56 +54,93 @@ class StepperController:
         self._lock = threading.Lock()
         self._worker: Optional[threading.Thread] = None
         self._abort = threading.Event()
+        # Pulse timing and stop latency; a VirtualClock (app/services/simulation.py)
+        # runs moves instantly in tests
+        self.clock = clock if clock is not None else REAL_CLOCK
+        self._abort_at: Optional[float] = None  # clock.now() of the pending abort
+        self.last_stop_latency: Optional[float] = None
+        self.max_stop_latency: Optional[float] = None
         self.enabled = False
         self.moving = False
         self.position = 0  # arbitrary units (steps)
         self.last_error: Optional[str] = None
 
-        # GPIO init
+        # GPIO init: all pins in one claim, so the backend can drive them
+        # together; the driver starts disabled with STEP low.
+        self.gpio = gpio if gpio is not None else get_backend()
         try:
-            GPIO_IF.setwarnings(False)
-            if hasattr(GPIO_IF, "BCM"):
-                GPIO_IF.setmode(GPIO_IF.BCM)  # type: ignore[attr-defined]
-            GPIO_IF.setup(self.pin_step, GPIO_IF.OUT)
-            GPIO_IF.setup(self.pin_dir, GPIO_IF.OUT)
+            pins, levels = [self.pin_step, self.pin_dir], [0, 0]
             if self.pin_enable is not None:
-                GPIO_IF.setup(self.pin_enable, GPIO_IF.OUT)
-                # disable by default
-                self._write_enable(False)
+                pins.append(self.pin_enable)
+                levels.append(self._enable_level(False))
+            self.gpio.claim_outputs(pins, levels)
         except Exception as e:  # pragma: no cover
             self.last_error = f"GPIO init failed: {e}"
 
+        # Position and enable state survive restarts through the journal
+        self.journal = journal
+        if journal is not None:
+            restored = journal.restore()
+            self.position = restored.position
+            if restored.enabled:
+                self._write_enable(True)
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    @last_error.setter
+    def last_error(self, value: Optional[str]) -> None:
+        self._last_error = value
+        if value is not None:
+            # Keep the camera footage leading up to the fault
+            freeze_all(f"stepper: {value}")
+
     # --- Hardware helpers -------------------------------------------------
+    def _enable_level(self, on: bool) -> int:
+        # many drivers are ENABLE low-active
+        return int(on != self.invert_enable)
+
     def _write_enable(self, on: bool) -> None:
         if self.pin_enable is None:
             self.enabled = True  # treat as always enabled
             return
-        # many drivers are ENABLE low-active
-        val = GPIO_IF.LOW if (on and self.invert_enable) else GPIO_IF.HIGH if on else (
-            GPIO_IF.HIGH if self.invert_enable else GPIO_IF.LOW
-        )
         try:
-            GPIO_IF.output(self.pin_enable, val)
+            self.gpio.write(self.pin_enable, self._enable_level(on))
             self.enabled = on
         except Exception as e:  # pragma: no cover
             self.last_error = f"enable failed: {e}"
 
     def _set_dir(self, forward: bool) -> None:
+        """Set DIR and force STEP low in one bulk write.
+
+        DIR must be stable before the first rising STEP edge (200-650 ns on
+        A4988/DRV8825), so it is never written together with STEP high.
+        """
         try:
-            GPIO_IF.output(self.pin_dir, GPIO_IF.HIGH if forward else GPIO_IF.LOW)
+            self.gpio.write_many({self.pin_dir: 1 if forward else 0, self.pin_step: 0})
         except Exception as e:  # pragma: no cover
             self.last_error = f"dir failed: {e}"
 
-    def _pulse(self, step_delay: float) -> None:
+    def _pulse(self, step_delay: float) -> bool:
+        """Emit one STEP pulse; returns False if an abort cut it short.
+
+        Both half-periods wait on the abort event rather than sleeping, so a
+        stop takes effect within the current pulse. The driver steps on the
+        rising edge, so an interrupted pulse still counts as a step.
+        """
         hi = step_delay * self.duty_cycle
         lo = step_delay - hi
         try:
-            GPIO_IF.output(self.pin_step, GPIO_IF.HIGH)
-            time.sleep(max(hi, 0.00005))
-            GPIO_IF.output(self.pin_step, GPIO_IF.LOW)
-            time.sleep(max(lo, 0.00005))
+            self.gpio.write(self.pin_step, 1)
+            aborted = self.clock.wait(self._abort, max(hi, 0.00005))
+            self.gpio.write(self.pin_step, 0)
+            if aborted:
+                return False
+            return not self.clock.wait(self._abort, max(lo, 0.00005))
         except Exception as e:  # pragma: no cover
             self.last_error = f"pulse failed: {e}"
+            return True
 
     # --- Public API --------------------------------------------------------
     def status(self) -> Dict[str, Optional[object]]:
@@ -133,28 +153,60 @@ class StepperController:
                 "last_error": self.last_error,
                 "steps_per_rev": self.steps_per_rev,
                 "default_rpm": self.default_rpm,
+                "last_stop_latency_ms": _ms(self.last_stop_latency),
+                "max_stop_latency_ms": _ms(self.max_stop_latency),
+                "gpio": self.gpio.info(),
+                "homing_required": self.journal.homing_required if self.journal else None,
+                "journal": self.journal.status() if self.journal else None,
             }
 
     def enable(self) -> None:
         with self._lock:
             self._write_enable(True)
+        if self.journal is not None:
+            self.journal.set_enabled(True)
 
     def disable(self) -> None:
         with self._lock:
             if self.moving:
                 raise RuntimeError("cannot disable while moving; abort first")
             self._write_enable(False)
+        if self.journal is not None:
+            self.journal.set_enabled(False)
+
+    def set_position(self, position: int) -> None:
+        """Declare where the motor is (e.g. after homing it by hand)."""
+        with self._lock:
+            if self.moving:
+                raise RuntimeError("cannot set the position while moving; abort first")
+            self.position = int(position)
+        if self.journal is not None:
+            self.journal.set_position(int(position))
 
     def abort(self) -> None:
+        """Stop the current move within one pulse without waiting for the worker.
+
+        Only sets the abort event, so it is safe to call straight from the
+        event loop; the worker drops STEP low, records the stop latency and
+        clears ``moving`` itself.
+        """
+        if self._abort_at is None:
+            self._abort_at = self.clock.now()
         self._abort.set()
-        t = None
-        with self._lock:
-            t = self._worker
-        if t and t.is_alive():
-            t.join(timeout=1.5)
-        self._abort.clear()
-        with self._lock:
-            self.moving = False
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until the current move's worker has finished."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        return not self.moving
+
+    def _record_stop(self) -> None:
+        if self._abort_at is None:
+            return
+        latency = self.clock.now() - self._abort_at
+        self.last_stop_latency = latency
+        self.max_stop_latency = max(latency, self.max_stop_latency or 0.0)
 
     def step(self, steps: int, rpm: Optional[float] = None, forward: Optional[bool] = None) -> None:
         if steps == 0:
@@ -167,30 +219,64 @@ class StepperController:
         step_delay = 1.0 / sps
         direction = forward if forward is not None else (steps > 0)
 
+        total = abs(int(steps))
+        sign = 1 if direction else -1
+        journal = self.journal
+
         def run():
             try:
                 with self._lock:
                     self.moving = True
                     self.last_error = None
                 self._set_dir(direction)
-                total = abs(int(steps))
-                sign = 1 if direction else -1
                 for _ in range(total):
                     if self._abort.is_set():
                         break
-                    self._pulse(step_delay)
+                    completed = self._pulse(step_delay)
                     with self._lock:
                         self.position += sign
+                    if journal is not None:
+                        journal.progress(self.position)
+                    if not completed:
+                        break
             except Exception as e:  # pragma: no cover
                 with self._lock:
                     self.last_error = str(e)
             finally:
+                with self._lock:
+                    if self._abort.is_set():
+                        self._record_stop()
+                if journal is not None:
+                    # fsync outside the lock; status() runs on the event loop
+                    try:
+                        journal.end_move(self.position, aborted=self._abort.is_set())
+                    except OSError as e:  # pragma: no cover
+                        self.last_error = f"journal write failed: {e}"
                 with self._lock:
                     self.moving = False
 
+        # A just-aborted worker wakes from its pulse wait immediately; let it
+        # exit instead of answering "already moving" to a follow-up command.
+        prev = self._worker
+        if self._abort.is_set() and prev is not None and prev.is_alive():
+            prev.join(timeout=0.1)
+
         with self._lock:
             if self.moving:
                 raise RuntimeError("already moving")
+            self._abort.clear()
+            self._abort_at = None
+            self.moving = True  # claim before the thread starts so a racing step() sees it
+            start = self.position
+        if journal is not None:
+            # Durable before the first pulse, so a crash mid-move is detected
+            try:
+                journal.begin_move(start, start + sign * total)
+            except OSError as e:
+                with self._lock:
+                    self.moving = False
+                raise RuntimeError(f"journal write failed: {e}")
+        with self._lock:
             self._worker = threading.Thread(target=run, daemon=True)
             self._worker.start()
 
@@ -198,12 +284,14 @@ class StepperController:
 # --- Singleton controller (env-configurable) -------------------------------
 # GPIO Pin Configuration (BCM numbering):
 # You can set these via environment variables to match your wiring:
+#   GPIO_BACKEND - auto|lgpio|gpiod|rpigpio|mock (see app/services/gpio.py)
 #   VALVE_PIN_STEP or STEPPER_PIN_STEP - GPIO pin for STEP signal (default: 23)
 #   VALVE_PIN_DIR or STEPPER_PIN_DIR   - GPIO pin for DIR signal (default: 24)
 #   VALVE_PIN_ENABLE or STEPPER_PIN_ENABLE - GPIO pin for ENABLE signal (default: 18, set to -1 to disable)
 #   STEPPER_STEPS_PER_REV - Steps per revolution for your motor (default: 200)
 #   STEPPER_DEFAULT_RPM - Default rotation speed (default: 60)
 #   STEPPER_INVERT_ENABLE - Set to 0 if your driver uses active-high enable (default: 1)
+#   STEPPER_JOURNAL - Position journal file (default: data/stepper.journal; empty disables)
 
 PIN_STEP = int(os.getenv("VALVE_PIN_STEP", os.getenv("STEPPER_PIN_STEP", os.getenv("PIN_STEP", "23"))))
 PIN_DIR = int(os.getenv("VALVE_PIN_DIR", os.getenv("STEPPER_PIN_DIR", os.getenv("PIN_DIR", "24"))))
@@ -213,50 +301,95 @@ STEPS_PER_REV = int(os.getenv("STEPPER_STEPS_PER_REV", "200"))
 DEFAULT_RPM = float(os.getenv("STEPPER_DEFAULT_RPM", "60"))
 INVERT_ENABLE = os.getenv("STEPPER_INVERT_ENABLE", "1") not in ("0", "false", "False")
 
-_controller = StepperController(
-    pin_step=PIN_STEP,
-    pin_dir=PIN_DIR,
-    pin_enable=PIN_ENABLE_INT,
-    steps_per_rev=STEPS_PER_REV,
-    default_rpm=DEFAULT_RPM,
-    invert_enable=INVERT_ENABLE,
-)
+# Created on first use (or by the start-up warm-up) so importing the API
+# doesn't touch the GPIO pins.
+_controller: Optional[StepperController] = None
+_controller_lock = threading.Lock()
+
+
+def get_controller() -> StepperController:
+    global _controller
+    if _controller is not None:
+        return _controller
+    with _controller_lock:
+        if _controller is None:
+            with startup.phase("stepper.init"):
+                _controller = StepperController(
+                    pin_step=PIN_STEP,
+                    pin_dir=PIN_DIR,
+                    pin_enable=PIN_ENABLE_INT,
+                    steps_per_rev=STEPS_PER_REV,
+                    default_rpm=DEFAULT_RPM,
+                    invert_enable=INVERT_ENABLE,
+                    journal=PositionJournal(STEPPER_JOURNAL) if STEPPER_JOURNAL else None,
+                )
+        return _controller
 
 
 # --- Routes ----------------------------------------------------------------
+async def _motion(fn, *args, **kwargs):
+    """Run a controller call on the dedicated motion executor.
+
+    Camera streams and stats probes have their own pools, so they can never
+    queue ahead of an abort here.
+    """
+    try:
+        return await run_in("motion", fn, *args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @router.get("/healthz")
-def healthz() -> Dict[str, str]:
+async def healthz() -> Dict[str, str]:
     return {"status": "ok"}
 
 
 @router.get("/status")
-def status() -> Dict[str, Optional[object]]:
+async def status() -> Dict[str, Optional[object]]:
+    if _controller is None:
+        # First use claims the GPIO pins and replays the journal: not on the event loop.
+        return await _motion(lambda: get_controller().status())
     return _controller.status()
 
 
 @router.post("/enable")
-def api_enable() -> Dict[str, str]:
-    _controller.enable()
+async def api_enable() -> Dict[str, str]:
+    await _motion(lambda: get_controller().enable())
     return {"result": "enabled"}
 
 
 @router.post("/disable")
-def api_disable() -> Dict[str, str]:
+async def api_disable() -> Dict[str, str]:
     try:
-        _controller.disable()
+        await _motion(lambda: get_controller().disable())
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
     return {"result": "disabled"}
 
 
 @router.post("/abort")
-def api_abort() -> Dict[str, str]:
-    _controller.abort()
+async def api_abort() -> Dict[str, str]:
+    # Emergency stop fast path: only sets an event, so it runs inline on the
+    # event loop instead of queueing behind other motion work. A controller
+    # that was never created has nothing to stop.
+    if _controller is not None:
+        _controller.abort()
     return {"result": "aborted"}
 
 
+@router.post("/position")
+async def api_set_position(
+    steps: int = Query(0, description="Where the motor is now, in steps (0 after homing)"),
+) -> Dict[str, object]:
+    try:
+        await _motion(lambda: get_controller().set_position(steps))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"result": "position set", "position_steps": steps}
+
+
 @router.post("/step")
-def api_step(
+async def api_step(
     steps: int = Query(..., description="Number of steps; negative = reverse"),
     rpm: Optional[float] = Query(None, description="Speed in RPM"),
     direction: Optional[str] = Query(None, pattern="^(fwd|rev)$", description="Override direction"),
@@ -267,10 +400,10 @@ def api_step(
     elif direction == "rev":
         forward = False
     try:
-        _controller.step(steps=steps, rpm=rpm, forward=forward)
+        await _motion(lambda: get_controller().step(steps=steps, rpm=rpm, forward=forward))
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
-    return {"result": "moving", "requested_steps": steps, "rpm": rpm or _controller.default_rpm}
+    return {"result": "moving", "requested_steps": steps, "rpm": rpm or get_controller().default_rpm}
 
 
 # Convenience aliases for UI buttons
@@ -279,18 +412,78 @@ CLOSE_STEPS = int(os.getenv("STEPPER_CLOSE_STEPS", "-200"))
 
 
 @router.post("/open")
-def api_open(rpm: Optional[float] = Query(None)) -> Dict[str, object]:
+async def api_open(rpm: Optional[float] = Query(None)) -> Dict[str, object]:
     try:
-        _controller.step(steps=abs(OPEN_STEPS), rpm=rpm, forward=True)
+        await _motion(lambda: get_controller().step(steps=abs(OPEN_STEPS), rpm=rpm, forward=True))
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
     return {"result": "moving-open", "steps": abs(OPEN_STEPS)}
 
 
 @router.post("/close")
-def api_close(rpm: Optional[float] = Query(None)) -> Dict[str, object]:
+async def api_close(rpm: Optional[float] = Query(None)) -> Dict[str, object]:
     try:
-        _controller.step(steps=abs(CLOSE_STEPS), rpm=rpm, forward=False)
+        await _motion(lambda: get_controller().step(steps=abs(CLOSE_STEPS), rpm=rpm, forward=False))
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
     return {"result": "moving-close", "steps": abs(CLOSE_STEPS)}
+
+
+# --- Multi-axis rig (STEPPER_AXES) -------------------------------------------
+# Per-axis views of the coordinated controller in app/services/motion.py; a
+# single-axis move here is a coordinated move of one axis, and /abort stops
+# whatever move is running. Combined moves are POST /api/motion/move. The
+# controller is created (pins claimed) on the motion executor, never inline.
+def _axis_errors(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except (MotionUnavailable, GpioUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{axis}/status")
+async def axis_status(axis: str) -> Dict[str, object]:
+    motion = motion_svc._motion
+    if motion is None:
+        return await _motion(_axis_errors, lambda: get_motion().axis_status(axis))
+    return _axis_errors(motion.axis_status, axis)
+
+
+@router.post("/{axis}/enable")
+async def axis_enable(axis: str) -> Dict[str, str]:
+    await _motion(_axis_errors, lambda: get_motion().set_enabled(True, [axis]))
+    return {"result": "enabled", "axis": axis}
+
+
+@router.post("/{axis}/disable")
+async def axis_disable(axis: str) -> Dict[str, str]:
+    await _motion(_axis_errors, lambda: get_motion().set_enabled(False, [axis]))
+    return {"result": "disabled", "axis": axis}
+
+
+@router.post("/{axis}/abort")
+async def axis_abort(axis: str) -> Dict[str, str]:
+    motion = motion_svc._motion
+    if motion is None:
+        # Nothing can be moving yet; still 404 an unknown axis.
+        await _motion(_axis_errors, lambda: get_motion().axis_status(axis))
+        return {"result": "aborted", "axis": axis}
+    _axis_errors(motion.axis_status, axis)  # 404 for an unknown axis
+    motion.abort()
+    return {"result": "aborted", "axis": axis}
+
+
+@router.post("/{axis}/step")
+async def axis_step(
+    axis: str,
+    steps: int = Query(..., description="Number of steps; negative = reverse"),
+    rpm: Optional[float] = Query(None, description="Speed in RPM"),
+) -> Dict[str, object]:
+    plan = await _motion(_axis_errors, lambda: get_motion().move({axis: steps}, rpm=rpm))
+    return {"result": "moving", "axis": axis, "plan": plan}
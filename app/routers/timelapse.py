@@ -0,0 +1,189 @@
+"""Time-lapse recording and playback.
+
+With ``TIMELAPSE_INTERVAL_S`` > 0 the API records one frame per interval
+from each camera in ``TIMELAPSE_CAMERAS`` (default: all) into a segmented
+archive under ``TIMELAPSE_DIR`` (see :mod:`app.services.timelapse`).
+Recording taps the camera's live frame stream and keeps the camera running;
+``/camera/stop`` pauses it. Archives can be queried whether or not
+recording is enabled:
+
+    GET /timelapse/status
+    GET /timelapse/{camera_id}/frames?start=&end=&step=    frame timestamps
+    GET /timelapse/{camera_id}/frame?ts=                   scrub: frame at or before ts
+    GET /timelapse/{camera_id}/play.mjpg?start=&end=&step=&fps=
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from ..services.executors import ExecutorSaturated, run_in
+from ..services.log import get_logger
+from ..services.startup import PROJECT_ROOT
+from ..services.timelapse import TimelapseArchive
+from .camera import CAMERA_CONFIGS, NO_STORE, get_camera
+
+router = APIRouter(prefix="/timelapse", tags=["timelapse"])
+log = get_logger("timelapse")
+
+TIMELAPSE_DIR = Path(os.getenv("TIMELAPSE_DIR", str(PROJECT_ROOT / "data" / "timelapse")))
+TIMELAPSE_INTERVAL_S = float(os.getenv("TIMELAPSE_INTERVAL_S", "0"))
+TIMELAPSE_CAMERAS = [c.strip() for c in os.getenv("TIMELAPSE_CAMERAS", "").split(",") if c.strip()]
+TIMELAPSE_BATCH_MB = float(os.getenv("TIMELAPSE_BATCH_MB", "4"))
+TIMELAPSE_FLUSH_S = float(os.getenv("TIMELAPSE_FLUSH_S", "300"))
+TIMELAPSE_SEGMENT_MB = float(os.getenv("TIMELAPSE_SEGMENT_MB", "256"))
+TIMELAPSE_SEGMENT_S = float(os.getenv("TIMELAPSE_SEGMENT_S", "86400"))
+TIMELAPSE_RETENTION_DAYS = float(os.getenv("TIMELAPSE_RETENTION_DAYS", "30"))
+TIMELAPSE_MAX_MB = float(os.getenv("TIMELAPSE_MAX_MB", "0"))
+
+_archives: Dict[str, TimelapseArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(camera_id: str) -> TimelapseArchive:
+    """Archive for ``camera_id``, loading its index on first use (blocking)."""
+    archive = _archives.get(camera_id)
+    if archive is not None:
+        return archive
+    with _archives_lock:
+        archive = _archives.get(camera_id)
+        if archive is None:
+            archive = TimelapseArchive(
+                TIMELAPSE_DIR / camera_id,
+                interval_s=TIMELAPSE_INTERVAL_S or 60.0,
+                batch_bytes=int(TIMELAPSE_BATCH_MB * (1 << 20)),
+                flush_s=TIMELAPSE_FLUSH_S,
+                segment_bytes=int(TIMELAPSE_SEGMENT_MB * (1 << 20)),
+                segment_s=TIMELAPSE_SEGMENT_S,
+                retention_days=TIMELAPSE_RETENTION_DAYS,
+                max_bytes=int(TIMELAPSE_MAX_MB * (1 << 20)),
+            )
+            _archives[camera_id] = archive
+        return archive
+
+
+def recording_cameras() -> List[str]:
+    if TIMELAPSE_INTERVAL_S <= 0:
+        return []
+    return [c for c in (TIMELAPSE_CAMERAS or list(CAMERA_CONFIGS)) if c in CAMERA_CONFIGS]
+
+
+def start_recording(camera_id: str) -> None:
+    """Attach the archive to the camera's frame stream and start both (blocking)."""
+    archive = get_archive(camera_id)
+    camera = get_camera(camera_id)
+    if archive.tap not in camera.output.taps:
+        camera.output.taps.append(archive.tap)
+    archive.start()
+    camera.start()
+    log.info("Time-lapse recording %s every %gs into %s", camera_id, archive.interval_s, archive.directory)
+
+
+def stop_recording() -> None:
+    """Flush and stop every archive writer (on API shutdown)."""
+    for archive in list(_archives.values()):
+        archive.stop()
+
+
+async def _archive(camera_id: str) -> TimelapseArchive:
+    if camera_id not in CAMERA_CONFIGS:
+        raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_id}'")
+    archive = _archives.get(camera_id)
+    if archive is not None:
+        return archive
+    try:
+        return await run_in("archive", get_archive, camera_id)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/status")
+async def timelapse_status() -> Dict[str, Any]:
+    """Recording settings and per-camera archive size, span and write batching."""
+    cameras = {}
+    for camera_id in CAMERA_CONFIGS:
+        cameras[camera_id] = (await _archive(camera_id)).status()
+    return {
+        "interval_s": TIMELAPSE_INTERVAL_S,
+        "recording": recording_cameras(),
+        "directory": str(TIMELAPSE_DIR),
+        "retention_days": TIMELAPSE_RETENTION_DAYS,
+        "max_mb": TIMELAPSE_MAX_MB,
+        "cameras": cameras,
+    }
+
+
+@router.get("/{camera_id}/frames")
+async def timelapse_frames(
+    camera_id: str,
+    start: float = Query(0.0, description="Unix time (s)"),
+    end: Optional[float] = Query(None, description="Unix time (s); default now"),
+    step: float = Query(0.0, ge=0, description="Minimum spacing between returned frames (s)"),
+    limit: int = Query(10000, ge=1, le=100000),
+) -> Dict[str, Any]:
+    """Timestamps of archived frames in [start, end], for scrubbing UIs."""
+    archive = await _archive(camera_id)
+    times = archive.timestamps(start, end if end is not None else time.time(), step, limit)
+    return {"camera": camera_id, "count": len(times), "timestamps": times}
+
+
+@router.get("/{camera_id}/frame")
+async def timelapse_frame(camera_id: str, ts: float = Query(..., description="Unix time (s)")):
+    """The archived frame at or before ``ts`` (first frame if ``ts`` is earlier)."""
+    archive = await _archive(camera_id)
+    try:
+        found = await run_in("archive", archive.frame_at, ts)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except FileNotFoundError:  # segment removed by retention meanwhile
+        found = None
+    if found is None:
+        raise HTTPException(status_code=404, detail="No time-lapse frames recorded")
+    frame_ts, jpeg = found
+    newest = archive.timestamps(frame_ts, float("inf"), limit=2)
+    # Only the answer for "the latest frame" can change; older lookups are stable.
+    cache = NO_STORE if len(newest) < 2 else {"Cache-Control": "private, max-age=86400"}
+    return Response(content=jpeg, media_type="image/jpeg", headers={**cache, "X-Frame-Timestamp": f"{frame_ts:.3f}"})
+
+
+@router.get("/{camera_id}/play.mjpg")
+async def timelapse_play(
+    camera_id: str,
+    start: float = Query(0.0),
+    end: Optional[float] = Query(None),
+    step: float = Query(0.0, ge=0, description="Archive seconds between played frames"),
+    fps: float = Query(10.0, gt=0, le=60),
+):
+    """Play a range of the archive back as an MJPEG stream."""
+    archive = await _archive(camera_id)
+    times = archive.timestamps(start, end if end is not None else time.time(), step, limit=100000)
+    if not times:
+        raise HTTPException(status_code=404, detail="No time-lapse frames in range")
+
+    async def frames():
+        for ts in times:
+            try:
+                found = await run_in("archive", archive.frame_at, ts)
+            except (ExecutorSaturated, FileNotFoundError):
+                found = None
+            if found is not None:
+                jpeg = found[1]
+                yield (
+                    b"--FRAME\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(jpeg)}\r\nX-Frame-Timestamp: {found[0]:.3f}\r\n\r\n".encode()
+                    + jpeg + b"\r\n"
+                )
+            await asyncio.sleep(1.0 / fps)
+
+    return StreamingResponse(
+        frames(),
+        media_type="multipart/x-mixed-replace; boundary=FRAME",
+        headers={**NO_STORE, "X-Accel-Buffering": "no", "X-Frame-Count": str(len(times))},
+    )
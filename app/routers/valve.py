@@ -1,17 +1,26 @@
-"""Simple valve control API - sends 'r' and 'l' through serial port.
+"""Simple valve control API - sends 'r', 'l' and 's' through serial port.
 
 This API sends single characters to /dev/ttyACM0 based on button presses:
 - 'r' for open valve
 - 'l' for close valve
+- 's' for emergency stop (sent ahead of queued writes)
 
 One-way communication only - no reading from the serial port.
-The serial port is kept open indefinitely for better performance.
+The serial port is opened at start-up and kept open indefinitely.
+Writes run on the single-worker ``serial`` executor, which keeps them in
+order and off the threadpool shared by the other routes; stops use the
+separate ``estop`` executor so they never wait behind queued writes.
 """
 
 import os
 import atexit
+import threading
 
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+
+from ..services.clips import freeze_all
+from ..services.executors import ExecutorSaturated, get_executor, run_in
+from ..services.log import get_logger
 
 try:
     import serial
@@ -19,21 +28,32 @@ except ImportError:
     serial = None
 
 router = APIRouter(prefix="/api/valve", tags=["valve"])
+log = get_logger("valve")
 
 # Configuration
 DEVICE_PATH = os.getenv("VALVE_SERIAL_DEVICE", "/dev/ttyACM0")
 BAUD_RATE = int(os.getenv("VALVE_SERIAL_BAUD", "115200"))
 WRITE_TIMEOUT = 0.5
+STOP_CHAR = "s"
 
 # Global serial connection - kept open indefinitely
 _serial_connection = None
+_connection_lock = threading.Lock()
+# Held across "check generation + write" by queued writes and by the stop
+_write_lock = threading.Lock()
+# Bumped by every stop; queued writes from an older generation are dropped.
+_write_generation = 0
 
 def _get_serial_connection():
     """Get or create the persistent serial connection."""
+    with _connection_lock:
+        return _open_serial_connection()
+
+def _open_serial_connection():
     global _serial_connection
     
     if serial is None:
-        print("[valve] pyserial not installed; skipping serial write", flush=True)
+        log.warning("pyserial not installed; skipping serial write")
         return None
     
     # If connection exists and is open, return it
@@ -52,7 +72,7 @@ def _get_serial_connection():
         return _serial_connection
     except Exception as e:
         # Best-effort: log and return None so we never raise to the client.
-        print(f"[valve] failed to open serial {DEVICE_PATH}: {e}", flush=True)
+        log.error("failed to open serial %s: %s", DEVICE_PATH, e)
         _serial_connection = None
         return None
 
@@ -68,44 +88,93 @@ def _close_serial_connection():
 # Register cleanup on exit
 atexit.register(_close_serial_connection)
 
-def _send_char(ch: str) -> None:
-    """Send a single character through the persistent serial port (best effort)."""
+def open_port() -> bool:
+    """Open the port ahead of the first command (called by the start-up warm-up).
+
+    Opening resets the Arduino, so it is done here and on the write path,
+    never by a stop.
+    """
+    return _get_serial_connection() is not None
+
+def _write_locked(ch: str) -> None:
+    """Write one character; the caller holds ``_write_lock``."""
     ser = _get_serial_connection()
     if ser is None:
-        print(f"[valve] no serial connection; skipped write '{ch}'", flush=True)
+        log.warning("no serial connection; skipped write '%s'", ch)
         return
-
     try:
         ser.write(ch.encode("utf-8"))
         ser.flush()
     except Exception as e:  # Swallow errors to keep API one-way OK
         global _serial_connection
         _serial_connection = None
-        print(f"[valve] write failed, clearing connection: {e}", flush=True)
+        log.error("write failed, clearing connection: %s", e)
+        freeze_all(f"valve write '{ch}' failed: {e}")
+
+def _send_stop() -> bool:
+    """Send the stop character ahead of every queued write.
+
+    The generation is bumped first, so every queued write that has not yet
+    checked it is dropped; ``_write_lock``, which a queued write holds
+    across its check and write, then waits out the one write that already
+    passed, so no open/close can land after the 's'. Bytes still in the OS
+    output buffer are discarded. Runs on the ``estop`` executor (one worker,
+    so bumps never race): it may wait for that in-flight write, and must not
+    open (and so reset) the port.
+    """
+    global _write_generation
+    _write_generation += 1
+    with _write_lock:
+        ser = _serial_connection
+        if ser is None or not ser.is_open:
+            log.error("serial port not open; stop not sent", extra={"rate_limit": False})
+            return False
+        try:
+            ser.reset_output_buffer()
+        except Exception:
+            pass
+        _write_locked(STOP_CHAR)
+        return _serial_connection is not None
+
+def _submit_write(ch: str, action: str) -> None:
+    """Queue a fire-and-forget write on the serial executor."""
+    generation = _write_generation
+
+    def _write():
+        with _write_lock:
+            if generation != _write_generation:
+                log.info("dropped queued %s write after stop", action)
+                return
+            try:
+                _write_locked(ch)
+            except Exception as exc:  # noqa: BLE001 - log and swallow to keep one-way behavior
+                # Best-effort fire-and-forget; log for diagnostics without surfacing errors to the client.
+                log.error("%s write failed: %s", action, exc)
+
+    try:
+        get_executor("serial").submit(_write)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=f"valve serial queue full: {e}")
 
 @router.post("/open")
-def valve_open(background_tasks: BackgroundTasks) -> str:
+async def valve_open() -> str:
     """Send 'r' character to open the valve without waiting for a response."""
-
-    def _write_open():
-        try:
-            _send_char("r")
-        except Exception as exc:  # noqa: BLE001 - log and swallow to keep one-way behavior
-            # Best-effort fire-and-forget; log for diagnostics without surfacing errors to the client.
-            print(f"[valve] open write failed: {exc}", flush=True)
-
-    background_tasks.add_task(_write_open)
+    _submit_write("r", "open")
     return "OK"
 
 @router.post("/close")
-def valve_close(background_tasks: BackgroundTasks) -> str:
+async def valve_close() -> str:
     """Send 'l' character to close the valve without waiting for a response."""
+    _submit_write("l", "close")
+    return "OK"
 
-    def _write_close():
-        try:
-            _send_char("l")
-        except Exception as exc:  # noqa: BLE001 - log and swallow to keep one-way behavior
-            print(f"[valve] close write failed: {exc}", flush=True)
-
-    background_tasks.add_task(_write_close)
+@router.post("/stop")
+async def valve_stop() -> str:
+    """Send 's' to halt the valve motor immediately, ahead of queued writes."""
+    try:
+        sent = await run_in("estop", _send_stop)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=f"valve stop queue full: {e}")
+    if not sent:
+        raise HTTPException(status_code=503, detail="valve serial port not open; stop not sent")
     return "OK"
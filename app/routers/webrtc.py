@@ -4,18 +4,18 @@ import os
 import time
 import uuid
 from typing import Any, Dict, List, Optional
-from pathlib import Path
 
-import jwt
 import json
 import socket
 import urllib.request
 from fastapi import APIRouter, HTTPException, Query
 
-# Load environment variables early
-from dotenv import load_dotenv
-project_root = Path(__file__).parent.parent.parent
-load_dotenv(project_root / ".env")
+from ..services.executors import ExecutorSaturated, run_in
+from ..services.ingress import IngressManager, IngressUnavailable
+from ..services.startup import load_env
+
+# Load environment variables early (no-op when app.main already did)
+load_env()
 
 router = APIRouter(prefix="/webrtc", tags=["webrtc"])
 
@@ -63,13 +63,15 @@ def _build_access_token(identity: str, room: str, can_publish: bool = False) ->
             "canPublishData": True,
         },
     }
+    import jwt  # deferred: PyJWT (and its crypto backends) only matter once a token is minted
+
     token = jwt.encode(claims, LIVEKIT_API_SECRET, algorithm="HS256")
     # PyJWT >= 2 returns str
     return token  # type: ignore[return-value]
 
 
 @router.get("/config")
-def get_config() -> Dict[str, Any]:
+async def get_config() -> Dict[str, Any]:
     host = LIVEKIT_HOST.strip()
     # If not configured, or clearly local/http, use proxied path "/livekit" and let frontend prefix origin
     if not host or host.startswith("http://localhost") or host.startswith("http://127.0.0.1"):
@@ -87,7 +89,7 @@ def get_config() -> Dict[str, Any]:
 
 
 @router.get("/token")
-def get_token(
+async def get_token(
     room: str = Query("plastination", description="Room name to join"),
     identity: Optional[str] = Query(None, description="Client identity; autogenerated if blank"),
     role: str = Query("viewer", description="viewer|publisher"),
@@ -104,48 +106,46 @@ def get_token(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+_ingress: Optional[IngressManager] = None
+
+
+def get_ingress_manager() -> IngressManager:
+    """One manager (and one pooled LiveKit API client) for the process."""
+    global _ingress
+    if _ingress is None:
+        _ingress = IngressManager(LIVEKIT_HOST, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    return _ingress
+
+
+async def close_ingress() -> None:
+    if _ingress is not None:
+        await _ingress.aclose()
+
+
 @router.post("/ingress/create")
-def create_rtmp_ingress(
+async def create_rtmp_ingress(
     room: str = Query("plastination"),
     name: str = Query("pi-cam"),
+    prune: bool = Query(False, description="Delete duplicate ingresses with the same name and room"),
 ) -> Dict[str, str]:
-    """Create an RTMP ingress on the LiveKit Ingress service and return URL + stream key.
-    Requires LIVEKIT_HOST, LIVEKIT_API_KEY, LIVEKIT_API_SECRET and livekit-api package.
-    """
-    try:
-        from livekit import api as lk  # type: ignore
-    except Exception as e:
-        raise HTTPException(status_code=501, detail=f"livekit-api not installed: {e}")
-
-    host = LIVEKIT_HOST
-    if not host:
-        raise HTTPException(status_code=500, detail="LIVEKIT_HOST not configured")
-    if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
-        raise HTTPException(status_code=500, detail="LIVEKIT API credentials not configured")
+    """Return the RTMP ingress (URL + stream key) for ``name`` in ``room``.
 
+    Reuses the ingress LiveKit already has for that pair and only creates
+    one when there is none; ``source`` says which. Requires LIVEKIT_HOST,
+    LIVEKIT_API_KEY, LIVEKIT_API_SECRET and the livekit-api package.
+    """
     try:
-        client = lk.ApiClient(host=host, api_key=LIVEKIT_API_KEY, api_secret=LIVEKIT_API_SECRET)
-        req = lk.CreateIngressRequest(
-            input_type=lk.IngressInput.RTMP_INPUT,
-            name=name,
-            room_name=room,
-        )
-        resp = client.ingress.create_ingress(req)
-        return {
-            "rtmp_url": resp.rtmp.url,
-            "stream_key": resp.stream_key,
-            "room": room,
-            "ingress_id": resp.ingress_id,
-        }
+        return await get_ingress_manager().ensure(room, name, prune=prune)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except IngressUnavailable as e:
+        code = 501 if "not installed" in str(e) else 500
+        raise HTTPException(status_code=code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/health")
-def health() -> Dict[str, Any]:
-    """Return quick health summary for WebRTC setup.
-    Checks: env vars, reachability of LiveKit signaling endpoint, ICE servers presence.
-    """
+def _health() -> Dict[str, Any]:
     host_cfg = LIVEKIT_HOST.strip()
     effective_host = host_cfg or "/livekit"
     ice = _ice_servers()
@@ -193,11 +193,22 @@ def health() -> Dict[str, Any]:
     }
 
 
+@router.get("/health")
+async def health() -> Dict[str, Any]:
+    """Return quick health summary for WebRTC setup.
+    Checks: env vars, reachability of LiveKit signaling endpoint, ICE servers presence.
+    """
+    try:
+        return await run_in("network", _health)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @router.get("/diagnostics")
-def diagnostics() -> Dict[str, Any]:
+async def diagnostics() -> Dict[str, Any]:
     """More detailed diagnostics including token generation attempt (without exposing secret)."""
     diag: Dict[str, Any] = {}
-    h = health()
+    h = await health()
     diag.update(h)
     # Attempt a viewer token (won't expose secret)
     try:
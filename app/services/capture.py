@@ -0,0 +1,137 @@
+"""Capture daemon feeding the shared-memory frame bus.
+
+Owns the camera sensor and publishes every frame into the ring described in
+:mod:`app.services.framebus`, so the API (MJPEG stream, snapshots) and the
+WebRTC publisher can all run off a single capture. Run it as its own
+systemd service before the API and publisher::
+
+    python -m app.services.capture
+
+Environment variables (override defaults):
+  FRAMEBUS_NAME=uuplastination-frames
+  FRAMEBUS_FORMAT=jpeg        (jpeg | bgr)
+  FRAMEBUS_SLOTS=4
+  FRAMEBUS_SLOT_BYTES=        (defaults from resolution and format)
+  CAMERA_NUM=0
+  CAMERA_WIDTH=1920
+  CAMERA_HEIGHT=1080
+  CAMERA_FPS=30
+  CAMERA_SOURCE=/dev/video0   (OpenCV fallback, or a synthetic:... spec)
+  CAMERA_JPEG_QUALITY=85
+"""
+from __future__ import annotations
+
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+from .framebus import FORMAT_BGR, FORMAT_JPEG, FrameBusWriter
+from .log import get_logger
+from .publisher import CV2_AVAILABLE, PICAM_AVAILABLE, FrameSource
+from .synthetic import is_synthetic
+
+if PICAM_AVAILABLE:  # pragma: no cover - Pi only
+    from picamera2 import Picamera2  # type: ignore
+    from picamera2.encoders import MJPEGEncoder  # type: ignore
+    from picamera2.outputs import FileOutput  # type: ignore
+
+if CV2_AVAILABLE:
+    import cv2  # type: ignore
+
+
+FORMATS = {"jpeg": FORMAT_JPEG, "bgr": FORMAT_BGR}
+
+log = get_logger("capture")
+
+
+class _BusOutput:
+    """picamera2 output that hands each hardware-encoded JPEG to the bus."""
+
+    def __init__(self, writer: FrameBusWriter):
+        self.writer = writer
+
+    def write(self, buf):
+        self.writer.write(buf)
+        return len(buf)
+
+    def flush(self):
+        pass
+
+
+def _run_picamera_mjpeg(writer: FrameBusWriter, camera_num: int, fps: int, stop: threading.Event) -> None:
+    picam = Picamera2(camera_num)
+    config = picam.create_video_configuration(
+        main={"size": (writer.width, writer.height)},
+        controls={"FrameRate": fps},
+    )
+    picam.configure(config)
+    picam.start_recording(MJPEGEncoder(), FileOutput(_BusOutput(writer)))
+    log.info("picamera2 %s -> bus %s (hardware MJPEG)", camera_num, writer.name)
+    try:
+        stop.wait()
+    finally:
+        picam.stop_recording()
+
+
+def _run_frame_source(writer: FrameBusWriter, source: FrameSource, quality: int, stop: threading.Event) -> None:
+    source.start()
+    log.info("frame source -> bus %s (%s)", writer.name, "jpeg" if writer.fmt == FORMAT_JPEG else "bgr")
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality] if CV2_AVAILABLE else []
+    try:
+        while not stop.is_set():
+            frame = source.read()
+            ts = time.time()
+            if writer.fmt == FORMAT_JPEG:
+                if not CV2_AVAILABLE:
+                    raise RuntimeError("JPEG bus format needs OpenCV when picamera2 is unavailable")
+                ok, buf = cv2.imencode(".jpg", frame, params)
+                if not ok:
+                    continue
+                writer.write(buf, ts)
+            else:
+                writer.write(frame, ts)
+    finally:
+        source.stop()
+
+
+def run(stop: Optional[threading.Event] = None) -> None:
+    name = os.getenv("FRAMEBUS_NAME", "uuplastination-frames")
+    fmt = FORMATS.get(os.getenv("FRAMEBUS_FORMAT", "jpeg").lower(), FORMAT_JPEG)
+    slots = int(os.getenv("FRAMEBUS_SLOTS", "4"))
+    slot_bytes = os.getenv("FRAMEBUS_SLOT_BYTES", "")
+    camera_num = int(os.getenv("CAMERA_NUM", "0"))
+    width = int(os.getenv("CAMERA_WIDTH", "1920"))
+    height = int(os.getenv("CAMERA_HEIGHT", "1080"))
+    fps = int(os.getenv("CAMERA_FPS", "30"))
+    device = os.getenv("CAMERA_SOURCE", "/dev/video0")
+    quality = int(os.getenv("CAMERA_JPEG_QUALITY", "85"))
+
+    stop = stop or threading.Event()
+    writer = FrameBusWriter(
+        name, width, height, fmt=fmt, slots=slots,
+        slot_size=int(slot_bytes) if slot_bytes else None,
+    )
+    try:
+        if PICAM_AVAILABLE and fmt == FORMAT_JPEG and not is_synthetic(device):
+            _run_picamera_mjpeg(writer, camera_num, fps, stop)
+        else:
+            _run_frame_source(writer, FrameSource(width, height, fps, device), quality, stop)
+    finally:
+        if writer.dropped:
+            log.warning("%d frames dropped (larger than slot)", writer.dropped)
+        writer.close()
+
+
+def main():
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        run(stop)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Change detection for mostly-static camera scenes.
+
+The specimen chamber barely changes for hours, yet every captured frame
+used to be JPEG-encoded and pushed to every MJPEG client. A
+:class:`ChangeDetector` compares a small luma thumbnail of each frame (a
+strided subsample of the green channel, ~80x45 values, no copy of the
+full frame) with the thumbnail of the last frame that was sent. When the
+scene is static the camera only sends a keepalive frame every
+``CHANGE_KEEPALIVE_S``; the first changed frame is sent at once.
+
+A pixel counts as changed when its luma moved by more than
+``CHANGE_PIXEL_DELTA`` (sensor noise stays below it) and the frame counts
+as changed when more than ``CHANGE_MIN_AREA`` of the thumbnail did.
+Comparing against the last *sent* frame rather than the previous one
+means slow drifts (lighting, condensation) still get through once they
+add up.
+
+Skipped frames are costed with running averages of encode time and JPEG
+size, so the camera status reports the CPU and bandwidth saved.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+CHANGE_KEEPALIVE_S = float(os.getenv("CHANGE_KEEPALIVE_S", "2.0"))
+CHANGE_PIXEL_DELTA = int(os.getenv("CHANGE_PIXEL_DELTA", "12"))
+CHANGE_MIN_AREA = float(os.getenv("CHANGE_MIN_AREA", "0.002"))
+THUMB_WIDTH = 80
+
+
+class ChangeDetector:
+    def __init__(
+        self,
+        keepalive_s: float = CHANGE_KEEPALIVE_S,
+        pixel_delta: int = CHANGE_PIXEL_DELTA,
+        min_area: float = CHANGE_MIN_AREA,
+    ):
+        self.keepalive_s = keepalive_s
+        self.pixel_delta = pixel_delta
+        self.min_area = min_area
+        self._lock = threading.Lock()
+        self._reference: Optional[np.ndarray] = None
+        self._last_sent = 0.0
+        self.last_change = 0.0
+        self.frames = 0
+        self.sent_changed = 0
+        self.sent_keepalive = 0
+        self.skipped = 0
+        self.last_score = 0.0
+        self.detect_ms = 0.0  # EWMA cost of the comparison itself
+        self.encode_ms = 0.0  # EWMA of encode CPU per sent frame
+        self.jpeg_bytes = 0.0  # EWMA of JPEG size per sent frame
+        self.saved_cpu_s = 0.0
+        self.saved_bytes = 0.0
+
+    @staticmethod
+    def thumbnail(frame: np.ndarray) -> np.ndarray:
+        """Strided luma proxy (green channel of BGR, or the plane itself for grey)."""
+        step = max(1, frame.shape[1] // THUMB_WIDTH)
+        view = frame[::step, ::step]
+        if view.ndim == 3:
+            view = view[:, :, 1 if view.shape[2] >= 3 else 0]
+        return view.astype(np.int16)
+
+    def check(self, frame: np.ndarray, now: Optional[float] = None) -> Optional[str]:
+        """Decide whether ``frame`` should be encoded and sent.
+
+        Returns "change", "keepalive" or None (skip). The caller reports the
+        cost of sent frames with :meth:`sent` and skipped ones with :meth:`skip`.
+        """
+        now = time.monotonic() if now is None else now
+        t0 = time.perf_counter()
+        thumb = self.thumbnail(frame)
+        with self._lock:
+            self.frames += 1
+            ref = self._reference
+            if ref is None or ref.shape != thumb.shape:
+                score = 1.0
+            else:
+                score = float(np.count_nonzero(np.abs(thumb - ref) > self.pixel_delta)) / thumb.size
+            self.last_score = score
+            self.detect_ms += 0.05 * ((time.perf_counter() - t0) * 1000.0 - self.detect_ms)
+            if score > self.min_area:
+                reason = "change"
+                self.last_change = now
+                self.sent_changed += 1
+            elif now - self._last_sent >= self.keepalive_s:
+                reason = "keepalive"
+                self.sent_keepalive += 1
+            else:
+                return None
+            self._reference = thumb
+            self._last_sent = now
+            return reason
+
+    def sent(self, encode_s: float, jpeg_bytes: int) -> None:
+        with self._lock:
+            if not self.jpeg_bytes:  # seed the averages with the first frame
+                self.encode_ms, self.jpeg_bytes = encode_s * 1000.0, float(jpeg_bytes)
+                return
+            self.encode_ms += 0.1 * (encode_s * 1000.0 - self.encode_ms)
+            self.jpeg_bytes += 0.1 * (jpeg_bytes - self.jpeg_bytes)
+
+    def skip(self, clients: int) -> None:
+        """Account a skipped frame: one encode saved, and one JPEG per connected client."""
+        with self._lock:
+            self.skipped += 1
+            self.saved_cpu_s += self.encode_ms / 1000.0
+            self.saved_bytes += self.jpeg_bytes * clients
+
+    @property
+    def idle(self) -> bool:
+        return time.monotonic() - self.last_change > self.keepalive_s
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            sent = self.sent_changed + self.sent_keepalive
+            return {
+                "idle": self.idle,
+                "keepalive_s": self.keepalive_s,
+                "frames": self.frames,
+                "sent_changed": self.sent_changed,
+                "sent_keepalive": self.sent_keepalive,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+                "last_score": round(self.last_score, 4),
+                "detect_ms": round(self.detect_ms, 3),
+                "encode_ms_per_frame": round(self.encode_ms, 2),
+                "jpeg_bytes_per_frame": int(self.jpeg_bytes),
+                "saved_cpu_s": round(self.saved_cpu_s, 2),
+                "saved_mbytes": round(self.saved_bytes / 1e6, 2),
+                "sent": sent,
+            }
@@ -0,0 +1,211 @@
+"""In-memory ring of recent camera frames with incident freezing and export.
+
+Each camera keeps the last ``CLIP_BUFFER_S`` seconds of the JPEG frames it
+already publishes (a :class:`StreamingOutput` tap, so nothing is encoded
+twice), bounded by ``CLIP_BUFFER_MB``; whichever limit is hit first
+evicts the oldest frames. Frames are shared by reference, so a frozen clip
+costs no copy.
+
+:func:`freeze_all` is called when something goes wrong (a stepper
+``last_error``, a failed valve write, or ``POST /camera/clips/freeze``):
+every camera snapshots its ring into a frozen clip, keeps adding frames
+for ``CLIP_POST_S`` seconds after the event and then seals it. The newest
+``CLIP_MAX_FROZEN`` clips per camera are kept until the API restarts.
+
+Exports never re-encode: MJPEG is the frames concatenated (plays in
+ffplay/VLC); MP4 wraps the same JPEGs with ``ffmpeg -c:v copy``.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .log import get_logger
+
+log = get_logger("clips")
+
+CLIP_BUFFER_S = float(os.getenv("CLIP_BUFFER_S", "60"))
+CLIP_BUFFER_MB = float(os.getenv("CLIP_BUFFER_MB", "64"))
+CLIP_POST_S = float(os.getenv("CLIP_POST_S", "5"))
+CLIP_MAX_FROZEN = int(os.getenv("CLIP_MAX_FROZEN", "3"))
+
+Frame = Tuple[float, bytes]
+
+
+class ExportUnavailable(RuntimeError):
+    """The requested container cannot be written here (ffmpeg missing)."""
+
+
+class _Clip:
+    def __init__(self, clip_id: str, reason: str, ts: float, frames: List[Frame], post_s: float):
+        self.id = clip_id
+        self.reason = reason
+        self.ts = ts
+        self.frames = frames
+        self.until = ts + post_s
+
+    def info(self, now: float) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "reason": self.reason,
+            "ts": self.ts,
+            "sealed": now > self.until,
+            "frames": len(self.frames),
+            "bytes": sum(len(j) for _t, j in self.frames),
+            "start": self.frames[0][0] if self.frames else None,
+            "end": self.frames[-1][0] if self.frames else None,
+        }
+
+
+class ClipBuffer:
+    def __init__(
+        self,
+        name: str,
+        seconds: float = CLIP_BUFFER_S,
+        max_bytes: int = int(CLIP_BUFFER_MB * (1 << 20)),
+        post_s: float = CLIP_POST_S,
+        max_frozen: int = CLIP_MAX_FROZEN,
+    ):
+        self.name = name
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.post_s = post_s
+        self._lock = threading.Lock()
+        self._frames: Deque[Frame] = collections.deque()
+        self._bytes = 0
+        self._frozen: Deque[_Clip] = collections.deque(maxlen=max(1, max_frozen))
+        self._sealing: List[_Clip] = []
+        self._count = 0
+        self.evicted_for_memory = 0
+
+    def tap(self, jpeg: bytes, ts: float) -> None:
+        """Frame hook for StreamingOutput."""
+        if not isinstance(jpeg, bytes):  # picamera2 may hand over a reusable buffer
+            jpeg = bytes(jpeg)
+        with self._lock:
+            self._frames.append((ts, jpeg))
+            self._bytes += len(jpeg)
+            horizon = ts - self.seconds
+            frames = self._frames
+            while frames and (frames[0][0] < horizon or self._bytes > self.max_bytes):
+                if frames[0][0] >= horizon:
+                    self.evicted_for_memory += 1
+                self._bytes -= len(frames.popleft()[1])
+            if self._sealing:
+                for clip in self._sealing:
+                    if ts <= clip.until:
+                        clip.frames.append((ts, jpeg))
+                self._sealing = [c for c in self._sealing if ts <= c.until]
+
+    def window(self, start: float, end: float) -> List[Frame]:
+        with self._lock:
+            return [(t, j) for t, j in self._frames if start <= t <= end]
+
+    def freeze(self, reason: str, now: Optional[float] = None) -> Optional[str]:
+        """Keep the current ring (plus the next ``post_s`` seconds) as a clip.
+
+        Returns the clip id, or None while the previous incident's clip is
+        still collecting its post-event frames, or when the same error repeats
+        within one ring length (one clip per burst of errors).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if any(now <= c.until for c in self._sealing):
+                return None
+            last = self._frozen[-1] if self._frozen else None
+            if last is not None and last.reason == reason and now - last.ts < self.seconds:
+                return None
+            self._count += 1
+            clip = _Clip(f"{self.name}-{self._count}", reason, now, list(self._frames), self.post_s)
+            self._frozen.append(clip)
+            self._sealing.append(clip)
+        log.warning("froze %gs of camera %s: %s", self.seconds, self.name, reason)
+        return clip.id
+
+    def clips(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [c.info(now) for c in self._frozen]
+
+    def clip(self, clip_id: str) -> Optional[List[Frame]]:
+        with self._lock:
+            for c in self._frozen:
+                if c.id == clip_id:
+                    return list(c.frames)
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            frames = len(self._frames)
+            span = self._frames[-1][0] - self._frames[0][0] if frames > 1 else 0.0
+            return {
+                "seconds": self.seconds,
+                "max_mb": round(self.max_bytes / (1 << 20), 1),
+                "frames": frames,
+                "span_s": round(span, 2),
+                "mbytes": round(self._bytes / (1 << 20), 2),
+                "evicted_for_memory": self.evicted_for_memory,
+                "frozen": len(self._frozen),
+            }
+
+
+_buffers: Dict[str, ClipBuffer] = {}
+
+
+def register(buffer: ClipBuffer) -> None:
+    _buffers[buffer.name] = buffer
+
+
+def buffers() -> Dict[str, ClipBuffer]:
+    return dict(_buffers)
+
+
+def freeze_all(reason: str) -> List[str]:
+    """Freeze every camera's ring; safe to call from any thread, cheap when repeated."""
+    ids = []
+    for buffer in list(_buffers.values()):
+        clip_id = buffer.freeze(reason)
+        if clip_id:
+            ids.append(clip_id)
+    return ids
+
+
+def find_clip(clip_id: str) -> Optional[List[Frame]]:
+    for buffer in list(_buffers.values()):
+        frames = buffer.clip(clip_id)
+        if frames is not None:
+            return frames
+    return None
+
+
+def to_mjpeg(frames: List[Frame]) -> bytes:
+    return b"".join(jpeg for _ts, jpeg in frames)
+
+
+def to_mp4(frames: List[Frame]) -> bytes:
+    """Wrap the JPEGs in MP4 without re-encoding, at the clip's average frame rate."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise ExportUnavailable("ffmpeg is not installed; export as MJPEG instead")
+    span = frames[-1][0] - frames[0][0] if len(frames) > 1 else 0.0
+    fps = (len(frames) - 1) / span if span > 0 else 1.0
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "clip.mp4")
+        proc = subprocess.run(
+            [ffmpeg, "-loglevel", "error", "-f", "mjpeg", "-framerate", f"{fps:.3f}", "-i", "pipe:0",
+             "-c:v", "copy", "-movflags", "+faststart", out],
+            input=to_mjpeg(frames),
+            capture_output=True,
+            timeout=60,
+            check=False,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='replace').strip()}")
+        with open(out, "rb") as f:
+            return f.read()
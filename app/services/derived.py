@@ -0,0 +1,221 @@
+"""Resized / cropped snapshots derived from the camera's JPEG frames.
+
+``/camera/snapshot?w=&h=&crop=&fmt=`` serves a smaller image instead of the
+full frame. Each (camera, frame, parameters) result is computed once and
+kept in a byte-bounded LRU cache, so a wall of tiles polling the same view
+costs one derivation per source frame. Tiles tend to ask for a new frame
+at the same moment, so concurrent misses for one key share a single
+in-flight derivation (:meth:`DerivedCache.get_or_derive`).
+
+Decoding uses libjpeg's DCT-domain downscaling (``IMREAD_REDUCED_*``) when
+the target is at most 1/2, 1/4 or 1/8 of the source, which is several times
+cheaper than a full decode plus resize. A crop with no resize and JPEG
+output is done losslessly with ``jpegtran -crop`` when it is installed:
+the crop origin is moved down to the 16-pixel JPEG block (MCU) grid and the
+blocks are copied without re-encoding.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import os
+import shutil
+import subprocess
+import threading
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from .log import get_logger
+
+log = get_logger("camera")
+
+SNAPSHOT_CACHE_MB = float(os.getenv("SNAPSHOT_CACHE_MB", "16"))
+SNAPSHOT_QUALITY = int(os.getenv("SNAPSHOT_QUALITY", "80"))
+
+MCU = 16  # 4:2:0 JPEG block size; lossless crops start on this grid
+FORMATS = {"jpeg": (".jpg", "image/jpeg"), "webp": (".webp", "image/webp")}
+
+
+class Crop(NamedTuple):
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class Derived(NamedTuple):
+    data: bytes
+    media_type: str
+    crop: Optional[Crop]  # the crop actually applied (block-aligned when lossless)
+    lossless: bool
+
+
+def parse_crop(spec: Optional[str]) -> Optional[Crop]:
+    """``x,y,w,h`` in source pixels; raises ValueError on anything else."""
+    if not spec:
+        return None
+    parts = [int(p) for p in spec.split(",")]
+    if len(parts) != 4 or min(parts) < 0 or parts[2] == 0 or parts[3] == 0:
+        raise ValueError("crop must be x,y,w,h with a non-empty size")
+    return Crop(*parts)
+
+
+def jpeg_size(jpeg: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the JPEG's SOF marker, without decoding."""
+    i, n = 2, len(jpeg)
+    if jpeg[:2] != b"\xff\xd8":
+        return None
+    while i + 9 < n:
+        if jpeg[i] != 0xFF:
+            return None
+        marker = jpeg[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        length = int.from_bytes(jpeg[i + 2:i + 4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return int.from_bytes(jpeg[i + 7:i + 9], "big"), int.from_bytes(jpeg[i + 5:i + 7], "big")
+        i += 2 + length
+    return None
+
+
+def _jpegtran_crop(jpeg: bytes, crop: Crop, jpegtran: str) -> Optional[Tuple[bytes, Crop]]:
+    aligned = Crop(crop.x - crop.x % MCU, crop.y - crop.y % MCU, 0, 0)
+    aligned = aligned._replace(w=crop.x + crop.w - aligned.x, h=crop.y + crop.h - aligned.y)
+    proc = subprocess.run(
+        [jpegtran, "-crop", f"{aligned.w}x{aligned.h}+{aligned.x}+{aligned.y}", "-copy", "none", "-optimize"],
+        input=jpeg, capture_output=True, timeout=10, check=False,
+    )
+    if proc.returncode != 0 or not proc.stdout:
+        log.warning("jpegtran crop failed: %s", proc.stderr.decode(errors="replace").strip())
+        return None
+    return proc.stdout, aligned
+
+
+def derive(jpeg: bytes, width: Optional[int] = None, height: Optional[int] = None,
+           crop: Optional[Crop] = None, fmt: str = "jpeg", quality: int = SNAPSHOT_QUALITY) -> Derived:
+    """Crop, then fit into ``width`` x ``height`` (aspect kept, never upscaled), then encode as ``fmt``."""
+    import cv2  # type: ignore
+    import numpy as np
+
+    ext, media_type = FORMATS[fmt]
+    size = jpeg_size(jpeg)
+    if size is None:
+        raise ValueError("source frame is not a decodable JPEG")
+    src_w, src_h = size
+    if crop is not None:
+        if crop.x >= src_w or crop.y >= src_h:
+            raise ValueError(f"crop origin outside the {src_w}x{src_h} frame")
+        crop = Crop(crop.x, crop.y, min(crop.w, src_w - crop.x), min(crop.h, src_h - crop.y))
+    if crop is not None and width is None and height is None and fmt == "jpeg":
+        jpegtran = shutil.which("jpegtran")
+        if jpegtran is not None:
+            done = _jpegtran_crop(jpeg, crop, jpegtran)
+            if done is not None:
+                return Derived(done[0], media_type, done[1], True)
+
+    region = crop or Crop(0, 0, src_w, src_h)
+    scale = min((width or region.w) / region.w, (height or region.h) / region.h, 1.0)
+    out_size = (max(1, int(round(region.w * scale))), max(1, int(round(region.h * scale))))
+    # Let libjpeg scale in the DCT domain as far as the target allows.
+    flag, factor = cv2.IMREAD_COLOR, 1
+    for f, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if scale <= 1.0 / f:
+            flag, factor = reduced, f
+            break
+    img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), flag)
+    if img is None:
+        raise ValueError("source frame is not a decodable JPEG")
+    if crop is not None:
+        x, y = crop.x // factor, crop.y // factor
+        img = img[y:y + max(1, crop.h // factor), x:x + max(1, crop.w // factor)]
+    if (img.shape[1], img.shape[0]) != out_size:
+        img = cv2.resize(img, out_size, interpolation=cv2.INTER_AREA)
+    params = [int(cv2.IMWRITE_WEBP_QUALITY if fmt == "webp" else cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+    ok, out = cv2.imencode(ext, img, params)
+    if not ok:
+        raise RuntimeError(f"{fmt} encode failed")
+    return Derived(out.tobytes(), media_type, crop, False)
+
+
+class DerivedCache:
+    """Byte-bounded LRU of derived images keyed by (camera, frame seq, parameters)."""
+
+    def __init__(self, max_bytes: int = int(SNAPSHOT_CACHE_MB * (1 << 20))):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: "collections.OrderedDict[tuple, Derived]" = collections.OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # requests that awaited another request's derivation
+        self.evictions = 0
+        self._inflight: Dict[tuple, "asyncio.Future[Derived]"] = {}  # event-loop side only
+
+    def get(self, key: tuple) -> Optional[Derived]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key: tuple, item: Derived) -> None:
+        size = len(item.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.data)
+            self._items[key] = item
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _key, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                self.evictions += 1
+
+    async def get_or_derive(self, key: tuple, compute: Callable[[], Awaitable[Derived]]) -> Tuple[Derived, str]:
+        """The cached item for ``key``, computing it at most once however many ask.
+
+        Returns (item, "hit" | "shared" | "miss"). The derivation runs as its own
+        task, so a requester that disconnects does not cancel it for the others;
+        its exception (e.g. a saturated encoder) is raised to every requester.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            with self._lock:
+                self.hits += 1
+                self.shared += 1
+            return await asyncio.shield(task), "shared"
+        item = self.get(key)
+        if item is not None:
+            return item, "hit"
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._derived(key, t))
+        return await asyncio.shield(task), "miss"
+
+    def _derived(self, key: tuple, task: "asyncio.Future[Derived]") -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "mbytes": round(self._bytes / (1 << 20), 2),
+                "max_mb": round(self.max_bytes / (1 << 20), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "jpegtran": shutil.which("jpegtran") is not None,
+            }
+
+
+cache = DerivedCache()
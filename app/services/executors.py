@@ -0,0 +1,182 @@
+"""Bounded per-subsystem executors for blocking hardware and network I/O.
+
+Route handlers are ``async def`` and hand every blocking call to the executor
+of its subsystem instead of Starlette's shared default threadpool. Each
+executor has a fixed number of worker threads and a bounded queue, so a
+flood of camera streams or slow stats probes can only exhaust their own
+pool; the stepper's ``motion`` pool stays free for ``/api/stepper/abort``.
+
+Pools and their defaults (override with EXECUTOR_<NAME>_WORKERS / _QUEUE):
+
+    camera   16 workers, 32 queued   frame waits, camera start/stop
+    encode    2 workers,  2 queued   JPEG encodes, shared by every camera
+    stats     2 workers,  4 queued   psutil / systemctl / vcgencmd probes
+    serial    1 worker,  16 queued   valve serial writes (ordered)
+    estop     1 worker,   8 queued   valve stops (never behind queued writes)
+    network   4 workers,  8 queued   LiveKit reachability and API calls
+    motion    2 workers,  4 queued   stepper control (abort, enable, step)
+    profiler  1 worker,   0 queued   on-demand sampling profiles (one at a time)
+    archive   2 workers,  8 queued   time-lapse index loads and frame reads
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+DEFAULTS = {
+    "camera": (16, 32),
+    "encode": (2, 2),
+    "stats": (2, 4),
+    "serial": (1, 16),
+    "estop": (1, 8),
+    "network": (4, 8),
+    "motion": (2, 4),
+    "profiler": (1, 0),
+    "archive": (2, 8),
+}
+
+_WINDOW = 256  # recent samples kept for wait/run percentiles
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when an executor's workers and queue are all taken."""
+
+
+def _pct(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1)))] * 1000.0, 3)
+
+
+class BoundedExecutor:
+    """Thread pool with admission control and saturation metrics."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-io")
+        self._lock = threading.Lock()
+        self.pending = 0  # queued + running
+        self.active = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits: Deque[float] = collections.deque(maxlen=_WINDOW)
+        self._runs: Deque[float] = collections.deque(maxlen=_WINDOW)
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor saturated")
+            self.pending += 1
+            self.submitted += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+    def _wrap(self, fn: Callable[..., Any], args, kwargs) -> Callable[[], Any]:
+        queued_at = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                self.active += 1
+                self._waits.append(started - queued_at)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.pending -= 1
+                    self._runs.append(time.monotonic() - started)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        return call
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Fire-and-forget submission; raises ExecutorSaturated when full."""
+        self._admit()
+        return self._pool.submit(self._wrap(fn, args, kwargs))
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` on this pool and await its result."""
+        self._admit()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._wrap(fn, args, kwargs))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = self.pending - self.active
+            waits = list(self._waits)
+            runs = list(self._runs)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": queued,
+                "utilization": round(self.active / self.max_workers, 3),
+                "saturated": self.pending >= self.max_workers + self.max_queue,
+                "peak_pending": self.peak_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait_ms": {"p50": _pct(waits, 0.5), "p95": _pct(waits, 0.95), "max": _pct(waits, 1.0)},
+                "run_ms": {"p50": _pct(runs, 0.5), "p95": _pct(runs, 0.95), "max": _pct(runs, 1.0)},
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_registry_lock = threading.Lock()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    ex = _executors.get(name)
+    if ex is not None:
+        return ex
+    with _registry_lock:
+        ex = _executors.get(name)
+        if ex is None:
+            workers, queue = DEFAULTS.get(name, (2, 4))
+            key = name.upper()
+            ex = BoundedExecutor(
+                name,
+                int(os.getenv(f"EXECUTOR_{key}_WORKERS", str(workers))),
+                int(os.getenv(f"EXECUTOR_{key}_QUEUE", str(queue))),
+            )
+            _executors[name] = ex
+        return ex
+
+
+async def run_in(name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await ``fn(*args, **kwargs)`` on the named subsystem executor."""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def executor_metrics() -> Dict[str, Dict[str, Any]]:
+    for name in DEFAULTS:
+        get_executor(name)
+    return {name: ex.metrics() for name, ex in sorted(_executors.items())}
+
+
+def shutdown_all() -> None:
+    for ex in list(_executors.values()):
+        ex.shutdown()
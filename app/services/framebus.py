@@ -0,0 +1,240 @@
+"""Shared-memory frame bus between the capture daemon and its consumers.
+
+Only one process can hold the camera sensor, so a single capture daemon
+(``python -m app.services.capture``) owns it and publishes every frame into a
+``multiprocessing.shared_memory`` ring. The FastAPI camera router and the
+WebRTC publisher attach to the same segment by name and read frames in place.
+
+Segment layout (little endian)::
+
+    header (64 bytes)
+        magic "UUFB", version, slot count, slot size, frame format,
+        width, height, writer pid, latest sequence number, last write time
+    slot[i] (SLOT_HEADER.size + slot_size bytes each)
+        sequence number, capture timestamp, payload length, payload
+
+Each slot works as a tiny seqlock: the writer zeroes the slot sequence number,
+copies the payload, then publishes the new sequence number in the slot and in
+the header. A reader takes the latest sequence number, uses the payload in
+place and re-checks the slot afterwards; a changed number means the writer
+lapped the reader and the frame must be discarded. With ``slots`` slots a
+reader has ``slots - 1`` frame periods to finish with a view.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Tuple
+
+
+MAGIC = b"UUFB"
+VERSION = 1
+
+FORMAT_JPEG = 1
+FORMAT_BGR = 2
+FORMAT_RGB = 3
+FORMAT_NAMES = {FORMAT_JPEG: "jpeg", FORMAT_BGR: "bgr", FORMAT_RGB: "rgb"}
+
+# magic, version, slots, slot_size, fmt, width, height, writer_pid, latest_seq, updated_ts
+HEADER = struct.Struct("<4sIIIIIIIQd")
+HEADER_SIZE = 64
+# seq, ts, length, reserved
+SLOT_HEADER = struct.Struct("<QdII")
+SLOT_HEADER_SIZE = 32
+
+_LATEST_OFFSET = 32  # byte offset of latest_seq inside HEADER
+
+
+class Frame(NamedTuple):
+    seq: int
+    ts: float
+    data: bytes
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without handing it to the resource tracker.
+
+    Before Python 3.13 every attaching process registers the segment with its
+    resource tracker, which unlinks it when that process exits and pulls the
+    ring out from under the capture daemon.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=False, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        # Skip registration rather than unregistering afterwards: the writer may
+        # live in this same process and share the tracker's bookkeeping.
+        register = resource_tracker.register
+        resource_tracker.register = lambda *_args, **_kwargs: None  # type: ignore[assignment]
+        try:
+            return shared_memory.SharedMemory(name=name, create=False)
+        finally:
+            resource_tracker.register = register  # type: ignore[assignment]
+
+
+def _slot_offset(index: int, slot_size: int) -> int:
+    return HEADER_SIZE + index * (SLOT_HEADER_SIZE + slot_size)
+
+
+class FrameBusWriter:
+    """Owns the shared-memory ring; used only by the capture daemon."""
+
+    def __init__(
+        self,
+        name: str,
+        width: int,
+        height: int,
+        fmt: int = FORMAT_JPEG,
+        slots: int = 4,
+        slot_size: Optional[int] = None,
+    ) -> None:
+        if fmt not in FORMAT_NAMES:
+            raise ValueError(f"unknown frame format {fmt}")
+        if slot_size is None:
+            # Raw frames need the full buffer; JPEG rarely exceeds half a byte per pixel.
+            slot_size = width * height * 3 if fmt != FORMAT_JPEG else max(width * height // 2, 64 * 1024)
+        self.name = name
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        self.slots = max(2, int(slots))
+        self.slot_size = int(slot_size)
+        self.seq = 0
+        self.dropped = 0
+
+        size = _slot_offset(self.slots, self.slot_size)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed daemon; start over with our geometry.
+            stale = shared_memory.SharedMemory(name=name, create=False)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._buf = self.shm.buf
+        for i in range(self.slots):
+            SLOT_HEADER.pack_into(self._buf, _slot_offset(i, self.slot_size), 0, 0.0, 0, 0)
+        HEADER.pack_into(
+            self._buf, 0, MAGIC, VERSION, self.slots, self.slot_size, fmt,
+            width, height, os.getpid(), 0, time.time(),
+        )
+
+    def write(self, data, ts: Optional[float] = None) -> int:
+        """Publish one frame and return its sequence number (0 if dropped)."""
+        payload = memoryview(data).cast("B")
+        length = payload.nbytes
+        if length > self.slot_size:
+            self.dropped += 1
+            return 0
+        seq = self.seq + 1
+        off = _slot_offset(seq % self.slots, self.slot_size)
+        buf = self._buf
+        SLOT_HEADER.pack_into(buf, off, 0, 0.0, 0, 0)
+        start = off + SLOT_HEADER_SIZE
+        buf[start:start + length] = payload
+        SLOT_HEADER.pack_into(buf, off, seq, ts if ts is not None else time.time(), length, 0)
+        struct.pack_into("<Qd", buf, _LATEST_OFFSET, seq, time.time())
+        self.seq = seq
+        return seq
+
+    def close(self, unlink: bool = True) -> None:
+        self._buf = None  # type: ignore[assignment]
+        try:
+            self.shm.close()
+        finally:
+            if unlink:
+                try:
+                    self.shm.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+class FrameBusReader:
+    """Read-only view of a ring published by :class:`FrameBusWriter`."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.shm = _attach(name)
+        self._buf = self.shm.buf
+        magic, version, slots, slot_size, fmt, width, height, pid, _seq, _ts = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise RuntimeError(f"frame bus {name!r} has an unexpected layout")
+        self.slots = slots
+        self.slot_size = slot_size
+        self.fmt = fmt
+        self.width = width
+        self.height = height
+        self.writer_pid = pid
+        self.torn_reads = 0
+
+    @property
+    def format_name(self) -> str:
+        return FORMAT_NAMES.get(self.fmt, "unknown")
+
+    def latest_seq(self) -> int:
+        return struct.unpack_from("<Q", self._buf, _LATEST_OFFSET)[0]
+
+    def last_write_age(self) -> float:
+        return time.time() - struct.unpack_from("<d", self._buf, _LATEST_OFFSET + 8)[0]
+
+    def view(self, seq: Optional[int] = None) -> Optional[Tuple[int, float, memoryview]]:
+        """Return ``(seq, ts, payload)`` without copying, or None if unavailable.
+
+        The payload aliases shared memory; call :meth:`valid` once done with
+        it to make sure the writer did not overwrite it in the meantime.
+        """
+        if seq is None:
+            seq = self.latest_seq()
+        if seq == 0:
+            return None
+        off = _slot_offset(seq % self.slots, self.slot_size)
+        slot_seq, ts, length, _ = SLOT_HEADER.unpack_from(self._buf, off)
+        if slot_seq != seq:
+            return None
+        start = off + SLOT_HEADER_SIZE
+        return seq, ts, self._buf[start:start + length]
+
+    def valid(self, seq: int) -> bool:
+        off = _slot_offset(seq % self.slots, self.slot_size)
+        ok = struct.unpack_from("<Q", self._buf, off)[0] == seq
+        if not ok:
+            self.torn_reads += 1
+        return ok
+
+    def read(self, seq: Optional[int] = None) -> Optional[Frame]:
+        """Copy out the latest (or a given) frame, retrying once on a torn read.
+
+        The copy is what makes the result safe to keep; readers that can
+        finish with the payload before checking :meth:`valid` use :meth:`view`.
+        """
+        for _ in range(2):
+            got = self.view(seq)
+            if got is None:
+                return None
+            s, ts, payload = got
+            data = bytes(payload)
+            payload.release()
+            if self.valid(s):
+                return Frame(s, ts, data)
+            seq = None
+        return None
+
+    def wait(self, after_seq: int, timeout: float = 5.0, poll: float = 0.002) -> Optional[Frame]:
+        """Block until a frame newer than ``after_seq`` is published."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.latest_seq() > after_seq:
+                frame = self.read()
+                if frame is not None:
+                    return frame
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self) -> None:
+        self._buf = None  # type: ignore[assignment]
+        self.shm.close()
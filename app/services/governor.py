@@ -0,0 +1,255 @@
+"""Thermal/load governor for the camera streams and the WebRTC publisher.
+
+The Pi firmware throttles the CPU near 80-85 °C, and then MJPEG encoding,
+stepper pulse timing and the API all slow down together. The governor
+reacts earlier: it is fed by the stats sampler (CPU temperature and load
+every few seconds) and moves between levels that trade stream quality
+for CPU time:
+
+    level     fps     JPEG q  scale  publisher bitrate
+    full      1.0x    85      1.0    1.0x
+    warm      0.5x    75      1.0    0.7x
+    hot       0.33x   65      0.5    0.5x
+    critical  0.1x    50      0.5    0.3x
+
+It steps *up* one level when temperature or CPU use crosses that level's
+threshold on two consecutive samples, or at once when a stepper move is
+running and CPU use exceeds ``100 - GOVERNOR_MOTOR_HEADROOM_PCT``, so the
+pulse loop always has a core's worth of slack. It steps *down* only after
+temperature and CPU have stayed below the previous level's threshold
+minus the hysteresis band for ``GOVERNOR_COOLDOWN_S`` seconds.
+
+Listeners (the camera router) get each new :class:`Level`; the publisher,
+which runs in its own process, reads the KEY=VALUE state file written to
+``GOVERNOR_STATE_FILE`` (the shell publisher sources it on every launch).
+"""
+from __future__ import annotations
+
+import collections
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from .log import get_logger
+from .startup import PROJECT_ROOT
+
+log = get_logger("governor")
+
+
+# Private to the API's user: the publisher sources values from it, so it must
+# not live where another local user can plant one (e.g. a sticky /tmp)
+GOVERNOR_STATE_FILE = PROJECT_ROOT / "data" / "governor.env"
+
+
+class Level(NamedTuple):
+    name: str
+    fps_factor: float
+    quality: int
+    scale: float
+    bitrate_factor: float
+
+
+LEVELS = (
+    Level("full", 1.0, 85, 1.0, 1.0),
+    Level("warm", 0.5, 75, 1.0, 0.7),
+    Level("hot", 0.33, 65, 0.5, 0.5),
+    Level("critical", 0.1, 50, 0.5, 0.3),
+)
+
+
+def _floats(raw: str, n: int) -> List[float]:
+    values = [float(v) for v in raw.split(",") if v.strip()]
+    if len(values) != n:
+        raise ValueError(f"expected {n} comma-separated values, got {raw!r}")
+    return values
+
+
+class Governor:
+    def __init__(
+        self,
+        temp_thresholds_c=(70.0, 75.0, 80.0),
+        cpu_thresholds_pct=(60.0, 75.0, 90.0),
+        hysteresis_c: float = 5.0,
+        hysteresis_pct: float = 15.0,
+        cooldown_s: float = 30.0,
+        motor_headroom_pct: float = 25.0,
+        base_bitrate_kbps: int = 2500,
+        state_file: Optional[Path] = None,
+    ):
+        # thresholds[i] is the bar for entering LEVELS[i + 1]
+        self.temp_thresholds = list(temp_thresholds_c)
+        self.cpu_thresholds = list(cpu_thresholds_pct)
+        self.hysteresis_c = hysteresis_c
+        self.hysteresis_pct = hysteresis_pct
+        self.cooldown_s = cooldown_s
+        self.motor_headroom_pct = motor_headroom_pct
+        self.base_bitrate_kbps = base_bitrate_kbps
+        self.state_file = state_file
+        self.motion_active: Callable[[], bool] = lambda: False
+
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Level], None]] = []
+        self.index = 0
+        self.since = time.time()
+        self._over = 0  # consecutive samples above the next level's threshold
+        self._calm_since: Optional[float] = None
+        self.last_sample: Optional[Dict[str, Any]] = None
+        self.decisions: Deque[Dict[str, Any]] = collections.deque(maxlen=50)
+        self.time_in_level: Dict[str, float] = {lvl.name: 0.0 for lvl in LEVELS}
+
+    @classmethod
+    def from_env(cls) -> "Governor":
+        state = os.getenv("GOVERNOR_STATE_FILE", str(GOVERNOR_STATE_FILE))
+        return cls(
+            temp_thresholds_c=_floats(os.getenv("GOVERNOR_TEMP_C", "70,75,80"), len(LEVELS) - 1),
+            cpu_thresholds_pct=_floats(os.getenv("GOVERNOR_CPU_PCT", "60,75,90"), len(LEVELS) - 1),
+            hysteresis_c=float(os.getenv("GOVERNOR_HYSTERESIS_C", "5")),
+            hysteresis_pct=float(os.getenv("GOVERNOR_HYSTERESIS_PCT", "15")),
+            cooldown_s=float(os.getenv("GOVERNOR_COOLDOWN_S", "30")),
+            motor_headroom_pct=float(os.getenv("GOVERNOR_MOTOR_HEADROOM_PCT", "25")),
+            base_bitrate_kbps=int(os.getenv("FFMPEG_VIDEO_BITRATE", "2500")),
+            state_file=Path(state) if state else None,
+        )
+
+    @property
+    def level(self) -> Level:
+        return LEVELS[self.index]
+
+    def add_listener(self, fn: Callable[[Level], None]) -> None:
+        self._listeners.append(fn)
+        fn(self.level)
+
+    # --- decisions -------------------------------------------------------
+    def _above(self, threshold_index: int, temp: Optional[float], cpu: Optional[float]) -> Optional[str]:
+        if temp is not None and temp >= self.temp_thresholds[threshold_index]:
+            return f"temp {temp:.1f}C >= {self.temp_thresholds[threshold_index]:.0f}C"
+        if cpu is not None and cpu >= self.cpu_thresholds[threshold_index]:
+            return f"cpu {cpu:.0f}% >= {self.cpu_thresholds[threshold_index]:.0f}%"
+        return None
+
+    def _calm(self, threshold_index: int, temp: Optional[float], cpu: Optional[float]) -> bool:
+        temp_ok = temp is None or temp < self.temp_thresholds[threshold_index] - self.hysteresis_c
+        cpu_ok = cpu is None or cpu < self.cpu_thresholds[threshold_index] - self.hysteresis_pct
+        return temp_ok and cpu_ok
+
+    def update(self, sample: Dict[str, Any]) -> None:
+        """Feed one stats sample ({"cpu_temp_c": .., "cpu_percent": ..})."""
+        temp = sample.get("cpu_temp_c")
+        cpu = sample.get("cpu_percent")
+        now = time.time()
+        with self._lock:
+            self.last_sample = sample
+            target, reason = self.index, None
+            if self.index < len(LEVELS) - 1:
+                reason = self._above(self.index, temp, cpu)
+                self._over = self._over + 1 if reason else 0
+                motor_squeezed = (
+                    cpu is not None
+                    and cpu >= 100.0 - self.motor_headroom_pct
+                    and self.motion_active()
+                )
+                if motor_squeezed:
+                    target, reason = self.index + 1, f"motor headroom: cpu {cpu:.0f}% while stepper moving"
+                elif self._over >= 2:
+                    target = self.index + 1
+            if target == self.index and self.index > 0:
+                if self._calm(self.index - 1, temp, cpu):
+                    self._calm_since = self._calm_since or now
+                    if now - self._calm_since >= self.cooldown_s:
+                        target, reason = self.index - 1, f"calm for {self.cooldown_s:.0f}s"
+                else:
+                    self._calm_since = None
+            if target == self.index:
+                return
+            self._switch(target, reason or "", sample, now)
+            level = self.level
+            previous = self.decisions[-1]["from"]
+        log.warning("governor %s -> %s (%s)", previous, level.name, reason)
+        for fn in list(self._listeners):
+            try:
+                fn(level)
+            except Exception as e:
+                log.error("governor listener failed: %s", e)
+
+    def _switch(self, target: int, reason: str, sample: Dict[str, Any], now: float) -> None:
+        self.time_in_level[self.level.name] += now - self.since
+        self.decisions.append({
+            "ts": now,
+            "from_index": self.index,
+            "from": self.level.name,
+            "to": LEVELS[target].name,
+            "reason": reason,
+            "cpu_temp_c": sample.get("cpu_temp_c"),
+            "cpu_percent": sample.get("cpu_percent"),
+        })
+        self.index = target
+        self.since = now
+        self._over = 0
+        self._calm_since = None
+        self.write_state()
+
+    # --- outputs -----------------------------------------------------------
+    @property
+    def bitrate_kbps(self) -> int:
+        return int(self.base_bitrate_kbps * self.level.bitrate_factor)
+
+    def write_state(self) -> None:
+        """Publish the current outputs for out-of-process consumers (the publisher)."""
+        if self.state_file is None:
+            return
+        level = self.level
+        text = (
+            f"GOVERNOR_LEVEL={level.name}\n"
+            f"GOVERNOR_FPS_FACTOR={level.fps_factor}\n"
+            f"GOVERNOR_JPEG_QUALITY={level.quality}\n"
+            f"GOVERNOR_SCALE={level.scale}\n"
+            f"GOVERNOR_BITRATE_KBPS={self.bitrate_kbps}\n"
+        )
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+            tmp.write_text(text)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            log.warning("cannot write governor state %s: %s", self.state_file, e)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            level = self.level
+            time_in_level = dict(self.time_in_level)
+            time_in_level[level.name] += now - self.since
+            return {
+                "level": level.name,
+                "index": self.index,
+                "since": self.since,
+                "outputs": {**level._asdict(), "publisher_bitrate_kbps": self.bitrate_kbps},
+                "last_sample": self.last_sample,
+                "thresholds": {
+                    "temp_c": self.temp_thresholds,
+                    "cpu_pct": self.cpu_thresholds,
+                    "hysteresis_c": self.hysteresis_c,
+                    "hysteresis_pct": self.hysteresis_pct,
+                    "cooldown_s": self.cooldown_s,
+                    "motor_headroom_pct": self.motor_headroom_pct,
+                },
+                "motion_active": bool(self.motion_active()),
+                "time_in_level_s": {k: round(v, 1) for k, v in time_in_level.items()},
+                "transitions": len(self.decisions),
+                "decisions": list(self.decisions)[-10:],
+            }
+
+
+def read_state(path: Path) -> Dict[str, str]:
+    """Parse a governor state file (for the publisher process)."""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+    return dict(line.split("=", 1) for line in lines if "=" in line)
+
+
+governor = Governor.from_env()
@@ -0,0 +1,428 @@
+"""GPIO line access behind one small interface.
+
+Backends, in the order ``GPIO_BACKEND=auto`` tries them:
+
+* ``lgpio`` - the Linux GPIO character device through lgpio. Pins claimed
+  together form a group, so :meth:`GpioBackend.write_many` sets DIR, STEP
+  and ENABLE in one ioctl. PWM and pulse trains are timed by lgpio's own
+  thread; edge alerts carry the kernel's event timestamp.
+* ``gpiod`` - the character device through libgpiod 2.x. One line request
+  per claim, so a bulk write is one ``set_values`` call; edge events carry
+  kernel timestamps. No PWM.
+* ``rpigpio`` - RPi.GPIO (deprecated, and not working on the Pi 5). Bulk
+  writes are one call into the library but separate register writes;
+  software PWM; edge timestamps are taken in the callback thread.
+* ``mock`` - records levels and transitions in memory. Edge watchers see
+  writes to their own pin, so loopback measurements run without hardware.
+
+Pins use BCM / chip line numbers. Callbacks registered with
+:meth:`GpioBackend.watch` are called as ``callback(pin, level, timestamp_ns)``.
+"""
+from __future__ import annotations
+
+import collections
+import glob
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .log import get_logger
+
+log = get_logger("gpio")
+
+GPIO_BACKEND = os.getenv("GPIO_BACKEND", "auto").strip().lower()
+# Empty: the first chip whose label is a pin controller (gpiochip4 on early
+# Pi 5 kernels, gpiochip0 elsewhere).
+GPIO_CHIP = os.getenv("GPIO_CHIP", "").strip()
+GPIO_CONSUMER = "stream-stepper"
+
+BACKENDS = ("lgpio", "gpiod", "rpigpio", "mock")
+EDGES = ("rising", "falling", "both")
+
+EdgeCallback = Callable[[int, int, int], None]
+
+
+class GpioUnavailable(RuntimeError):
+    """The requested backend (or the feature on it) is not available here."""
+
+
+def _chip_paths() -> List[str]:
+    return sorted(glob.glob("/dev/gpiochip*"), key=lambda p: int(p[len("/dev/gpiochip"):] or 0))
+
+
+class GpioBackend(ABC):
+    name = "base"
+    supports_pwm = False
+    edge_timestamps = "none"  # "kernel" | "library" | "none"
+
+    @abstractmethod
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        """Claim ``pins`` as outputs (re-claiming releases an earlier claim)."""
+
+    @abstractmethod
+    def write(self, pin: int, level: int) -> None:
+        """Set one claimed output."""
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        """Set several claimed pins; one call into the driver where it can."""
+        for pin, level in levels.items():
+            self.write(pin, level)
+
+    def pwm(self, pin: int, frequency_hz: float, duty_percent: float) -> None:
+        """Start (or, with ``duty_percent`` 0, stop) PWM on a claimed output."""
+        raise GpioUnavailable(f"{self.name}: PWM not supported")
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        raise GpioUnavailable(f"{self.name}: edge events not supported")
+
+    def close(self) -> None:
+        pass
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name, "pwm": self.supports_pwm, "edge_timestamps": self.edge_timestamps}
+
+
+# --- lgpio -------------------------------------------------------------------
+class LgpioBackend(GpioBackend):
+    name = "lgpio"
+    supports_pwm = True
+    edge_timestamps = "kernel"
+
+    def __init__(self, chip: str = GPIO_CHIP):
+        try:
+            import lgpio  # type: ignore
+        except Exception as e:
+            raise GpioUnavailable(f"lgpio not importable: {e}")
+        self._lg = lgpio
+        self.chip = self._open_chip(chip)
+        self._groups: Dict[int, Tuple[int, int]] = {}  # pin -> (group leader, bit)
+        self._callbacks: List[Any] = []
+
+    def _open_chip(self, chip: str) -> int:
+        lg = self._lg
+        if chip:
+            num = int(chip.replace("/dev/gpiochip", ""))
+            self.handle = lg.gpiochip_open(num)
+            return num
+        for path in _chip_paths() or ["/dev/gpiochip0"]:
+            num = int(path[len("/dev/gpiochip"):])
+            try:
+                handle = lg.gpiochip_open(num)
+            except Exception:
+                continue
+            try:
+                label = lg.gpio_get_chip_info(handle)[3]
+            except Exception:
+                label = ""
+            if str(label).startswith("pinctrl-"):
+                self.handle = handle
+                return num
+            lg.gpiochip_close(handle)
+        self.handle = lg.gpiochip_open(0)
+        return 0
+
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        pins = list(pins)
+        levels = list(levels) if levels is not None else [0] * len(pins)
+        for leader in {self._groups[p][0] for p in pins if p in self._groups}:
+            self._lg.group_free(self.handle, leader)
+            self._groups = {p: g for p, g in self._groups.items() if g[0] != leader}
+        self._lg.group_claim_output(self.handle, pins, levels)
+        for bit, pin in enumerate(pins):
+            self._groups[pin] = (pins[0], bit)
+
+    def write(self, pin: int, level: int) -> None:
+        leader, bit = self._groups[pin]
+        self._lg.group_write(self.handle, leader, (1 << bit) if level else 0, 1 << bit)
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        by_group: Dict[int, List[int]] = {}  # leader -> [bits, mask]
+        for pin, level in levels.items():
+            leader, bit = self._groups[pin]
+            acc = by_group.setdefault(leader, [0, 0])
+            acc[1] |= 1 << bit
+            if level:
+                acc[0] |= 1 << bit
+        for leader, (bits, mask) in by_group.items():
+            self._lg.group_write(self.handle, leader, bits, mask)
+
+    def pwm(self, pin: int, frequency_hz: float, duty_percent: float) -> None:
+        self._lg.tx_pwm(self.handle, pin, frequency_hz, duty_percent)
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        lg = self._lg
+        flag = {"rising": lg.RISING_EDGE, "falling": lg.FALLING_EDGE, "both": lg.BOTH_EDGES}[edge]
+        lg.gpio_claim_alert(self.handle, pin, flag)
+        # lgpio passes (chip, gpio, level, timestamp_ns)
+        self._callbacks.append(lg.callback(self.handle, pin, flag, lambda _c, g, lvl, ts: callback(g, lvl, ts)))
+
+    def close(self) -> None:
+        for cb in self._callbacks:
+            cb.cancel()
+        self._lg.gpiochip_close(self.handle)
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "chip": f"/dev/gpiochip{self.chip}"}
+
+
+# --- libgpiod 2.x ------------------------------------------------------------
+class GpiodBackend(GpioBackend):
+    name = "gpiod"
+    edge_timestamps = "kernel"
+
+    def __init__(self, chip: str = GPIO_CHIP):
+        try:
+            import gpiod  # type: ignore
+            from gpiod.line import Direction, Edge, Value  # type: ignore
+        except Exception as e:
+            raise GpioUnavailable(f"gpiod 2.x not importable: {e}")
+        if not hasattr(gpiod, "request_lines"):
+            raise GpioUnavailable("gpiod 1.x bindings; 2.x required")
+        self._gpiod, self._Direction, self._Edge, self._Value = gpiod, Direction, Edge, Value
+        self.chip = self._find_chip(chip)
+        self._requests: Dict[int, Any] = {}  # pin -> line request
+        self._stop = threading.Event()
+        self._watchers: List[threading.Thread] = []
+
+    def _find_chip(self, chip: str) -> str:
+        if chip:
+            return chip if chip.startswith("/dev/") else f"/dev/gpiochip{chip}"
+        for path in _chip_paths():
+            try:
+                with self._gpiod.Chip(path) as c:
+                    if c.get_info().label.startswith("pinctrl-"):
+                        return path
+            except Exception:
+                continue
+        return "/dev/gpiochip0"
+
+    def _level(self, level: int) -> Any:
+        return self._Value.ACTIVE if level else self._Value.INACTIVE
+
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        levels = list(levels) if levels is not None else [0] * len(pins)
+        for req in {id(self._requests[p]): self._requests[p] for p in pins if p in self._requests}.values():
+            req.release()
+            self._requests = {p: r for p, r in self._requests.items() if r is not req}
+        config = {
+            pin: self._gpiod.LineSettings(direction=self._Direction.OUTPUT, output_value=self._level(level))
+            for pin, level in zip(pins, levels)
+        }
+        req = self._gpiod.request_lines(self.chip, consumer=GPIO_CONSUMER, config=config)
+        for pin in pins:
+            self._requests[pin] = req
+
+    def write(self, pin: int, level: int) -> None:
+        self._requests[pin].set_value(pin, self._level(level))
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        by_request: Dict[int, Tuple[Any, Dict[int, Any]]] = {}
+        for pin, level in levels.items():
+            req = self._requests[pin]
+            by_request.setdefault(id(req), (req, {}))[1][pin] = self._level(level)
+        for req, values in by_request.values():
+            req.set_values(values)
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        detect = {"rising": self._Edge.RISING, "falling": self._Edge.FALLING, "both": self._Edge.BOTH}[edge]
+        settings = self._gpiod.LineSettings(direction=self._Direction.INPUT, edge_detection=detect)
+        req = self._gpiod.request_lines(self.chip, consumer=GPIO_CONSUMER, config={pin: settings})
+        rising = self._gpiod.EdgeEvent.Type.RISING_EDGE
+
+        def pump() -> None:
+            with req:
+                while not self._stop.is_set():
+                    if not req.wait_edge_events(0.1):
+                        continue
+                    for ev in req.read_edge_events():
+                        callback(ev.line_offset, 1 if ev.event_type == rising else 0, ev.timestamp_ns)
+
+        t = threading.Thread(target=pump, name=f"gpio-edges-{pin}", daemon=True)
+        t.start()
+        self._watchers.append(t)
+
+    def close(self) -> None:
+        self._stop.set()
+        for req in {id(r): r for r in self._requests.values()}.values():
+            req.release()
+        self._requests.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "chip": self.chip}
+
+
+# --- RPi.GPIO ----------------------------------------------------------------
+class RpiGpioBackend(GpioBackend):
+    name = "rpigpio"
+    supports_pwm = True  # software PWM
+    edge_timestamps = "library"
+
+    def __init__(self):
+        try:
+            import RPi.GPIO as GPIO  # type: ignore
+        except Exception as e:
+            raise GpioUnavailable(f"RPi.GPIO not importable: {e}")
+        self._GPIO = GPIO
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        self._pwm: Dict[int, Any] = {}
+
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        levels = list(levels) if levels is not None else [0] * len(pins)
+        for pin, level in zip(pins, levels):
+            self._GPIO.setup(pin, self._GPIO.OUT, initial=self._GPIO.HIGH if level else self._GPIO.LOW)
+
+    def write(self, pin: int, level: int) -> None:
+        self._GPIO.output(pin, 1 if level else 0)
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        self._GPIO.output(list(levels), [1 if v else 0 for v in levels.values()])
+
+    def pwm(self, pin: int, frequency_hz: float, duty_percent: float) -> None:
+        p = self._pwm.get(pin)
+        if duty_percent <= 0:
+            if p is not None:
+                p.stop()
+                del self._pwm[pin]
+            return
+        if p is None:
+            p = self._pwm[pin] = self._GPIO.PWM(pin, frequency_hz)
+            p.start(duty_percent)
+        else:
+            p.ChangeFrequency(frequency_hz)
+            p.ChangeDutyCycle(duty_percent)
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        G = self._GPIO
+        G.setup(pin, G.IN)
+        mode = {"rising": G.RISING, "falling": G.FALLING, "both": G.BOTH}[edge]
+        G.add_event_detect(pin, mode, callback=lambda ch: callback(ch, G.input(ch), time.monotonic_ns()))
+
+    def close(self) -> None:
+        for p in self._pwm.values():
+            p.stop()
+        self._GPIO.cleanup()
+
+
+# --- Mock ----------------------------------------------------------------------
+class MockBackend(GpioBackend):
+    """In-memory lines. ``history`` keeps ``(timestamp_ns, pin, level)`` per
+    transition and ``calls`` counts driver calls, so tests can check both
+    what was driven and how many round trips it took."""
+
+    name = "mock"
+    supports_pwm = True
+    edge_timestamps = "library"
+
+    def __init__(self, clock: Callable[[], int] = time.monotonic_ns, history: int = 100_000):
+        self.clock = clock
+        self.levels: Dict[int, int] = {}
+        self.history: Deque[Tuple[int, int, int]] = collections.deque(maxlen=history)
+        self.calls = 0
+        self.pwm_state: Dict[int, Tuple[float, float]] = {}
+        self._watchers: Dict[int, List[Tuple[str, EdgeCallback]]] = {}
+        self._lock = threading.Lock()
+
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        levels = list(levels) if levels is not None else [0] * len(pins)
+        with self._lock:
+            for pin, level in zip(pins, levels):
+                self.levels[pin] = 1 if level else 0
+
+    def _set(self, pin: int, level: int, ts: int) -> Optional[Tuple[int, int]]:
+        if pin not in self.levels:
+            raise KeyError(f"GPIO {pin} not claimed")
+        level = 1 if level else 0
+        if self.levels[pin] == level:
+            return None
+        self.levels[pin] = level
+        self.history.append((ts, pin, level))
+        return pin, level
+
+    def _notify(self, changes: List[Tuple[int, int]], ts: int) -> None:
+        for pin, level in changes:
+            for edge, cb in self._watchers.get(pin, ()):
+                if edge == "both" or (edge == "rising") == bool(level):
+                    cb(pin, level, ts)
+
+    def write(self, pin: int, level: int) -> None:
+        self.write_many({pin: level})
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        ts = self.clock()
+        with self._lock:
+            self.calls += 1
+            changes = [c for c in (self._set(p, v, ts) for p, v in levels.items()) if c]
+        self._notify(changes, ts)
+
+    def pwm(self, pin: int, frequency_hz: float, duty_percent: float) -> None:
+        with self._lock:
+            self.calls += 1
+            if duty_percent <= 0:
+                self.pwm_state.pop(pin, None)
+            else:
+                self.pwm_state[pin] = (frequency_hz, duty_percent)
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        if edge not in EDGES:
+            raise ValueError(f"edge must be one of {EDGES}")
+        with self._lock:
+            self._watchers.setdefault(pin, []).append((edge, callback))
+
+
+# --- Selection -----------------------------------------------------------------
+_FACTORIES: Dict[str, Callable[[], GpioBackend]] = {
+    "lgpio": LgpioBackend,
+    "gpiod": GpiodBackend,
+    "rpigpio": RpiGpioBackend,
+    "mock": MockBackend,
+}
+
+
+def open_backend(name: str = "auto") -> GpioBackend:
+    """A new backend; ``auto`` falls through the list to the mock."""
+    if name != "auto":
+        if name not in _FACTORIES:
+            raise GpioUnavailable(f"unknown GPIO backend {name!r}; expected one of {BACKENDS}")
+        return _FACTORIES[name]()
+    for candidate in BACKENDS:
+        try:
+            return _FACTORIES[candidate]()
+        except GpioUnavailable as e:
+            log.debug("GPIO backend %s unavailable: %s", candidate, e)
+        except Exception as e:  # library present but no usable chip
+            log.info("GPIO backend %s failed to open: %s", candidate, e)
+    return MockBackend()
+
+
+def available_backends() -> List[str]:
+    """Backends that open on this host (each is opened and closed once)."""
+    found = []
+    for name in BACKENDS:
+        try:
+            _FACTORIES[name]().close()
+        except Exception:
+            continue
+        found.append(name)
+    return found
+
+
+_backend: Optional[GpioBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> GpioBackend:
+    """The process-wide backend, chosen by ``GPIO_BACKEND`` on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    _backend = open_backend(GPIO_BACKEND)
+                except GpioUnavailable as e:
+                    log.warning("%s; GPIO writes go to the mock backend", e)
+                    _backend = MockBackend()
+                log.info("GPIO backend: %s", _backend.name)
+    return _backend
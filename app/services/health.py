@@ -0,0 +1,181 @@
+"""Memory-mapped publisher health record.
+
+The publisher updates a fixed-layout record in place at frame rate and the
+API maps the same file once and reads it on every ``/camera/status`` poll
+without further syscalls. A seqlock guards the record: the writer bumps the
+sequence number to an odd value before touching the fields and to the next
+even value afterwards, and readers retry until they see the same even value
+on both sides of their copy, so a half-written record is never returned.
+
+Layout (little endian, RECORD_SIZE bytes)::
+
+    magic "UUHR", version, seq,
+    pid, status code, updated_ts, started_ts, last_frame_ts,
+    frames, errors, rate_fps, detail (utf-8, NUL padded)
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+MAGIC = b"UUHR"
+VERSION = 1
+RECORD_SIZE = 256
+DETAIL_BYTES = 160
+
+_HEAD = struct.Struct("<4sI")  # magic, version
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = _HEAD.size
+# pid, status, updated_ts, started_ts, last_frame_ts, frames, errors, rate_fps, detail
+_BODY = struct.Struct(f"<IIdddQQd{DETAIL_BYTES}s")
+_BODY_OFFSET = _SEQ_OFFSET + _SEQ.size
+
+STATUSES = ["unknown", "initializing", "running", "error", "stopped"]
+_STATUS_CODES = {name: i for i, name in enumerate(STATUSES)}
+
+# A running publisher with no frame for this long is reported as stalled.
+STALL_AFTER_S = float(os.getenv("PUBLISHER_STALL_AFTER_S", "5"))
+RATE_WINDOW_S = 1.0
+
+
+def _open_mapping(path: Path, writable: bool) -> mmap.mmap:
+    flags = os.O_RDWR | os.O_CREAT if writable else os.O_RDONLY
+    fd = os.open(str(path), flags, 0o644)
+    try:
+        if writable and os.fstat(fd).st_size != RECORD_SIZE:
+            os.ftruncate(fd, RECORD_SIZE)
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        return mmap.mmap(fd, RECORD_SIZE, access=access)
+    finally:
+        os.close(fd)
+
+
+class HealthWriter:
+    """Publisher side: keeps the record mapped and updates it in place."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.status = "unknown"
+        self.detail: Optional[str] = None
+        self.started_ts = time.time()
+        self.last_frame_ts = 0.0
+        self.frames = 0
+        self.errors = 0
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self._seq = 0
+        self._map: Optional[mmap.mmap] = None
+        try:
+            self._map = _open_mapping(path, writable=True)
+            if self._map[:4] == MAGIC:
+                self._seq = _SEQ.unpack_from(self._map, _SEQ_OFFSET)[0] & ~1
+            _HEAD.pack_into(self._map, 0, MAGIC, VERSION)
+        except Exception:
+            self._map = None  # health reporting is best-effort
+
+    def _flush(self) -> None:
+        m = self._map
+        if m is None:
+            return
+        detail = (self.detail or "").encode("utf-8", "replace")[:DETAIL_BYTES]
+        self._seq += 1
+        _SEQ.pack_into(m, _SEQ_OFFSET, self._seq)
+        _BODY.pack_into(
+            m, _BODY_OFFSET, os.getpid(), _STATUS_CODES.get(self.status, 0), time.time(),
+            self.started_ts, self.last_frame_ts, self.frames, self.errors, self.rate, detail,
+        )
+        self._seq += 1
+        _SEQ.pack_into(m, _SEQ_OFFSET, self._seq)
+
+    def write(self, status: str, detail: Optional[str] = None):
+        if status == "error":
+            self.errors += 1
+        self.status = status
+        self.detail = detail
+        self._flush()
+
+    def frame(self, ts: Optional[float] = None) -> None:
+        """Record one delivered frame; cheap enough to call per frame."""
+        self.frames += 1
+        self.last_frame_ts = ts if ts is not None else time.time()
+        self._window_frames += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= RATE_WINDOW_S:
+            self.rate = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+        self._flush()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class HealthReader:
+    """API side: maps the record once; each read is a few struct unpacks."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+
+    def _attach(self) -> bool:
+        if self._map is not None:
+            return True
+        try:
+            m = _open_mapping(self.path, writable=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return False  # missing, or still empty because the publisher is starting
+        self._map = m
+        return True
+
+    def read(self, retries: int = 100) -> Dict[str, Any]:
+        if not self._attach():
+            return {"status": "missing"}
+        m = self._map
+        magic, version = _HEAD.unpack_from(m, 0)
+        if magic != MAGIC or version != VERSION:
+            return {"status": "unreadable"}
+        for _ in range(retries):
+            before = _SEQ.unpack_from(m, _SEQ_OFFSET)[0]
+            if before & 1:
+                continue
+            body = _BODY.unpack_from(m, _BODY_OFFSET)
+            if _SEQ.unpack_from(m, _SEQ_OFFSET)[0] == before:
+                break
+        else:
+            return {"status": "busy"}
+        if before == 0:
+            return {"status": "missing"}
+        pid, code, updated_ts, started_ts, last_frame_ts, frames, errors, rate, detail = body
+        now = time.time()
+        status = STATUSES[code] if code < len(STATUSES) else "unknown"
+        last_frame_age = (now - last_frame_ts) if last_frame_ts else None
+        if last_frame_age is None or last_frame_age > 2 * RATE_WINDOW_S:
+            rate = 0.0
+        stalled = status == "running" and now - (last_frame_ts or updated_ts) > STALL_AFTER_S
+        return {
+            "status": "stalled" if stalled else status,
+            "detail": detail.rstrip(b"\0").decode("utf-8", "replace") or None,
+            "pid": pid,
+            "ts": updated_ts,
+            "age_s": round(now - updated_ts, 3),
+            "uptime_s": round(now - started_ts, 3),
+            "frames": frames,
+            "rate_fps": round(rate, 2),
+            "last_frame_age_s": round(last_frame_age, 3) if last_frame_age is not None else None,
+            "errors": errors,
+            "stalled": stalled,
+        }
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
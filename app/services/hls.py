@@ -0,0 +1,443 @@
+"""HLS / LL-HLS segmenter fed from a camera's frame stream.
+
+One ffmpeg process per watched camera turns the JPEG frames the camera
+already publishes (a :class:`StreamingOutput` tap) into H.264 in MPEG-TS on
+its stdout. :class:`TsSegmenter` splits that byte stream in-process:
+
+* a **segment** starts at the first keyframe after ``segment_s`` of PTS
+  (the encoder's GOP is one segment long, so every segment is independent);
+* with ``part_s`` > 0, segments are further cut into LL-HLS **parts** at PES
+  boundaries every ``part_s`` seconds.
+
+Segments, parts and the rendered playlist live in an in-memory cache that
+keeps ``list_size`` segments (plus a byte cap) and evicts the oldest. Names
+carry a random per-encoder session token, so a URL always maps to the same bytes
+and nginx can cache segments for as long as they are listed; every viewer
+after the first is served by nginx, and the Pi encodes once per camera.
+
+The encoder starts on the first playlist request and stops after
+``idle_s`` without requests.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import queue
+import secrets
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .log import get_logger
+
+log = get_logger("hls")
+
+TS_PACKET = 188
+PTS_HZ = 90000
+PTS_WRAP = 1 << 33  # PTS is a 33-bit counter: wraps after ~26.5 h
+
+HLS_SEGMENT_S = float(os.getenv("HLS_SEGMENT_S", "2"))
+HLS_PART_S = float(os.getenv("HLS_PART_S", "0.5"))
+HLS_LIST_SIZE = int(os.getenv("HLS_LIST_SIZE", "6"))
+HLS_CACHE_MB = float(os.getenv("HLS_CACHE_MB", "32"))
+HLS_IDLE_S = float(os.getenv("HLS_IDLE_S", "60"))
+HLS_FPS = int(os.getenv("HLS_FPS", "15"))
+HLS_ENCODER = os.getenv("HLS_ENCODER", "libx264")
+HLS_ENCODER_ARGS = os.getenv("HLS_ENCODER_ARGS", "-preset ultrafast -tune zerolatency -pix_fmt yuv420p")
+
+
+class HlsUnavailable(RuntimeError):
+    """HLS cannot be produced here (ffmpeg missing)."""
+
+
+class _Chunk:
+    """A finished segment or part."""
+
+    __slots__ = ("data", "duration", "independent")
+
+    def __init__(self, data: bytes, duration: float, independent: bool):
+        self.data = data
+        self.duration = duration
+        self.independent = independent
+
+
+class _Segment:
+    __slots__ = ("msn", "parts", "data", "duration", "start_pts")
+
+    def __init__(self, msn: int, start_pts: int):
+        self.msn = msn
+        self.parts: List[_Chunk] = []
+        self.data: Optional[bytes] = None  # set when the segment is complete
+        self.duration = 0.0
+        self.start_pts = start_pts
+
+
+def _pes_pts(payload: bytes) -> Optional[int]:
+    if len(payload) < 14 or payload[0:3] != b"\x00\x00\x01" or not payload[7] & 0x80:
+        return None
+    p = payload
+    return ((p[9] >> 1) & 0x07) << 30 | p[10] << 22 | (p[11] >> 1) << 15 | p[12] << 7 | p[13] >> 1
+
+
+def _pts_seconds(pts: int, since: int) -> float:
+    """Seconds from ``since`` to ``pts``, across a 33-bit wrap."""
+    return ((pts - since) % PTS_WRAP) / PTS_HZ
+
+
+class TsSegmenter:
+    """Splits an MPEG-TS byte stream into HLS segments and parts."""
+
+    def __init__(
+        self,
+        session: str,
+        segment_s: float = HLS_SEGMENT_S,
+        part_s: float = HLS_PART_S,
+        list_size: int = HLS_LIST_SIZE,
+        max_bytes: int = int(HLS_CACHE_MB * (1 << 20)),
+    ):
+        self.session = session
+        self.segment_s = segment_s
+        self.part_s = part_s if 0 < part_s < segment_s else 0.0
+        self.list_size = max(2, list_size)
+        self.max_bytes = max_bytes
+        # An open segment never legitimately grows past its share of the cache;
+        # beyond this the stream has no usable boundaries and it is dropped.
+        self.max_open_bytes = max(1 << 20, max_bytes // (self.list_size + 2))
+        self.changed = threading.Condition()
+        self.segments: Deque[_Segment] = collections.deque()
+        self._buf = bytearray()
+        self._psi: Dict[int, bytes] = {}  # PID -> latest PAT/PMT packet, repeated at each part
+        self._pmt_pid: Optional[int] = None
+        self._video_pid: Optional[int] = None
+        self._current: Optional[_Segment] = None
+        self._part: List[bytes] = []
+        self._open_bytes = 0  # packets held by the open segment (closed parts + the open one)
+        self._part_pts = 0
+        self._part_independent = False
+        self._next_msn = 0
+        self.evicted = 0
+        self.overflows = 0
+        self.playlist_renders = 0
+        self._playlist: Optional[str] = None
+
+    # --- parsing ------------------------------------------------------------
+    def feed(self, data: bytes) -> None:
+        buf = self._buf
+        buf.extend(data)
+        pos = 0
+        while len(buf) - pos >= TS_PACKET:
+            if buf[pos] != 0x47:  # lost sync: skip to the next sync byte
+                nxt = buf.find(b"\x47", pos + 1)
+                pos = nxt if nxt >= 0 else len(buf)
+                continue
+            self._packet(bytes(buf[pos:pos + TS_PACKET]))
+            pos += TS_PACKET
+        del buf[:pos]
+
+    def _packet(self, pkt: bytes) -> None:
+        pid = ((pkt[1] & 0x1F) << 8) | pkt[2]
+        pusi = bool(pkt[1] & 0x40)
+        afc = (pkt[3] >> 4) & 0x03
+        offset = 4
+        random_access = False
+        if afc & 0x02:
+            af_len = pkt[4]
+            if af_len:
+                random_access = bool(pkt[5] & 0x40)
+            offset = 5 + af_len
+        payload = pkt[offset:] if afc & 0x01 else b""
+
+        if pid == 0:
+            if pusi and len(payload) >= 13:
+                section = payload[1 + payload[0]:]
+                self._pmt_pid = ((section[10] & 0x1F) << 8) | section[11]
+            self._psi[0] = pkt
+            return
+        if pid == self._pmt_pid:
+            self._psi[pid] = pkt
+            return
+        if self._video_pid is None and pusi and payload[:3] == b"\x00\x00\x01" and 0xE0 <= payload[3] <= 0xEF:
+            self._video_pid = pid
+        if pid == self._video_pid and pusi:
+            pts = _pes_pts(payload)
+            if pts is not None:
+                self._boundary(pts, random_access)
+        if self._current is not None:
+            self._part.append(pkt)
+            self._open_bytes += TS_PACKET
+            if self._open_bytes > self.max_open_bytes:
+                self._drop_open_segment()
+
+    def _boundary(self, pts: int, keyframe: bool) -> None:
+        seg = self._current
+        if seg is None:
+            if keyframe:
+                self._open_segment(pts)
+            return
+        elapsed = _pts_seconds(pts, seg.start_pts)
+        if keyframe and elapsed >= self.segment_s * 0.9:
+            self._close_part(pts)
+            self._close_segment(pts)
+            self._open_segment(pts)
+        elif self.part_s and _pts_seconds(pts, self._part_pts) >= self.part_s * 0.9:
+            self._close_part(pts)
+            self._part_independent = keyframe
+
+    def _open_segment(self, pts: int) -> None:
+        self._current = _Segment(self._next_msn, pts)
+        self._next_msn += 1
+        self._open_bytes = 0
+        self._part_pts = pts
+        self._part_independent = True
+        with self.changed:
+            self.segments.append(self._current)
+            self._evict()
+
+    def _close_part(self, pts: int) -> None:
+        seg = self._current
+        if seg is None or not self._part:
+            return
+        data = b"".join(self._psi[k] for k in sorted(self._psi)) + b"".join(self._part)
+        part = _Chunk(data, _pts_seconds(pts, self._part_pts), self._part_independent)
+        self._part = []
+        self._part_pts = pts
+        with self.changed:
+            seg.parts.append(part)
+            self._playlist = None
+            self.changed.notify_all()
+
+    def _close_segment(self, pts: int) -> None:
+        seg = self._current
+        if seg is None:
+            return
+        with self.changed:
+            seg.data = b"".join(p.data for p in seg.parts)
+            seg.duration = _pts_seconds(pts, seg.start_pts)
+            self._playlist = None
+            self.changed.notify_all()
+
+    def _drop_open_segment(self) -> None:
+        """Discard a segment that outgrew ``max_open_bytes``; restart at the next keyframe."""
+        seg = self._current
+        log.warning("HLS segment %s grew past %d bytes without a boundary; dropped", seg.msn, self.max_open_bytes)
+        self._current = None
+        self._part = []
+        self._open_bytes = 0
+        self.overflows += 1
+        with self.changed:
+            if self.segments and self.segments[-1] is seg:
+                self.segments.pop()
+            self._playlist = None
+            self.changed.notify_all()
+
+    def _evict(self) -> None:
+        complete = [s for s in self.segments if s.data is not None]
+        total = sum(len(s.data) for s in complete)
+        while len(complete) > self.list_size + 2 or (total > self.max_bytes and len(complete) > 2):
+            old = self.segments.popleft()
+            complete.remove(old)
+            total -= len(old.data or b"")
+            self.evicted += 1
+
+    # --- serving ------------------------------------------------------------
+    def name(self, msn: int, part: Optional[int] = None) -> str:
+        return f"{self.session}-{msn}" + (f".{part}" if part is not None else "") + ".ts"
+
+    def lookup(self, name: str) -> Optional[bytes]:
+        """Bytes of a segment (``<session>-<msn>.ts``) or part (``<session>-<msn>.<i>.ts``)."""
+        stem = name[:-3] if name.endswith(".ts") else name
+        session, _, rest = stem.partition("-")
+        if session != self.session:
+            return None
+        msn_s, _, part_s = rest.partition(".")
+        try:
+            msn = int(msn_s)
+            part = int(part_s) if part_s else None
+        except ValueError:
+            return None
+        with self.changed:
+            for seg in self.segments:
+                if seg.msn != msn:
+                    continue
+                if part is None:
+                    return seg.data
+                return seg.parts[part].data if part < len(seg.parts) else None
+        return None
+
+    def has(self, msn: int, part: Optional[int]) -> bool:
+        with self.changed:
+            for seg in reversed(self.segments):
+                if seg.msn == msn:
+                    return seg.data is not None if part is None else (seg.data is not None or len(seg.parts) > part)
+                if seg.msn < msn:
+                    return False
+        return False
+
+    def playlist(self) -> Optional[str]:
+        """The media playlist, rendered once per new part/segment."""
+        with self.changed:
+            if self._playlist is not None:
+                return self._playlist
+            segments = list(self.segments)
+            complete = [s for s in segments if s.data is not None][-self.list_size:]
+            if not complete:
+                return None
+            first = complete[0].msn
+            target = max(1, int(max(s.duration for s in complete) + 0.999))
+            lines = ["#EXTM3U", "#EXT-X-VERSION:6" if self.part_s else "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}"]
+            if self.part_s:
+                lines.append(f"#EXT-X-PART-INF:PART-TARGET={self.part_s:.3f}")
+                lines.append(f"#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={3 * self.part_s:.3f}")
+            lines.append(f"#EXT-X-MEDIA-SEQUENCE:{first}")
+            recent = {s.msn for s in complete[-2:]}
+            for seg in segments:
+                if seg.msn < first:
+                    continue
+                if self.part_s and (seg.msn in recent or seg.data is None):
+                    for i, part in enumerate(seg.parts):
+                        independent = ",INDEPENDENT=YES" if part.independent else ""
+                        lines.append(f'#EXT-X-PART:DURATION={part.duration:.3f},URI="{self.name(seg.msn, i)}"{independent}')
+                if seg.data is not None:
+                    lines.append(f"#EXTINF:{seg.duration:.3f},")
+                    lines.append(self.name(seg.msn))
+                elif self.part_s:
+                    lines.append(f'#EXT-X-PRELOAD-HINT:TYPE=PART,URI="{self.name(seg.msn, len(seg.parts))}"')
+            self._playlist = "\n".join(lines) + "\n"
+            self.playlist_renders += 1
+            return self._playlist
+
+    def status(self) -> Dict[str, Any]:
+        with self.changed:
+            complete = [s for s in self.segments if s.data is not None]
+            return {
+                "segments": len(complete),
+                "first_msn": complete[0].msn if complete else None,
+                "last_msn": complete[-1].msn if complete else None,
+                "cached_mb": round(sum(len(s.data) for s in complete) / (1 << 20), 2),
+                "evicted": self.evicted,
+                "overflows": self.overflows,
+                "playlist_renders": self.playlist_renders,
+            }
+
+
+class HlsStream:
+    """ffmpeg encoder + segmenter for one camera, started on demand."""
+
+    def __init__(self, camera_id: str, fps: int = HLS_FPS, bitrate_kbps: Callable[[], int] = lambda: 1500):
+        self.camera_id = camera_id
+        self.fps = fps
+        self.bitrate_kbps = bitrate_kbps
+        self.segmenter: Optional[TsSegmenter] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._frames: "queue.Queue[bytes]" = queue.Queue(maxsize=2)
+        self._lock = threading.Lock()
+        self.last_request = 0.0
+        self.started_at: Optional[float] = None
+        self.frames_in = 0
+        self.frames_dropped = 0
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def tap(self, jpeg: bytes, ts: float) -> None:
+        """Frame hook for StreamingOutput; drops frames instead of blocking the camera."""
+        if self._proc is None:
+            return
+        try:
+            self._frames.put_nowait(bytes(jpeg))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _command(self, ffmpeg: str) -> List[str]:
+        gop = max(1, int(round(self.fps * HLS_SEGMENT_S)))
+        return [
+            ffmpeg, "-loglevel", "error", "-fflags", "nobuffer",
+            "-use_wallclock_as_timestamps", "1", "-f", "mjpeg", "-i", "pipe:0",
+            "-an", "-r", str(self.fps), "-c:v", HLS_ENCODER, *shlex.split(HLS_ENCODER_ARGS),
+            "-b:v", f"{self.bitrate_kbps()}k", "-g", str(gop), "-keyint_min", str(gop),
+            "-f", "mpegts", "-mpegts_flags", "resend_headers", "-muxdelay", "0", "-muxpreload", "0",
+            "pipe:1",
+        ]
+
+    def ensure_started(self) -> None:
+        self.last_request = time.monotonic()
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            ffmpeg = shutil.which("ffmpeg")
+            if ffmpeg is None:
+                raise HlsUnavailable("ffmpeg is not installed")
+            if self._proc is not None:
+                self.restarts += 1
+            session = secrets.token_hex(6)  # never reused, even by a restart in the same second
+            self.segmenter = TsSegmenter(session)
+            self._frames = queue.Queue(maxsize=2)
+            self._proc = subprocess.Popen(
+                self._command(ffmpeg), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+            self.started_at = time.time()
+            proc, segmenter = self._proc, self.segmenter
+            threading.Thread(target=self._write_loop, args=(proc,), name=f"hls-in-{self.camera_id}", daemon=True).start()
+            threading.Thread(target=self._read_loop, args=(proc, segmenter), name=f"hls-out-{self.camera_id}", daemon=True).start()
+            log.info("HLS encoder started for camera %s (%s, %d fps)", self.camera_id, HLS_ENCODER, self.fps)
+
+    def _write_loop(self, proc: subprocess.Popen) -> None:
+        try:
+            while proc.poll() is None:
+                if time.monotonic() - self.last_request > HLS_IDLE_S:
+                    log.info("HLS for camera %s idle for %.0fs; stopping encoder", self.camera_id, HLS_IDLE_S)
+                    break
+                try:
+                    jpeg = self._frames.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                proc.stdin.write(jpeg)
+                proc.stdin.flush()
+                self.frames_in += 1
+        except (BrokenPipeError, OSError) as e:
+            log.warning("HLS encoder input closed for camera %s: %s", self.camera_id, e)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def _read_loop(self, proc: subprocess.Popen, segmenter: TsSegmenter) -> None:
+        while True:
+            data = proc.stdout.read1(TS_PACKET * 64) if hasattr(proc.stdout, "read1") else proc.stdout.read(TS_PACKET * 64)
+            if not data:
+                break
+            segmenter.feed(data)
+        rc = proc.wait()
+        if rc:
+            err = proc.stderr.read().decode(errors="replace").strip()
+            log.error("HLS encoder for camera %s exited rc=%s: %s", self.camera_id, rc, err[-500:])
+
+    def stop(self) -> None:
+        with self._lock:
+            proc = self._proc
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "encoder": HLS_ENCODER,
+            "fps": self.fps,
+            "started_at": self.started_at,
+            "frames_in": self.frames_in,
+            "frames_dropped": self.frames_dropped,
+            "restarts": self.restarts,
+            "segmenter": self.segmenter.status() if self.segmenter is not None else None,
+        }
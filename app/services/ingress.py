@@ -0,0 +1,219 @@
+"""Find-or-create LiveKit RTMP ingresses, reusing what the SFU already has.
+
+An ingress is identified by ``(name, room)``. :meth:`IngressManager.ensure`
+resolves one in this order, stopping at the first hit:
+
+1. the in-memory entry, if validated less than ``revalidate_s`` ago
+   (no round trip);
+2. the local cache file (``INGRESS_CACHE_PATH``), validated with a
+   ``ListIngress`` for that ingress ID - it must still exist with the same
+   name, room and stream key;
+3. a ``ListIngress`` for the room, matching on name. With duplicates, the
+   one to keep is the one a publisher is streaming to, else the one whose
+   stream key is already known (cache file or ``INGRESS_KEY_PATH``, which
+   the shell publisher reads), else the first listed; with ``prune`` the
+   others are deleted;
+4. ``CreateIngress``.
+
+The result is written back to the cache file (mode 0600: it holds stream
+keys). The cache and key files are read and written on the ``network``
+executor, never on the event loop. Concurrent calls for the same
+``(name, room)`` share one lookup, and one ``LiveKitAPI`` client (one aiohttp
+connection pool) serves every call until :meth:`IngressManager.aclose`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .executors import run_in
+from .log import get_logger
+from .startup import PROJECT_ROOT
+
+log = get_logger("webrtc")
+
+INGRESS_CACHE_PATH = os.getenv("INGRESS_CACHE_PATH", str(PROJECT_ROOT / "webrtc" / "ingress_cache.json"))
+INGRESS_REVALIDATE_S = float(os.getenv("INGRESS_REVALIDATE_S", "300"))
+INGRESS_KEY_PATH = os.getenv("INGRESS_KEY_PATH", str(PROJECT_ROOT / "webrtc" / "ingress_key.txt"))
+
+# livekit IngressState.Status values for an ingress that is receiving media
+_LIVE_STATES = (1, 2)  # ENDPOINT_BUFFERING, ENDPOINT_PUBLISHING
+
+
+class IngressUnavailable(RuntimeError):
+    """livekit-api is not installed or LiveKit is not configured."""
+
+
+def _livekit() -> Any:
+    try:
+        from livekit import api as lk  # type: ignore
+    except Exception as e:
+        raise IngressUnavailable(f"livekit-api not installed: {e}")
+    return lk
+
+
+def _entry(info: Any) -> Dict[str, str]:
+    return {
+        "ingress_id": info.ingress_id,
+        "name": info.name,
+        "room": info.room_name,
+        "stream_key": info.stream_key,
+        "rtmp_url": info.url,
+    }
+
+
+def _live(info: Any) -> bool:
+    state = getattr(info, "state", None)
+    return getattr(state, "status", None) in _LIVE_STATES
+
+
+class IngressManager:
+    def __init__(
+        self,
+        host: str,
+        api_key: str,
+        api_secret: str,
+        cache_path: Optional[str] = INGRESS_CACHE_PATH,
+        revalidate_s: float = INGRESS_REVALIDATE_S,
+        lk: Any = None,
+        key_file: Optional[str] = INGRESS_KEY_PATH,
+    ):
+        self.host = host
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.revalidate_s = revalidate_s
+        self.key_file = Path(key_file) if key_file else None
+        self._lk = lk  # the livekit.api module (or a stand-in); imported on first use
+        self._client: Any = None
+        self._memo: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.round_trips = 0
+
+    # --- Client --------------------------------------------------------------
+    def _module(self) -> Any:
+        if self._lk is None:
+            self._lk = _livekit()
+        return self._lk
+
+    def client(self) -> Any:
+        """The shared LiveKitAPI client; call from the event loop that uses it."""
+        if self._client is None:
+            if not self.host:
+                raise IngressUnavailable("LIVEKIT_HOST not configured")
+            if not self.api_key or not self.api_secret:
+                raise IngressUnavailable("LIVEKIT API credentials not configured")
+            self._client = self._module().LiveKitAPI(self.host, self.api_key, self.api_secret)
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    # --- Local cache -----------------------------------------------------------
+    def _read_cache(self) -> Dict[str, Dict[str, str]]:
+        if self.cache_path is None:
+            return {}
+        try:
+            data = json.loads(self.cache_path.read_text())
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, key: Tuple[str, str], entry: Optional[Dict[str, str]]) -> None:
+        if self.cache_path is None:
+            return
+        data = self._read_cache()
+        slot = f"{key[1]}/{key[0]}"
+        if entry is None:
+            data.pop(slot, None)
+        else:
+            data[slot] = entry
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        # Created 0600 (it holds stream keys); fchmod covers a stale tmp left by a crash.
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            os.fchmod(fd, 0o600)
+            f.write(json.dumps(data, indent=2) + "\n")
+        os.replace(tmp, self.cache_path)
+
+    def _key_file_stream_key(self) -> Optional[str]:
+        if self.key_file is None:
+            return None
+        try:
+            lines = self.key_file.read_text().splitlines()
+        except OSError:
+            return None
+        for line in lines:
+            key, _, value = line.partition("=")
+            if key.strip() == "STREAM_KEY" and value.strip():
+                return value.strip()
+        return None
+
+    # --- Lookup ----------------------------------------------------------------
+    async def _list(self, **fields: str) -> list:
+        lk = self._module()
+        self.round_trips += 1
+        resp = await self.client().ingress.list_ingress(lk.ListIngressRequest(**fields))
+        return list(resp.items)
+
+    async def ensure(self, room: str, name: str, prune: bool = False) -> Dict[str, Any]:
+        """The ingress for ``(name, room)``, reused when it exists; see the module docs."""
+        key = (name, room)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            memo = self._memo.get(key)
+            if memo is not None and time.monotonic() - memo[0] < self.revalidate_s:
+                return {**memo[1], "source": "memory"}
+
+            cached = memo[1] if memo else None
+            if cached is None:
+                cached = (await run_in("network", self._read_cache)).get(f"{room}/{name}")
+            if cached and cached.get("ingress_id"):
+                found = await self._list(ingress_id=cached["ingress_id"])
+                match = next((
+                    i for i in found
+                    if i.name == name and i.room_name == room and i.stream_key == cached.get("stream_key")
+                ), None)
+                if match is not None:
+                    return await self._remember(key, _entry(match), "cache")
+                log.info("Cached ingress %s for %s/%s is gone or changed; looking it up", cached["ingress_id"], room, name)
+                await run_in("network", self._write_cache, key, None)
+
+            same = [i for i in await self._list(room_name=room) if i.name == name]
+            if same:
+                key_file_key = await run_in("network", self._key_file_stream_key)
+                known = {k for k in ((cached or {}).get("stream_key"), key_file_key) if k}
+                # max() keeps the first of equals, so ties go to listing order
+                keep = max(same, key=lambda i: (_live(i), i.stream_key in known))
+                extra = [i for i in same if i is not keep]
+                if extra:
+                    if prune:
+                        lk = self._module()
+                        for dup in extra:
+                            self.round_trips += 1
+                            await self.client().ingress.delete_ingress(lk.DeleteIngressRequest(ingress_id=dup.ingress_id))
+                        log.info("Deleted %d duplicate ingresses for %s/%s", len(extra), room, name)
+                    else:
+                        log.warning("%d duplicate ingresses for %s/%s on the server (prune to delete)", len(extra), room, name)
+                return await self._remember(key, _entry(keep), "listed")
+
+            lk = self._module()
+            self.round_trips += 1
+            created = await self.client().ingress.create_ingress(
+                lk.CreateIngressRequest(input_type=lk.IngressInput.RTMP_INPUT, name=name, room_name=room)
+            )
+            log.info("Created ingress %s for %s/%s", created.ingress_id, room, name)
+            return await self._remember(key, _entry(created), "created")
+
+    async def _remember(self, key: Tuple[str, str], entry: Dict[str, str], source: str) -> Dict[str, Any]:
+        self._memo[key] = (time.monotonic(), entry)
+        if source != "cache":
+            await run_in("network", self._write_cache, key, entry)
+        return {**entry, "source": source}
@@ -0,0 +1,252 @@
+"""Write-ahead journal for the stepper's position and enable state.
+
+One record per line: ``<crc32 hex> <json>``. Records that change what the
+motor is allowed to do are durable before the call returns (written and
+fsynced): enable/disable, the intent of a move (start position and target)
+before its first pulse, the end of a move, and a manual position set.
+Position updates during a move only update memory; a flusher thread writes
+the latest one and fsyncs at most every ``fsync_interval_s``, so a move
+costs a handful of SD card syncs, not one per step.
+
+On start-up :meth:`PositionJournal.restore` replays the file, stopping at
+the first torn or corrupt line (a crash mid-write). If the last move has
+its end record the restored position is exact and no homing is needed. If
+a move was in flight, the position is the last flushed one and the motor
+is somewhere between it and the move's target; that range is reported and
+homing is recommended. That uncertainty is carried in the checkpoints
+(later relative moves don't remove it) until :meth:`set_position` declares
+the position after homing. Restoring also compacts the journal to a single
+checkpoint (written to a temp file, fsynced, renamed), as does every
+``compact_after`` records.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+from .log import get_logger
+from .startup import PROJECT_ROOT
+
+log = get_logger("stepper")
+
+STEPPER_JOURNAL = os.getenv("STEPPER_JOURNAL", str(PROJECT_ROOT / "data" / "stepper.journal"))  # empty: off
+STEPPER_JOURNAL_FSYNC_S = float(os.getenv("STEPPER_JOURNAL_FSYNC_S", "0.25"))
+
+
+class Restored(NamedTuple):
+    position: int
+    enabled: bool
+    consistent: bool  # the position is exact; no homing needed
+    in_flight: Optional[Dict[str, Any]]  # intent of a move cut short by the crash
+    min_position: int  # where the motor can be (equal to position when consistent)
+    max_position: int
+    records: int
+    torn: bool  # a trailing damaged record was dropped
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(payload.encode()):08x} {payload}\n".encode()
+
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    crc, _, payload = line[:-1].partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class PositionJournal:
+    def __init__(self, path: str, fsync_interval_s: float = STEPPER_JOURNAL_FSYNC_S, compact_after: int = 4096):
+        self.path = Path(path)
+        self.fsync_interval_s = fsync_interval_s
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._records = 0
+        self._position = 0
+        self._enabled = False
+        self._pending: Optional[int] = None  # position not yet written
+        self._unc = (0, 0)  # how far below/above the recorded position the motor may be
+        self._move_id = 0
+        self.syncs = 0
+        self.restored: Optional[Restored] = None
+        self.restore_ms: Optional[float] = None
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # --- Start-up ----------------------------------------------------------
+    def restore(self) -> Restored:
+        """Replay the journal, compact it and start the flusher."""
+        t0 = time.perf_counter()
+        position, enabled, in_flight, records, torn = 0, False, None, 0, False
+        lo, hi = 0, 0
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            data = b""
+        for line in data.splitlines(keepends=True):
+            rec = _decode(line)
+            if rec is None:
+                torn = True
+                break
+            records += 1
+            kind = rec.get("t")
+            if kind == "cp":
+                position, enabled, in_flight = rec["pos"], rec["en"], None
+                lo, hi = rec.get("unc", (0, 0))
+            elif kind == "en":
+                enabled = rec["on"]
+            elif kind == "mv":
+                position, in_flight = rec["start"], rec
+                self._move_id = max(self._move_id, rec["id"])
+            elif kind == "pos":
+                position = rec["pos"]
+            elif kind == "end":
+                position, in_flight = rec["pos"], None
+            elif kind == "set":
+                position, in_flight, lo, hi = rec["pos"], None, 0, 0
+        if in_flight is not None:
+            # Steps after the last flushed position went toward the target
+            d = in_flight["target"] - position
+            lo, hi = lo + min(0, d), hi + max(0, d)
+        restored = Restored(
+            position, enabled, (lo, hi) == (0, 0), in_flight, position + lo, position + hi, records, torn,
+        )
+
+        with self._lock:
+            self._position, self._enabled, self._unc = position, enabled, (lo, hi)
+            self._compact_locked()
+        self.restored = restored
+        self.restore_ms = round((time.perf_counter() - t0) * 1000.0, 3)
+        if torn:
+            log.warning("Journal %s: dropped a damaged trailing record after %d good ones", self.path, records)
+        if not restored.consistent:
+            log.warning(
+                "Journal %s: %s; position %d, motor between %d and %d - homing recommended",
+                self.path, f"move {in_flight['id']} did not finish" if in_flight else "position unverified since an earlier crash",
+                position, restored.min_position, restored.max_position,
+            )
+        else:
+            log.info("Journal %s: restored position %d (enabled=%s) in %.1f ms", self.path, position, enabled, self.restore_ms)
+        self._flusher = threading.Thread(target=self._flush_loop, name="stepper-journal", daemon=True)
+        self._flusher.start()
+        return restored
+
+    # --- Records -------------------------------------------------------------
+    def set_enabled(self, on: bool) -> None:
+        with self._lock:
+            self._enabled = on
+            self._append_locked({"t": "en", "on": on}, sync=True)
+
+    def begin_move(self, start: int, target: int) -> int:
+        """Durably record a move's intent; call before the first pulse."""
+        with self._lock:
+            self._move_id += 1
+            self._position = start
+            self._append_locked({"t": "mv", "id": self._move_id, "start": start, "target": target}, sync=True)
+            return self._move_id
+
+    def progress(self, position: int) -> None:
+        """The position after a step; written by the flusher, not here."""
+        self._pending = position
+
+    def end_move(self, position: int, aborted: bool = False) -> None:
+        with self._lock:
+            self._pending = None
+            self._position = position
+            self._append_locked({"t": "end", "id": self._move_id, "pos": position, "aborted": aborted}, sync=True)
+            if self._records >= self.compact_after:
+                self._compact_locked()
+
+    def set_position(self, position: int) -> None:
+        """Declare the position (after homing by hand); clears any doubt."""
+        with self._lock:
+            self._pending = None
+            self._position = position
+            self._unc = (0, 0)
+            self._append_locked({"t": "set", "pos": position}, sync=True)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_pending_locked()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._flush_pending_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    @property
+    def homing_required(self) -> bool:
+        return self._unc != (0, 0)
+
+    def status(self) -> Dict[str, Any]:
+        r = self.restored
+        return {
+            "path": str(self.path),
+            "records": self._records,
+            "syncs": self.syncs,
+            "fsync_interval_s": self.fsync_interval_s,
+            "restore_ms": self.restore_ms,
+            "restored_from_interrupted_move": bool(r and r.in_flight),
+            "torn_record_dropped": r.torn if r else None,
+            "homing_required": self.homing_required,
+            "position_uncertainty_steps": list(self._unc),
+        }
+
+    # --- Internals -------------------------------------------------------------
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval_s):
+            if self._pending is not None:
+                try:
+                    self.flush()
+                except OSError as e:  # pragma: no cover
+                    log.error("Journal flush failed: %s", e)
+
+    def _flush_pending_locked(self) -> None:
+        pending = self._pending
+        if pending is not None and self._fd is not None:
+            self._pending = None
+            self._position = pending
+            self._append_locked({"t": "pos", "pos": pending}, sync=True)
+
+    def _append_locked(self, record: Dict[str, Any], sync: bool) -> None:
+        if self._fd is None:
+            return
+        os.write(self._fd, _encode(record))
+        self._records += 1
+        if sync:
+            os.fsync(self._fd)
+            self.syncs += 1
+
+    def _compact_locked(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_encode({"t": "cp", "pos": self._position, "en": self._enabled, "unc": list(self._unc)}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        dir_fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self._records = 1
+        self.syncs += 1
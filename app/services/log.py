@@ -0,0 +1,192 @@
+"""Non-blocking, structured logging for the API and the camera daemons.
+
+Hot paths (frame loops, valve writes, probe failures) must never wait on
+stdout: under journald on an SD card a synchronous ``print`` can stall for
+tens of milliseconds. Records are instead put on a bounded in-memory queue
+(never blocking; overflow is counted and dropped) and written by a single
+background thread.
+
+    from ..services.log import get_logger
+    log = get_logger("valve")
+    log.warning("write failed", extra={"fields": {"ch": ch, "error": str(e)}})
+
+Configuration (env):
+
+    LOG_LEVEL=INFO                     default level for every subsystem
+    LOG_LEVELS=camera=DEBUG,valve=WARNING
+                                       per-subsystem overrides
+    LOG_FORMAT=text|json               one line per record either way
+    LOG_RATE_LIMIT_S=10                repeats of the same message text from
+                                       the same subsystem within this window
+                                       are dropped; the next one carries
+                                       suppressed=N
+    LOG_QUEUE_SIZE=10000               records buffered before dropping
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+ROOT = "uuplastination"
+
+_configured = False
+_config_lock = threading.Lock()
+_listener: Optional["_Listener"] = None
+_queue_handler: Optional["_DroppingQueueHandler"] = None
+
+
+class _RateLimiter(logging.Filter):
+    """Drops repeats of the same (subsystem, message) within ``window`` seconds."""
+
+    def __init__(self, window: float) -> None:
+        super().__init__()
+        self.window = window
+        self._lock = threading.Lock()
+        self._seen: Dict[Tuple[str, str], list] = {}  # key -> [last_emit, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0 or getattr(record, "rate_limit", True) is False:
+            return True
+        key = (record.name, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            suppressed = entry[1] if entry is not None else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 4096:  # bound memory when messages embed varying values
+                self._seen.clear()
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller; counts records it had to drop."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full; wait (briefly) for the writer instead of raising.
+        try:
+            self.queue.put(self._sentinel, timeout=5.0)
+        except queue.Full:  # pragma: no cover - writer wedged; let stop() time out
+            pass
+
+
+class _Formatter(logging.Formatter):
+    def __init__(self, fmt: str) -> None:
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: Dict[str, Any] = dict(getattr(record, "fields", None) or {})
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        subsystem = record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if self.json:
+            doc = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "subsystem": subsystem,
+                "msg": message,
+                **fields,
+            }
+            if record.exc_text:
+                doc["exc"] = record.exc_text
+            return json.dumps(doc, default=str)
+        line = f"{record.levelname} [{subsystem}] {message}"
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def _parse_levels(raw: str) -> Dict[str, str]:
+    levels = {}
+    for part in raw.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(stream=None) -> None:
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _configured, _listener, _queue_handler
+    if _configured:
+        return
+    with _config_lock:
+        if _configured:
+            return
+        root = logging.getLogger(ROOT)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(f"{ROOT}.{name}").setLevel(level)
+
+        q: "queue.Queue[logging.LogRecord]" = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        _queue_handler = _DroppingQueueHandler(q)
+        _queue_handler.addFilter(_RateLimiter(float(os.getenv("LOG_RATE_LIMIT_S", "10"))))
+        root.addHandler(_queue_handler)
+
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(_Formatter(os.getenv("LOG_FORMAT", "text").lower()))
+        _listener = _Listener(q, writer, respect_handler_level=False)
+        _listener.start()
+        _configured = True
+
+
+def shutdown() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _configured, _listener, _queue_handler
+    with _config_lock:
+        if _listener is not None:
+            _listener.stop()
+        if _queue_handler is not None:
+            logging.getLogger(ROOT).removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
+        _configured = False
+
+
+atexit.register(shutdown)
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Logger for ``subsystem`` (camera, valve, stepper, publisher, ...)."""
+    configure()
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+def stats() -> Dict[str, Any]:
+    handler = _queue_handler
+    return {
+        "queued": handler.queue.qsize() if handler is not None else 0,
+        "dropped": handler.dropped if handler is not None else 0,
+    }
@@ -0,0 +1,236 @@
+"""Per-route request timing and an on-demand sampling profiler.
+
+:class:`TimingMiddleware` is a plain ASGI middleware (it does not buffer
+bodies, so MJPEG streams pass straight through). For every request it
+records, under the matched route template (``GET /camera/stream.mjpg``):
+
+    in_flight     requests currently being handled
+    ttfb_ms       time until the response headers were sent
+    duration_ms   time until the response finished (stream lifetime for MJPEG)
+    status        counts per status class (2xx, 4xx, 5xx)
+
+as fixed-bucket histograms, so recording is O(1) and memory stays constant.
+
+:func:`sample_profile` samples every thread's Python stack via
+``sys._current_frames()`` for a fixed time and returns them in the
+collapsed-stack format (``thread;module:func:line;... count``) understood by
+flamegraph.pl, speedscope and inferno. It runs inside the live API process,
+so production regressions can be profiled on the Pi without a restart.
+"""
+from __future__ import annotations
+
+import bisect
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_PENDING = "(routing)"  # key of requests whose route is not resolved yet
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max for the open bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                bound = float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3) if self.count else None,
+            "buckets": {(f"le_{b}" if i < len(BUCKETS_MS) else "inf"): n
+                        for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if n},
+        }
+
+
+class _RouteStats:
+    __slots__ = ("in_flight", "peak_in_flight", "ttfb", "duration", "status")
+
+    def __init__(self, in_flight: int = 0, peak_in_flight: int = 0) -> None:
+        self.in_flight = in_flight
+        self.peak_in_flight = peak_in_flight
+        self.ttfb = Histogram()
+        self.duration = Histogram()
+        self.status: Counter = Counter()
+
+
+class RouteMetrics:
+    """Thread-safe registry of per-route timing."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[str, _RouteStats] = {}
+        self.started = time.time()
+
+    def _get(self, key: str) -> _RouteStats:
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes.setdefault(key, _RouteStats())
+        return stats
+
+    def begin(self, key: str) -> None:
+        with self._lock:
+            stats = self._get(key)
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+    def moved(self, old: str, new: str) -> None:
+        """Re-attribute an in-flight request once routing has resolved its template."""
+        with self._lock:
+            self._get(old).in_flight -= 1
+            stats = self._get(new)
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+    def end(self, key: str, status: int, ttfb_ms: Optional[float], duration_ms: float) -> None:
+        with self._lock:
+            stats = self._get(key)
+            stats.in_flight -= 1
+            if ttfb_ms is not None:
+                stats.ttfb.observe(ttfb_ms)
+            stats.duration.observe(duration_ms)
+            stats.status[f"{status // 100}xx" if status else "none"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            # Requests still being routed (including this snapshot's own) only count in the total.
+            routing = sum(s.in_flight for k, s in self._routes.items() if k.endswith(_PENDING))
+            routes = {
+                key: {
+                    "in_flight": s.in_flight,
+                    "peak_in_flight": s.peak_in_flight,
+                    "status": dict(s.status),
+                    "ttfb_ms": s.ttfb.snapshot(),
+                    "duration_ms": s.duration.snapshot(),
+                }
+                for key, s in sorted(self._routes.items())
+                if not key.endswith(_PENDING) and (s.duration.count or s.in_flight)
+            }
+        return {
+            "since": self.started,
+            "in_flight": routing + sum(r["in_flight"] for r in routes.values()),
+            "routes": routes,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            # Open requests keep their count so their end() still balances; peaks restart from it.
+            self._routes = {
+                k: _RouteStats(in_flight=s.in_flight, peak_in_flight=s.in_flight)
+                for k, s in self._routes.items() if s.in_flight
+            }
+            self.started = time.time()
+
+
+route_metrics = RouteMetrics()
+
+
+class TimingMiddleware:
+    """ASGI middleware feeding :data:`route_metrics` (HTTP requests only)."""
+
+    def __init__(self, app, metrics: RouteMetrics = route_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics = self.metrics
+        method = scope.get("method", "GET")
+        key = f"{method} {_PENDING}"
+        metrics.begin(key)
+        started = time.perf_counter()
+        ttfb: Optional[float] = None
+        status = 0
+
+        def resolve() -> str:
+            # Starlette stores the matched route in the scope during routing.
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            return f"{method} {path}" if path else f"{method} (unmatched)"
+
+        async def send_wrapper(message):
+            nonlocal ttfb, status, key
+            if message["type"] == "http.response.start":
+                ttfb = (time.perf_counter() - started) * 1000.0
+                status = message.get("status", 0)
+                if key.endswith(_PENDING):
+                    new = resolve()
+                    metrics.moved(key, new)
+                    key = new
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if key.endswith(_PENDING):
+                new = resolve()
+                metrics.moved(key, new)
+                key = new
+            metrics.end(key, status, ttfb, (time.perf_counter() - started) * 1000.0)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_profile(seconds: float = 5.0, hz: float = 100.0, max_depth: int = 64) -> Dict[str, Any]:
+    """Sample all threads' stacks for ``seconds`` at ``hz``; returns collapsed stacks."""
+    me = threading.get_ident()
+    interval = 1.0 / max(1.0, hz)
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts: List[str] = []
+            while frame is not None and len(parts) < max_depth:
+                parts.append(_frame_label(frame))
+                frame = frame.f_back
+            parts.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(parts))] += 1
+        samples += 1
+        time.sleep(interval)
+    return {
+        "seconds": seconds,
+        "hz": hz,
+        "samples": samples,
+        "collapsed": "\n".join(f"{stack} {n}" for stack, n in stacks.most_common()) + "\n",
+    }
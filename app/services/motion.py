@@ -0,0 +1,328 @@
+"""Coordinated multi-axis stepper moves driven from one timing loop.
+
+Axes come from ``STEPPER_AXES``: comma-separated
+``name:step_pin:dir_pin[:enable_pin[:steps_per_rev]]`` (enable ``-1`` for
+none), e.g. ``pump_a:5:6:12,pump_b:13:19:16,valve:20:21:-1:400``. Keep
+them off the single stepper's pins (``VALVE_PIN_*``, default 23/24/18).
+
+A move gives each axis a relative step count. The axis with the most steps
+is the master and steps on every tick; the others are spread over the same
+ticks with a Bresenham/DDA accumulator that starts half full, so each
+axis's steps are centred in the move: an axis with ``c`` of the master's
+``n`` steps makes its first step about ``n / 2c`` ticks after the start and
+its last about as long before the end (its own half step interval). One
+worker thread runs the loop: per tick, one bulk write raises the STEP pins
+of every axis due on that tick and one drops them (all pins are claimed as
+one group, so on a chardev backend that is one ioctl each).
+
+Speed is set for the master axis (``rpm`` in its revolutions, or a target
+``duration_s``); with ``accel_sps2`` > 0 the tick rate follows a
+trapezoidal profile. Aborting stops every axis within the current pulse.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from .clips import freeze_all
+from .gpio import GpioBackend, get_backend
+from .log import get_logger
+from .simulation import REAL_CLOCK, Clock
+
+log = get_logger("motion")
+
+STEPPER_AXES = os.getenv("STEPPER_AXES", "")
+MOTION_DEFAULT_RPM = float(os.getenv("MOTION_DEFAULT_RPM", os.getenv("STEPPER_DEFAULT_RPM", "60")))
+MOTION_ACCEL_SPS2 = float(os.getenv("MOTION_ACCEL_SPS2", "0"))  # 0: constant speed
+MOTION_INVERT_ENABLE = os.getenv("STEPPER_INVERT_ENABLE", "1") not in ("0", "false", "False")
+
+
+class MotionUnavailable(RuntimeError):
+    """``STEPPER_AXES`` is malformed, so there is no controller to drive."""
+
+
+class AxisConfig(NamedTuple):
+    name: str
+    pin_step: int
+    pin_dir: int
+    pin_enable: Optional[int] = None
+    steps_per_rev: int = 200
+
+
+def parse_axes(spec: str) -> List[AxisConfig]:
+    """Parse a ``STEPPER_AXES`` string; raises ``ValueError`` on a bad entry."""
+    axes: List[AxisConfig] = []
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        parts = entry.split(":")
+        if len(parts) < 3 or not parts[0]:
+            raise ValueError(f"bad axis {entry!r}; expected name:step:dir[:enable[:steps_per_rev]]")
+        enable = int(parts[3]) if len(parts) > 3 and parts[3] not in ("", "-1") else None
+        spr = int(parts[4]) if len(parts) > 4 and parts[4] else 200
+        axes.append(AxisConfig(parts[0], int(parts[1]), int(parts[2]), enable, spr))
+    names = [a.name for a in axes]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate axis names in {spec!r}")
+    return axes
+
+
+def dda(counts: Dict[str, int]) -> Iterator[List[str]]:
+    """Per tick, the axes that step; ``counts`` are absolute step counts.
+
+    Runs ``max(counts)`` ticks and emits exactly ``counts[axis]`` steps per
+    axis, evenly spread (the accumulator starts half full, so the error is
+    centred rather than all at the end).
+    """
+    n = max(counts.values(), default=0)
+    acc = {axis: n // 2 for axis in counts}
+    for _ in range(n):
+        due = []
+        for axis, c in counts.items():
+            acc[axis] += c
+            if acc[axis] >= n:
+                acc[axis] -= n
+                due.append(axis)
+        yield due
+
+
+def tick_intervals(n: int, rate_sps: float, accel_sps2: float = 0.0) -> Iterator[float]:
+    """Seconds per tick: constant, or trapezoidal with ``accel_sps2`` > 0."""
+    for i in range(n):
+        v = rate_sps
+        if accel_sps2 > 0:
+            v = min(rate_sps, math.sqrt(2.0 * accel_sps2 * (i + 1)), math.sqrt(2.0 * accel_sps2 * (n - i)))
+        yield 1.0 / v
+
+
+class MotionController:
+    """All configured axes, moved together by one worker thread."""
+
+    def __init__(
+        self,
+        axes: Sequence[AxisConfig],
+        gpio: Optional[GpioBackend] = None,
+        default_rpm: float = MOTION_DEFAULT_RPM,
+        accel_sps2: float = MOTION_ACCEL_SPS2,
+        invert_enable: bool = MOTION_INVERT_ENABLE,
+        duty_cycle: float = 0.5,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        self.axes: Dict[str, AxisConfig] = {a.name: a for a in axes}
+        self.default_rpm = default_rpm
+        self.accel_sps2 = accel_sps2
+        self.invert_enable = invert_enable
+        self.duty_cycle = min(max(duty_cycle, 0.05), 0.95)
+
+        self.clock = clock if clock is not None else REAL_CLOCK
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._abort = threading.Event()
+        self._abort_at: Optional[float] = None
+        self.last_stop_latency: Optional[float] = None
+        self.moving = False
+        self.current: Optional[Dict[str, Any]] = None  # the move in progress (or last one)
+        self.position: Dict[str, int] = {name: 0 for name in self.axes}
+        self.enabled: Dict[str, bool] = {name: a.pin_enable is None for name, a in self.axes.items()}
+        self._last_error: Optional[str] = None
+
+        self.gpio = gpio if gpio is not None else get_backend()
+        pins: List[int] = []
+        levels: List[int] = []
+        for a in self.axes.values():
+            pins += [a.pin_step, a.pin_dir]
+            levels += [0, 0]
+            if a.pin_enable is not None:
+                pins.append(a.pin_enable)
+                levels.append(self._enable_level(False))
+        if len(set(pins)) != len(pins):
+            raise ValueError("axes share GPIO pins")
+        if pins:
+            try:
+                self.gpio.claim_outputs(pins, levels)
+            except Exception as e:  # pragma: no cover
+                self.last_error = f"GPIO init failed: {e}"
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    @last_error.setter
+    def last_error(self, value: Optional[str]) -> None:
+        self._last_error = value
+        if value is not None:
+            freeze_all(f"motion: {value}")
+
+    def _enable_level(self, on: bool) -> int:
+        return int(on != self.invert_enable)
+
+    def _axis(self, name: str) -> AxisConfig:
+        try:
+            return self.axes[name]
+        except KeyError:
+            raise KeyError(f"unknown axis {name!r}") from None
+
+    # --- Public API --------------------------------------------------------
+    def axis_status(self, name: str) -> Dict[str, Any]:
+        a = self._axis(name)
+        with self._lock:
+            return {
+                "axis": name,
+                "enabled": self.enabled[name],
+                "moving": self.moving and bool(self.current and name in self.current["steps"]),
+                "position_steps": self.position[name],
+                "steps_per_rev": a.steps_per_rev,
+                "pins": {"step": a.pin_step, "dir": a.pin_dir, "enable": a.pin_enable},
+            }
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "axes": {
+                    name: {"enabled": self.enabled[name], "position_steps": self.position[name]}
+                    for name in self.axes
+                },
+                "moving": self.moving,
+                "move": dict(self.current) if self.current else None,
+                "default_rpm": self.default_rpm,
+                "accel_sps2": self.accel_sps2,
+                "last_error": self.last_error,
+                "last_stop_latency_ms": round(self.last_stop_latency * 1000.0, 3) if self.last_stop_latency is not None else None,
+                "gpio": self.gpio.info(),
+            }
+
+    def set_enabled(self, on: bool, names: Optional[Sequence[str]] = None) -> None:
+        targets = [self._axis(n) for n in (names if names is not None else list(self.axes))]
+        with self._lock:
+            if not on and self.moving:
+                raise RuntimeError("cannot disable while moving; abort first")
+            levels = {a.pin_enable: self._enable_level(on) for a in targets if a.pin_enable is not None}
+            try:
+                if levels:
+                    self.gpio.write_many(levels)
+                for a in targets:
+                    self.enabled[a.name] = on or a.pin_enable is None
+            except Exception as e:  # pragma: no cover
+                self.last_error = f"enable failed: {e}"
+
+    def abort(self) -> None:
+        """Stop the move in progress (every axis) within one pulse; never blocks."""
+        if self._abort_at is None:
+            self._abort_at = self.clock.now()
+        self._abort.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until the current move's worker has finished."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        return not self.moving
+
+    def move(
+        self,
+        steps: Dict[str, int],
+        rpm: Optional[float] = None,
+        duration_s: Optional[float] = None,
+        accel_sps2: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Start a coordinated relative move; returns the plan."""
+        steps = {name: int(n) for name, n in steps.items() if int(n) != 0}
+        for name in steps:
+            self._axis(name)
+        if not steps:
+            raise ValueError("no axis has a non-zero step count")
+        disabled = [n for n in steps if not self.enabled[n]]
+        if disabled:
+            raise RuntimeError(f"axes not enabled: {', '.join(disabled)}")
+
+        counts = {name: abs(n) for name, n in steps.items()}
+        master = max(counts, key=counts.get)
+        ticks = counts[master]
+        if duration_s is not None:
+            if duration_s <= 0:
+                raise ValueError("duration_s must be positive")
+            rate = ticks / duration_s
+        else:
+            rate = max(1.0, float(rpm or self.default_rpm)) * self.axes[master].steps_per_rev / 60.0
+        accel = self.accel_sps2 if accel_sps2 is None else max(0.0, accel_sps2)
+        plan = {
+            "steps": steps,
+            "master": master,
+            "ticks": ticks,
+            "rate_sps": round(rate, 3),
+            "accel_sps2": accel,
+            "estimated_s": round(sum(tick_intervals(ticks, rate, accel)), 4),
+        }
+
+        prev = self._worker
+        if self._abort.is_set() and prev is not None and prev.is_alive():
+            prev.join(timeout=0.1)
+        with self._lock:
+            if self.moving:
+                raise RuntimeError("already moving")
+            self._abort.clear()
+            self._abort_at = None
+            self.moving = True
+            self.current = plan
+            self._worker = threading.Thread(target=self._run, args=(steps, counts, rate, accel), name="motion", daemon=True)
+            self._worker.start()
+        return plan
+
+    # --- Timing loop -------------------------------------------------------
+    def _run(self, steps: Dict[str, int], counts: Dict[str, int], rate: float, accel: float) -> None:
+        step_pin = {name: self.axes[name].pin_step for name in steps}
+        sign = {name: 1 if n > 0 else -1 for name, n in steps.items()}
+        try:
+            with self._lock:
+                self.last_error = None
+            # Directions first, with every STEP low, so DIR is settled before
+            # the first rising edge.
+            self.gpio.write_many({
+                **{self.axes[n].pin_dir: int(s > 0) for n, s in sign.items()},
+                **{pin: 0 for pin in step_pin.values()},
+            })
+            for due, interval in zip(dda(counts), tick_intervals(max(counts.values()), rate, accel)):
+                if self._abort.is_set():
+                    break
+                hi = interval * self.duty_cycle
+                pins = [step_pin[n] for n in due]
+                self.gpio.write_many({pin: 1 for pin in pins})
+                aborted = self.clock.wait(self._abort, max(hi, 0.00005))
+                self.gpio.write_many({pin: 0 for pin in pins})
+                with self._lock:
+                    for n in due:  # the rising edge already stepped the driver
+                        self.position[n] += sign[n]
+                if aborted or self.clock.wait(self._abort, max(interval - hi, 0.00005)):
+                    break
+        except Exception as e:  # pragma: no cover
+            with self._lock:
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                if self._abort.is_set() and self._abort_at is not None:
+                    self.last_stop_latency = self.clock.now() - self._abort_at
+                self.moving = False
+
+
+_motion: Optional[MotionController] = None
+_motion_lock = threading.Lock()
+
+
+def get_motion() -> MotionController:
+    """The controller for ``STEPPER_AXES`` (no axes when it is unset).
+
+    Creating it claims the GPIO pins, so call this off the event loop.
+    """
+    global _motion
+    if _motion is None:
+        with _motion_lock:
+            if _motion is None:
+                try:
+                    axes = parse_axes(STEPPER_AXES)
+                    controller = MotionController(axes)
+                except ValueError as e:
+                    raise MotionUnavailable(f"STEPPER_AXES: {e}") from e
+                _motion = controller
+                if axes:
+                    log.info("Motion axes: %s", ", ".join(a.name for a in axes))
+    return _motion
@@ -0,0 +1,183 @@
+"""Per-service CPU, memory, thread and I/O accounting plus network rates.
+
+Each tracked systemd unit is mapped to its processes through its cgroup
+(``cgroup.procs`` under the unit's ``ControlGroup``), re-read on every
+sample; that file is tiny, so this never walks all of /proc. A
+``psutil.Process`` handle is kept per PID so CPU times and I/O counters are
+read incrementally, and handles are dropped when their PID leaves the unit.
+
+CPU is reported like ``top``: percent of one core (a service saturating two
+cores shows 200). I/O and network figures are rates over the last sample
+interval; totals are kept alongside.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+from .log import get_logger
+
+log = get_logger("stats")
+
+CGROUP_ROOT = Path(os.getenv("CGROUP_ROOT", "/sys/fs/cgroup"))
+API_SERVICE = "api"  # this process and its children, whichever unit runs it
+
+
+class _Proc:
+    __slots__ = ("handle", "cpu", "io")
+
+    def __init__(self, handle: psutil.Process):
+        self.handle = handle
+        self.cpu: Optional[float] = None  # user+system seconds at the previous sample
+        self.io: Optional[Tuple[int, int]] = None
+
+
+def _unit_cgroup(unit: str) -> Optional[Path]:
+    """The unit's cgroup directory (cgroup v2, or the v1 systemd hierarchy)."""
+    try:
+        proc = subprocess.run(
+            ["systemctl", "show", "-p", "ControlGroup", "--value", unit],
+            capture_output=True, text=True, timeout=1.0, check=False,
+        )
+        group = (proc.stdout or "").strip()
+    except Exception:
+        group = ""
+    if not group:
+        group = f"/system.slice/{unit}"
+    for base in (CGROUP_ROOT, CGROUP_ROOT / "systemd"):
+        path = base / group.lstrip("/")
+        if (path / "cgroup.procs").exists():
+            return path
+    return None
+
+
+class ServiceAccounting:
+    def __init__(self, units: Dict[str, str], refresh_cgroups_s: float = 60.0):
+        self.units = dict(units)  # service name -> systemd unit
+        self.refresh_cgroups_s = refresh_cgroups_s
+        self._lock = threading.Lock()
+        self._cgroups: Dict[str, Optional[Path]] = {}
+        self._cgroups_at = 0.0
+        self._procs: Dict[int, _Proc] = {}
+        self._net: Optional[Dict[str, Tuple[int, int]]] = None
+        self._last: Optional[float] = None
+        self.latest: Optional[Dict[str, Any]] = None
+
+    def _pids(self, name: str) -> List[int]:
+        if name == API_SERVICE:
+            me = psutil.Process()
+            return [me.pid] + [c.pid for c in me.children(recursive=True)]
+        path = self._cgroups.get(name)
+        if path is None:
+            return []
+        pids: List[int] = []
+        # Sub-cgroups (e.g. a unit's own delegated groups) hold processes too
+        for procs in [path / "cgroup.procs", *path.glob("*/cgroup.procs")]:
+            try:
+                pids.extend(int(line) for line in procs.read_text().split())
+            except (OSError, ValueError):
+                continue
+        return pids
+
+    def sample(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Read every tracked service's processes and the interface counters once."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self._cgroups_at >= self.refresh_cgroups_s or not self._cgroups:
+                # Units restart into the same cgroup path; re-resolve rarely.
+                self._cgroups = {name: _unit_cgroup(unit) for name, unit in self.units.items()}
+                self._cgroups_at = now
+            elapsed = now - self._last if self._last is not None else None
+            self._last = now
+
+            services: Dict[str, Any] = {}
+            readings: Dict[int, Any] = {}  # a PID in two services (the API's own unit) is read once
+            for name in [*self.units, API_SERVICE]:
+                services[name] = self._account(readings, self._pids(name), elapsed)
+            for pid in list(self._procs):
+                if pid not in readings:
+                    del self._procs[pid]
+
+            result = {"ts": time.time(), "services": services, "network": self._network(elapsed)}
+            self.latest = result
+            return result
+
+    def _read(self, pid: int, elapsed: Optional[float]) -> Optional[Tuple[float, int, int, Optional[Tuple[int, int]], Optional[Tuple[float, float]]]]:
+        """(cpu %, rss, threads, io totals, io rates) of one process, from its cached handle."""
+        entry = self._procs.get(pid)
+        try:
+            if entry is None:
+                entry = self._procs[pid] = _Proc(psutil.Process(pid))
+            handle = entry.handle
+            with handle.oneshot():
+                times = handle.cpu_times()
+                cpu = times.user + times.system
+                rss = handle.memory_info().rss
+                threads = handle.num_threads()
+                try:
+                    counters = handle.io_counters()
+                    io: Optional[Tuple[int, int]] = (counters.read_bytes, counters.write_bytes)
+                except (psutil.AccessDenied, AttributeError):
+                    io = None
+        except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+            self._procs.pop(pid, None)
+            return None
+        cpu_pct = max(0.0, cpu - entry.cpu) / elapsed * 100.0 if elapsed and entry.cpu is not None else 0.0
+        rates = None
+        if elapsed and io is not None and entry.io is not None:
+            rates = (max(0, io[0] - entry.io[0]) / elapsed, max(0, io[1] - entry.io[1]) / elapsed)
+        entry.cpu, entry.io = cpu, io
+        return cpu_pct, rss, threads, io, rates
+
+    def _account(self, readings: Dict[int, Any], pids: List[int], elapsed: Optional[float]) -> Dict[str, Any]:
+        alive = rss = threads = read = write = 0
+        cpu_pct = read_rate = write_rate = 0.0
+        for pid in set(pids):
+            if pid not in readings:
+                readings[pid] = self._read(pid, elapsed)
+            got = readings[pid]
+            if got is None:
+                continue
+            alive += 1
+            cpu_pct += got[0]
+            rss += got[1]
+            threads += got[2]
+            if got[3] is not None:
+                read += got[3][0]
+                write += got[3][1]
+            if got[4] is not None:
+                read_rate += got[4][0]
+                write_rate += got[4][1]
+        rated = elapsed is not None
+        return {
+            "processes": alive,
+            "cpu_percent": round(cpu_pct, 1) if rated else None,
+            "rss_mb": round(rss / (1 << 20), 1),
+            "threads": threads,
+            "io_read_bytes": read,
+            "io_write_bytes": write,
+            "io_read_bps": round(read_rate) if rated else None,
+            "io_write_bps": round(write_rate) if rated else None,
+        }
+
+    def _network(self, elapsed: Optional[float]) -> Dict[str, Any]:
+        try:
+            counters = psutil.net_io_counters(pernic=True)
+        except Exception:
+            return {}
+        current = {nic: (c.bytes_recv, c.bytes_sent) for nic, c in counters.items() if nic != "lo"}
+        previous, self._net = self._net, current
+        out: Dict[str, Any] = {}
+        for nic, (rx, tx) in current.items():
+            rates = {"rx_bytes": rx, "tx_bytes": tx, "rx_bps": None, "tx_bps": None}
+            if elapsed and previous and nic in previous:
+                rates["rx_bps"] = round(max(0, rx - previous[nic][0]) / elapsed)
+                rates["tx_bps"] = round(max(0, tx - previous[nic][1]) / elapsed)
+            out[nic] = rates
+        return out
@@ -6,8 +6,8 @@ Runs as a long-lived process (can be invoked via module) that:
  3. Publishes a video track into a LiveKit room using an access token
     fetched from the local FastAPI /webrtc/token endpoint (localhost).
  4. Auto-reconnects with exponential backoff on failures.
- 5. Exposes a simple health file updated periodically for external
-    watchdog/systemd monitoring.
+ 5. Keeps a memory-mapped health record (status, frame rate, last-frame
+    age, error count) updated in place for the API and external watchdogs.
 
 Environment variables (override defaults):
   LIVEKIT_ROOM=plastination
@@ -16,8 +16,11 @@ Environment variables (override defaults):
   CAMERA_WIDTH=1280
   CAMERA_HEIGHT=720
   CAMERA_FPS=30
-  CAMERA_SOURCE=/dev/video0 (when using OpenCV fallback)
-  HEALTH_FILE=/tmp/publisher_health.json
+  CAMERA_SOURCE=/dev/video0 (when using OpenCV fallback; or synthetic:bars, synthetic:clip=PATH)
+  FRAMEBUS_NAME= (attach to the capture daemon's frame bus instead of the camera)
+  HEALTH_FILE=/tmp/publisher_health.mmap
+  GOVERNOR_STATE_FILE=data/governor.env (the API's thermal governor;
+      its GOVERNOR_FPS_FACTOR throttles the capture loop, re-read every 5 s)
   API_BASE=http://127.0.0.1:8000
 
 This module avoids tight coupling with FastAPI app so it can run as
@@ -37,13 +40,17 @@ an alternative purely in Python for iterative development.
 from __future__ import annotations
 
 import asyncio
-import json
 import os
-import sys
 import time
 from pathlib import Path
 from typing import Optional
 
+from .governor import GOVERNOR_STATE_FILE, read_state
+from .health import HealthWriter
+from .log import get_logger
+
+log = get_logger("publisher")
+
 
 try:  # Optional dependencies
     from picamera2 import Picamera2  # type: ignore
@@ -70,33 +77,39 @@ async def _fetch_token(api_base: str, room: str, identity: str) -> str:
             return data["token"]
 
 
-class HealthWriter:
-    def __init__(self, path: Path):
-        self.path = path
-
-    def write(self, status: str, detail: Optional[str] = None):
-        payload = {
-            "ts": time.time(),
-            "status": status,
-            "detail": detail,
-            "pid": os.getpid(),
-        }
-        try:
-            self.path.write_text(json.dumps(payload))
-        except Exception:
-            pass
-
-
 class FrameSource:
-    def __init__(self, width: int, height: int, fps: int, device: str):
+    def __init__(self, width: int, height: int, fps: int, device: str, framebus: Optional[str] = None):
         self.width = width
         self.height = height
         self.fps = fps
         self.device = device
+        self.framebus = framebus
         self.picam: Optional[Picamera2] = None
         self.cap = None
+        self.bus = None
+        self._bus_seq = 0
+        self.synthetic = None
 
     def start(self):  # blocking init
+        if self.framebus:
+            # Shared capture: the daemon owns the sensor, we only attach.
+            from .framebus import FORMAT_JPEG, FrameBusReader
+
+            try:
+                bus = FrameBusReader(self.framebus)
+            except FileNotFoundError:
+                raise RuntimeError(f"frame bus {self.framebus!r} not found; is the capture daemon running?")
+            if bus.fmt == FORMAT_JPEG and not CV2_AVAILABLE:
+                bus.close()
+                raise RuntimeError("OpenCV required to decode JPEG frames from the bus")
+            self.bus = bus
+            return
+        from .synthetic import SyntheticSource, is_synthetic
+
+        if is_synthetic(self.device):
+            self.synthetic = SyntheticSource(self.width, self.height, self.fps, self.device)
+            self.synthetic.start()
+            return
         if PICAM_AVAILABLE:
             try:
                 self.picam = Picamera2()  # type: ignore
@@ -108,7 +121,7 @@ class FrameSource:
                 self.picam.start()
                 return
             except Exception as e:  # pragma: no cover
-                print(f"picamera2 init failed, falling back to OpenCV: {e}")
+                log.warning("picamera2 init failed, falling back to OpenCV: %s", e)
                 self.picam = None
         if CV2_AVAILABLE:
             self.cap = cv2.VideoCapture(self.device)
@@ -122,6 +135,10 @@ class FrameSource:
             raise RuntimeError("No camera backend available (picamera2 or OpenCV)")
 
     def read(self):
+        if self.bus is not None:
+            return self._read_bus()
+        if self.synthetic is not None:
+            return self.synthetic.read()
         if self.picam:
             try:
                 frame = self.picam.capture_array()  # numpy array RGB
@@ -135,7 +152,43 @@ class FrameSource:
             return frame
         raise RuntimeError("Camera not started")
 
+    def _read_bus(self):
+        import numpy as np  # numpy ships with OpenCV / picamera2
+
+        from .framebus import FORMAT_JPEG
+
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            if self.bus.latest_seq() <= self._bus_seq:
+                time.sleep(0.002)
+                continue
+            got = self.bus.view()
+            if got is None:  # slot being written or torn; let the writer finish
+                time.sleep(0.002)
+                continue
+            seq, _ts, payload = got
+            if self.bus.fmt == FORMAT_JPEG:
+                frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            else:
+                # One memcpy out of the ring slot: the writer may lap us while
+                # ffmpeg is still reading, so an aliasing array could tear.
+                frame = np.frombuffer(payload, dtype=np.uint8).reshape(self.bus.height, self.bus.width, 3).copy()
+            payload.release()
+            if not self.bus.valid(seq):  # overwritten while we decoded/copied it
+                continue
+            self._bus_seq = seq
+            return frame
+        raise RuntimeError("frame bus stalled (no new frame in 5s)")
+
     def stop(self):  # best-effort
+        if self.bus is not None:
+            try:
+                self.bus.close()
+            except Exception:
+                pass
+            self.bus = None
+        if self.synthetic is not None:
+            self.synthetic.stop()
         if self.picam:
             try:
                 self.picam.stop()
@@ -156,8 +209,10 @@ async def publish_loop():  # high-level orchestrator
     height = int(os.getenv("CAMERA_HEIGHT", "720"))
     fps = int(os.getenv("CAMERA_FPS", "30"))
     device = os.getenv("CAMERA_SOURCE", "/dev/video0")
-    health_file = Path(os.getenv("HEALTH_FILE", "/tmp/publisher_health.json"))
+    framebus = os.getenv("FRAMEBUS_NAME", "") or None
+    health_file = Path(os.getenv("HEALTH_FILE", "/tmp/publisher_health.mmap"))
     health = HealthWriter(health_file)
+    governor_file = Path(os.getenv("GOVERNOR_STATE_FILE", str(GOVERNOR_STATE_FILE)))
 
     backoff = 2
     while True:
@@ -171,21 +226,29 @@ async def publish_loop():  # high-level orchestrator
                 raise RuntimeError("Invalid JWT token received")
 
             # Initialize frame source (throws on failure)
-            source = FrameSource(width, height, fps, device)
+            source = FrameSource(width, height, fps, device, framebus=framebus)
             source.start()
             health.write("running", detail="capturing")
             last_frame_time = time.time()
+            period, checked = 1.0 / fps, 0.0
             while True:
+                if time.time() - checked > 5.0:
+                    try:
+                        factor = min(1.0, float(read_state(governor_file).get("GOVERNOR_FPS_FACTOR", "1") or 1))
+                    except ValueError:
+                        factor = 1.0
+                    period, checked = 1.0 / max(0.1, fps * factor), time.time()
                 frame = source.read()
+                health.frame()
                 # In a real implementation, encode & send frame to LiveKit.
                 # We throttle here just to limit CPU if no encoder attached.
-                await asyncio.sleep(1.0 / fps)
+                await asyncio.sleep(period)
                 last_frame_time = time.time()
                 if time.time() - last_frame_time > 10:
                     raise RuntimeError("Stale capture loop")
         except Exception as e:
             health.write("error", detail=str(e))
-            print(f"Publisher error: {e}", file=sys.stderr)
+            log.error("Publisher error: %s", e)
             await asyncio.sleep(backoff)
             backoff = min(backoff * 2, 30)
             continue
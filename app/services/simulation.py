@@ -0,0 +1,178 @@
+"""Clocks and a simulated GPIO timeline for motion tests and benchmarks.
+
+The stepper controllers time their pulses through a :class:`Clock`: the
+real one waits on the abort event, :class:`VirtualClock` returns at once and
+advances a virtual time instead, firing callbacks scheduled with
+:meth:`VirtualClock.call_at` (an abort "at 12.5 ms", say) as it passes them.
+With :class:`SimulatedGpio` stamping transitions in that virtual time, a
+10,000-step move runs in milliseconds and leaves an exact pulse timeline;
+:func:`pulses` and :func:`summarize` turn the timeline into step counts,
+direction changes and intervals.
+
+:class:`RecordingGpio` wraps a real backend and stamps every write with the
+real clock, which is how ``scripts/bench_motion_fidelity.py`` compares what
+the hardware got against the plan.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import statistics
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .gpio import EdgeCallback, GpioBackend, MockBackend
+
+Transition = Tuple[int, int, int]  # (timestamp_ns, pin, level)
+
+
+class Clock:
+    """Real time; ``wait`` is an interruptible sleep on the abort event."""
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns()
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        return event.wait(timeout)
+
+
+REAL_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    """Time that only moves when a controller waits on it."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+        self._timers: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+
+    def now(self) -> float:
+        with self._lock:
+            return self._now
+
+    def now_ns(self) -> int:
+        return int(round(self.now() * 1e9))
+
+    def call_at(self, at: float, fn: Callable[[], None]) -> None:
+        """Run ``fn`` when virtual time reaches ``at`` (seconds)."""
+        with self._lock:
+            heapq.heappush(self._timers, (at, next(self._seq), fn))
+
+    def advance(self, seconds: float) -> None:
+        self.wait(threading.Event(), seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        with self._lock:
+            target = self._now + max(0.0, timeout)
+        while not event.is_set():
+            with self._lock:
+                if not self._timers or self._timers[0][0] > target:
+                    self._now = max(self._now, target)
+                    break
+                at, _, fn = heapq.heappop(self._timers)
+                self._now = max(self._now, at)
+            fn()  # outside the lock: it may read the clock (abort() does)
+        return event.is_set()
+
+
+class SimulatedGpio(MockBackend):
+    """The mock backend, stamping transitions with a (virtual) clock."""
+
+    name = "sim"
+
+    def __init__(self, clock: Clock, history: int = 1_000_000):
+        super().__init__(clock=clock.now_ns, history=history)
+
+
+class RecordingGpio(GpioBackend):
+    """Pass-through to ``inner`` that records every write as it is issued."""
+
+    def __init__(self, inner: GpioBackend, clock: Clock = REAL_CLOCK):
+        self.inner = inner
+        self.clock = clock
+        self.name = inner.name
+        self.supports_pwm = inner.supports_pwm
+        self.edge_timestamps = inner.edge_timestamps
+        self.history: List[Transition] = []
+        self._levels: Dict[int, int] = {}
+
+    def claim_outputs(self, pins: Sequence[int], levels: Optional[Sequence[int]] = None) -> None:
+        self.inner.claim_outputs(pins, levels)
+        for pin, level in zip(pins, levels if levels is not None else [0] * len(pins)):
+            self._levels[pin] = 1 if level else 0
+
+    def _record(self, levels: Mapping[int, int]) -> None:
+        ts = self.clock.now_ns()
+        for pin, level in levels.items():
+            level = 1 if level else 0
+            if self._levels.get(pin) != level:
+                self._levels[pin] = level
+                self.history.append((ts, pin, level))
+
+    def write(self, pin: int, level: int) -> None:
+        self.inner.write(pin, level)
+        self._record({pin: level})
+
+    def write_many(self, levels: Mapping[int, int]) -> None:
+        self.inner.write_many(levels)
+        self._record(levels)
+
+    def pwm(self, pin: int, frequency_hz: float, duty_percent: float) -> None:
+        self.inner.pwm(pin, frequency_hz, duty_percent)
+
+    def watch(self, pin: int, callback: EdgeCallback, edge: str = "both") -> None:
+        self.inner.watch(pin, callback, edge)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def info(self) -> Dict[str, Any]:
+        return {**self.inner.info(), "recording": True}
+
+
+class Pulse(NamedTuple):
+    rise_ns: int
+    fall_ns: Optional[int]
+    forward: bool
+
+
+def pulses(history: Iterable[Transition], step_pin: int, dir_pin: int, dir_level: int = 0) -> List[Pulse]:
+    """STEP pulses in order, each with the DIR level it was issued under."""
+    out: List[Pulse] = []
+    rise: Optional[int] = None
+    forward = bool(dir_level)
+    for ts, pin, level in history:
+        if pin == dir_pin:
+            forward = bool(level)
+        elif pin == step_pin:
+            if level:
+                rise = ts
+                out.append(Pulse(ts, None, forward))
+            elif rise is not None:
+                out[-1] = out[-1]._replace(fall_ns=ts)
+                rise = None
+    return out
+
+
+def summarize(train: Sequence[Pulse]) -> Dict[str, Any]:
+    """Step counts, direction changes and step intervals (in µs) of a pulse train."""
+    intervals = [(b.rise_ns - a.rise_ns) / 1000.0 for a, b in zip(train, train[1:])]
+    widths = [(p.fall_ns - p.rise_ns) / 1000.0 for p in train if p.fall_ns is not None]
+    return {
+        "steps": len(train),
+        "forward": sum(p.forward for p in train),
+        "reverse": sum(not p.forward for p in train),
+        "net": sum(1 if p.forward else -1 for p in train),
+        "direction_changes": sum(a.forward != b.forward for a, b in zip(train, train[1:])),
+        "duration_s": (train[-1].rise_ns - train[0].rise_ns) / 1e9 if len(train) > 1 else 0.0,
+        "interval_us": {
+            "min": min(intervals), "max": max(intervals), "mean": statistics.fmean(intervals),
+        } if intervals else None,
+        "width_us": {"min": min(widths), "max": max(widths)} if widths else None,
+    }
@@ -0,0 +1,109 @@
+"""API start-up phases: one-time .env loading and a per-phase timer.
+
+Importing ``app.main`` should only build the routes; camera probing, GPIO
+setup and heavy imports (OpenCV, picamera2, PyJWT) happen lazily on first
+use or in the background warm-up started from the app's startup hook.
+Every phase is recorded here and exposed at ``GET /api/startup``::
+
+    {"import_ms": 310.2, "ready_ms": 318.9, "since_process_start_ms": 742.0,
+     "phases": [{"name": "dotenv", "ms": 1.1, ...},
+                {"name": "camera.init", "ms": 1840.3, "background": true, ...}]}
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+_T0 = time.perf_counter()
+
+
+class StartupProfile:
+    """Thread-safe record of named start-up phases."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.phases: List[Dict[str, Any]] = []
+        self.import_done: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str, background: bool = False) -> Iterator[None]:
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record = {
+                "name": name,
+                "start_ms": round((started - _T0) * 1000.0, 1),
+                "ms": round((time.perf_counter() - started) * 1000.0, 1),
+                "background": background,
+                "thread": threading.current_thread().name,
+            }
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.phases.append(record)
+
+    def mark_imported(self) -> None:
+        self.import_done = time.perf_counter()
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        def rel(t: Optional[float]) -> Optional[float]:
+            return round((t - _T0) * 1000.0, 1) if t is not None else None
+
+        since_start = None
+        try:
+            import psutil
+
+            since_start = round((time.time() - psutil.Process().create_time()) * 1000.0, 1)
+        except Exception:
+            pass
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p["start_ms"])
+        return {
+            "import_ms": rel(self.import_done),
+            "ready_ms": rel(self.ready_at),
+            "since_process_start_ms": since_start,
+            "phases": phases,
+        }
+
+
+profile = StartupProfile()
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env() -> None:
+    """Load the project's .env once; later calls are no-ops."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        with profile.phase("dotenv"):
+            try:
+                from dotenv import load_dotenv
+
+                load_dotenv(PROJECT_ROOT / ".env")
+            except ImportError:  # pragma: no cover - python-dotenv is in requirements
+                pass
+        _env_loaded = True
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("HARDWARE_WARMUP", "1") not in ("0", "false", "False")
@@ -0,0 +1,273 @@
+"""Precompressed, fingerprinted dashboard assets.
+
+Build step (run at deploy time, before starting the API)::
+
+    python -m app.services.static_assets            # -> build/static
+
+copies every file under ``assets/`` to ``build/static/assets/`` with a content
+hash in its name (``dashboard.css`` -> ``dashboard.3f2a9c1b0d4e.css``), writes
+gzip (and brotli, when the ``brotli`` package is installed) siblings next to
+each file, rewrites ``assets/...`` references in ``index.html`` and the CSS,
+and records the mapping in ``manifest.json``.
+
+Serving: :class:`StaticAssetServer` answers ``/`` and ``/assets/...`` from the
+build directory when it exists (falling back to the source tree otherwise),
+negotiates ``br``/``gzip`` from ``Accept-Encoding``, sends strong ETags and
+304s, marks fingerprinted files ``immutable`` for a year, and keeps the hot
+files in a size-bounded in-memory cache.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:  # Optional: brotli gives ~15-20% smaller text assets than gzip
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except Exception:  # pragma: no cover
+    BROTLI_AVAILABLE = False
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_BUILD_DIR = PROJECT_ROOT / "build" / "static"
+MANIFEST = "manifest.json"
+HASH_LEN = 12
+COMPRESSIBLE = {".css", ".js", ".html", ".svg", ".json", ".txt", ".map", ".md"}
+MIN_COMPRESS_BYTES = 256
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_REF_RE = re.compile(r"""(?P<prefix>["'(=\s])(?P<lead>\.?/)?(?P<path>assets/[A-Za-z0-9_./-]+)""")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fingerprint(rel: Path, digest: str) -> Path:
+    return rel.with_name(f"{rel.stem}.{digest[:HASH_LEN]}{rel.suffix}")
+
+
+def _rewrite_refs(text: str, manifest: Dict[str, str]) -> str:
+    def sub(m: "re.Match[str]") -> str:
+        target = manifest.get(m.group("path"))
+        if target is None:
+            return m.group(0)
+        return f"{m.group('prefix')}{m.group('lead') or ''}{target}"
+
+    return _REF_RE.sub(sub, text)
+
+
+def _write_variants(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if path.suffix not in COMPRESSIBLE or len(data) < MIN_COMPRESS_BYTES:
+        return
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if BROTLI_AVAILABLE:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build_assets(src_root: Path = PROJECT_ROOT, out_dir: Path = DEFAULT_BUILD_DIR) -> Dict[str, str]:
+    """Fingerprint, rewrite and precompress the dashboard; returns the manifest."""
+    assets_src = src_root / "assets"
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+
+    files = sorted(p for p in assets_src.rglob("*") if p.is_file()) if assets_src.exists() else []
+    contents = {p.relative_to(src_root).as_posix(): p.read_bytes() for p in files}
+    # CSS may reference other assets; rewrite those first so their hashes
+    # reflect the final bytes. Non-CSS files are hashed as-is.
+    manifest: Dict[str, str] = {}
+    for rel, data in contents.items():
+        if not rel.endswith(".css"):
+            manifest[rel] = _fingerprint(Path(rel), _digest(data)).as_posix()
+    for rel, data in contents.items():
+        if rel.endswith(".css"):
+            data = _rewrite_refs(data.decode("utf-8"), manifest).encode("utf-8")
+            contents[rel] = data
+            manifest[rel] = _fingerprint(Path(rel), _digest(data)).as_posix()
+
+    for rel, data in contents.items():
+        _write_variants(tmp_dir / manifest[rel], data)
+
+    index = src_root / "index.html"
+    if index.exists():
+        html = _rewrite_refs(index.read_text(encoding="utf-8"), manifest)
+        _write_variants(tmp_dir / "index.html", html.encode("utf-8"))
+
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    # Swap in the new build in one step so a running API never sees a half build.
+    if out_dir.exists():
+        old = out_dir.with_name(out_dir.name + ".old")
+        if old.exists():
+            shutil.rmtree(old)
+        out_dir.rename(old)
+        tmp_dir.rename(out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        out_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir.rename(out_dir)
+    return manifest
+
+
+class _Entry:
+    __slots__ = ("variants", "etag", "media_type", "size")
+
+    def __init__(self, variants: Dict[str, bytes], etag: str, media_type: str):
+        self.variants = variants  # encoding ("identity", "gzip", "br") -> body
+        self.etag = etag
+        self.media_type = media_type
+        self.size = sum(len(v) for v in variants.values())
+
+
+class StaticAssetServer:
+    """Serves index.html and assets with compression, ETags and an LRU cache."""
+
+    def __init__(
+        self,
+        src_root: Path = PROJECT_ROOT,
+        build_dir: Optional[Path] = None,
+        cache_bytes: int = 8 * 1024 * 1024,
+    ):
+        self.src_root = src_root
+        self.build_dir = build_dir or Path(os.getenv("STATIC_BUILD_DIR", str(DEFAULT_BUILD_DIR)))
+        self.cache_bytes = cache_bytes
+        self._cache: "collections.OrderedDict[Path, _Entry]" = collections.OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.manifest: Dict[str, str] = {}
+        self.built = False
+        self.reload()
+
+    def reload(self) -> None:
+        manifest_path = self.build_dir / MANIFEST
+        self.built = manifest_path.exists()
+        self.manifest = json.loads(manifest_path.read_text()) if self.built else {}
+        self._fingerprinted = set(self.manifest.values())
+        with self._lock:
+            self._cache.clear()
+            self._cache_size = 0
+
+    @property
+    def root(self) -> Path:
+        return self.build_dir if self.built else self.src_root
+
+    # --- cache -----------------------------------------------------------
+    def _load(self, path: Path) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is not None:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return entry
+        if not path.is_file():
+            return None
+        data = path.read_bytes()
+        variants = {"identity": data}
+        for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+            sibling = path.with_name(path.name + ext)
+            if sibling.is_file():
+                variants[encoding] = sibling.read_bytes()
+        if "gzip" not in variants and path.suffix in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            # Unbuilt tree: compress once here and keep the result cached.
+            variants["gzip"] = gzip.compress(data, compresslevel=6, mtime=0)
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+            media_type += "; charset=utf-8"
+        entry = _Entry(variants, f'"{_digest(data)[:32]}"', media_type)
+        with self._lock:
+            self.misses += 1
+            if entry.size <= self.cache_bytes:
+                self._cache[path] = entry
+                self._cache_size += entry.size
+                while self._cache_size > self.cache_bytes:
+                    _, old = self._cache.popitem(last=False)
+                    self._cache_size -= old.size
+        return entry
+
+    # --- responses ---------------------------------------------------------
+    @staticmethod
+    def _choose_encoding(entry: _Entry, accept: str) -> str:
+        accepted = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in entry.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def _respond(self, entry: _Entry, request: Request, cache_control: str) -> Response:
+        encoding = self._choose_encoding(entry, request.headers.get("accept-encoding", ""))
+        etag = entry.etag if encoding == "identity" else f'{entry.etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        inm = request.headers.get("if-none-match")
+        if inm and (inm.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=entry.variants[encoding], media_type=entry.media_type, headers=headers)
+
+    def index(self, request: Request) -> Response:
+        entry = self._load(self.root / "index.html")
+        if entry is None:
+            return JSONResponse({"message": "Dashboard not found"})
+        # The HTML names the current fingerprints, so it must always revalidate.
+        return self._respond(entry, request, REVALIDATE)
+
+    def asset(self, rel_path: str, request: Request) -> Response:
+        rel = f"assets/{rel_path}"
+        if ".." in Path(rel).parts:
+            return Response(status_code=404)
+        if rel in self._fingerprinted:
+            entry, cache_control = self._load(self.build_dir / rel), IMMUTABLE
+        elif rel in self.manifest:
+            # Old-style unhashed URL against a build: serve the current version.
+            entry, cache_control = self._load(self.build_dir / self.manifest[rel]), REVALIDATE
+        else:
+            entry, cache_control = self._load(self.src_root / rel), REVALIDATE
+        if entry is None:
+            return Response(status_code=404)
+        return self._respond(entry, request, cache_control)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "built": self.built,
+                "root": str(self.root),
+                "cached_files": len(self._cache),
+                "cached_bytes": self._cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "brotli": BROTLI_AVAILABLE,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed dashboard assets")
+    parser.add_argument("--src", default=str(PROJECT_ROOT))
+    parser.add_argument("--out", default=os.getenv("STATIC_BUILD_DIR", str(DEFAULT_BUILD_DIR)))
+    args = parser.parse_args()
+    manifest = build_assets(Path(args.src), Path(args.out))
+    for logical, hashed in sorted(manifest.items()):
+        print(f"{logical} -> {hashed}")
+    print(f"Built {len(manifest)} assets into {args.out} (brotli={'yes' if BROTLI_AVAILABLE else 'no'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Admission control and backpressure for long-lived frame streams.
+
+Every MJPEG viewer is a :class:`StreamClient` in a :class:`StreamRegistry`.
+The registry caps concurrent streams (``CAMERA_MAX_STREAMS``, across all
+cameras); past the cap a request gets 503 with ``Retry-After`` instead of
+another connection competing for the uplink. Viewers wait for frames on
+the event loop (``CameraController.next_frame``), not on camera-pool
+threads, so a full house leaves the pool to snapshots and camera control.
+
+:class:`DeadlineStreamingResponse` sends each chunk under a write deadline
+(``CAMERA_STREAM_WRITE_DEADLINE_S``). The server only completes a send once
+the socket has drained below its high-water mark, so a send that outlives
+the deadline means the viewer has stopped reading; the stream is closed
+rather than letting frames pile up for it. Viewers that are merely slow get
+the newest frame whenever their previous one has gone out (latest-frame
+only), so they skip frames instead of queueing them; skips, send times and
+frame age at delivery are recorded per client.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from starlette.responses import StreamingResponse
+from starlette.types import Send
+
+from .log import get_logger
+
+log = get_logger("camera")
+
+CAMERA_MAX_STREAMS = int(os.getenv("CAMERA_MAX_STREAMS", "16"))
+CAMERA_STREAM_WRITE_DEADLINE_S = float(os.getenv("CAMERA_STREAM_WRITE_DEADLINE_S", "10"))
+CAMERA_STREAM_RETRY_AFTER_S = int(os.getenv("CAMERA_STREAM_RETRY_AFTER_S", "5"))
+
+
+class StreamClient:
+    """Delivery statistics for one connected viewer."""
+
+    def __init__(self, client_id: int, camera_id: str, peer: Optional[str]):
+        self.id = client_id
+        self.camera_id = camera_id
+        self.peer = peer
+        self.connected_at = time.time()
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.send_ms = 0.0  # EWMA
+        self.max_send_ms = 0.0
+        self.lag_ms = 0.0  # EWMA of frame age when its send completed
+        self.max_lag_ms = 0.0
+        self.last_seq: Optional[int] = None
+
+    def delivered(self, seq: int, frame_ts: float, size: int, send_s: float) -> None:
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.frames_skipped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.frames_sent += 1
+        self.bytes_sent += size
+        send_ms = send_s * 1000.0
+        lag_ms = max(0.0, (time.time() - frame_ts) * 1000.0)
+        self.send_ms += 0.2 * (send_ms - self.send_ms)
+        self.lag_ms += 0.2 * (lag_ms - self.lag_ms)
+        self.max_send_ms = max(self.max_send_ms, send_ms)
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def status(self) -> Dict[str, Any]:
+        offered = self.frames_sent + self.frames_skipped
+        return {
+            "id": self.id,
+            "peer": self.peer,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "skip_ratio": round(self.frames_skipped / offered, 3) if offered else 0.0,
+            "mbytes_sent": round(self.bytes_sent / (1 << 20), 2),
+            "send_ms": round(self.send_ms, 1),
+            "max_send_ms": round(self.max_send_ms, 1),
+            "lag_ms": round(self.lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+        }
+
+
+class StreamRegistry:
+    def __init__(self, max_streams: int = CAMERA_MAX_STREAMS):
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._clients: Dict[int, StreamClient] = {}
+        self._ids = itertools.count(1)
+        self.rejected = 0
+        self.deadline_closed = 0
+
+    def admit(self, camera_id: str, peer: Optional[str] = None) -> Optional[StreamClient]:
+        """Register a viewer, or return None when ``max_streams`` are already open (0 = no cap)."""
+        with self._lock:
+            if self.max_streams > 0 and len(self._clients) >= self.max_streams:
+                self.rejected += 1
+                return None
+            client = StreamClient(next(self._ids), camera_id, peer)
+            self._clients[client.id] = client
+            return client
+
+    def release(self, client: StreamClient) -> None:
+        with self._lock:
+            self._clients.pop(client.id, None)
+
+    def clients(self, camera_id: Optional[str] = None) -> List[StreamClient]:
+        with self._lock:
+            return [c for c in self._clients.values() if camera_id is None or c.camera_id == camera_id]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            active = len(self._clients)
+        return {
+            "active": active,
+            "max_streams": self.max_streams,
+            "rejected": self.rejected,
+            "deadline_closed": self.deadline_closed,
+            "write_deadline_s": CAMERA_STREAM_WRITE_DEADLINE_S,
+        }
+
+
+streams = StreamRegistry()
+
+
+class DeadlineStreamingResponse(StreamingResponse):
+    """StreamingResponse that releases its client slot on exit and drops stalled readers."""
+
+    def __init__(self, content, client: StreamClient, registry: StreamRegistry = streams,
+                 deadline_s: float = CAMERA_STREAM_WRITE_DEADLINE_S, **kwargs):
+        super().__init__(content, **kwargs)
+        self.client = client
+        self.registry = registry
+        self.deadline_s = deadline_s
+
+    async def stream_response(self, send: Send) -> None:
+        async def send_with_deadline(message) -> None:
+            if message["type"] != "http.response.body" or self.deadline_s <= 0:
+                await send(message)
+                return
+            try:
+                await asyncio.wait_for(send(message), self.deadline_s)
+            except asyncio.TimeoutError:
+                self.registry.deadline_closed += 1
+                log.warning("Closing stream %d to %s: write blocked for over %.0fs",
+                            self.client.id, self.client.peer, self.deadline_s)
+                raise ConnectionAbortedError("stream write deadline exceeded")
+
+        try:
+            await super().stream_response(send_with_deadline)
+        except ConnectionAbortedError:
+            # Ending the response without its final body message closes the connection.
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.registry.release(self.client)
@@ -0,0 +1,189 @@
+"""Hardware-free frame sources for development, CI and benchmarks.
+
+A source spec selects what to generate::
+
+    synthetic:bars            colour bars with a moving box and frame counter
+    synthetic:noise           random noise (worst case for JPEG size)
+    synthetic:static          a still frame (best case)
+    synthetic:clip=PATH       loop a recorded clip; ``.mjpg``/``.mjpeg`` files
+                              (concatenated JPEGs) are split in-process and
+                              kept compressed, one frame decoded per read;
+                              other containers go through ``cv2.VideoCapture``
+
+``SyntheticSource`` has the same ``start``/``read``/``stop`` shape as
+``publisher.FrameSource`` and ``SyntheticCapture`` mimics the parts of
+``cv2.VideoCapture`` that ``CameraController`` uses, so either can stand in
+for a camera. Set ``CAMERA_DEVICE`` (API) or ``CAMERA_SOURCE`` (publisher,
+capture daemon) to a spec to use them.
+"""
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+    CV2_AVAILABLE = True
+except Exception:  # pragma: no cover
+    CV2_AVAILABLE = False
+
+
+PREFIX = "synthetic:"
+PATTERNS = ("bars", "noise", "static")
+
+_BAR_COLOURS = [  # BGR, SMPTE-ish order
+    (192, 192, 192), (0, 192, 192), (192, 192, 0), (0, 192, 0),
+    (192, 0, 192), (0, 0, 192), (192, 0, 0), (16, 16, 16),
+]
+
+
+def is_synthetic(spec: Optional[str]) -> bool:
+    return bool(spec) and spec.startswith(PREFIX)
+
+
+def split_mjpeg(data: bytes) -> List[bytes]:
+    """Split a concatenated-JPEG (raw MJPEG) stream into frames."""
+    frames: List[bytes] = []
+    pos = 0
+    while True:
+        start = data.find(b"\xff\xd8", pos)
+        if start < 0:
+            break
+        end = data.find(b"\xff\xd9", start + 2)
+        if end < 0:
+            break
+        frames.append(data[start:end + 2])
+        pos = end + 2
+    return frames
+
+
+class SyntheticSource:
+    """Generates or replays frames at a fixed rate without any camera."""
+
+    def __init__(self, width: int, height: int, fps: int, spec: str = "synthetic:bars", realtime: bool = True):
+        if not CV2_AVAILABLE:
+            raise RuntimeError("synthetic frame source requires OpenCV and NumPy")
+        self.width = width
+        self.height = height
+        self.fps = max(1, int(fps))
+        self.spec = spec
+        self.realtime = realtime
+        self.frame_count = 0
+        self.kind = spec[len(PREFIX):] if spec.startswith(PREFIX) else spec
+        self._base = None
+        self._clip_frames: List[bytes] = []  # JPEGs, decoded one per read
+        self._clip_cap = None
+        self._next_due = 0.0
+        self._rng = None
+
+    def start(self):
+        if self.kind.startswith("clip="):
+            path = Path(self.kind[len("clip="):])
+            if not path.exists():
+                raise RuntimeError(f"clip not found: {path}")
+            if path.suffix.lower() in (".mjpg", ".mjpeg"):
+                # Raw BGR for a whole clip would not fit in a Pi's RAM (60 s of
+                # 720p at 15 fps is ~2.5 GB); the JPEGs are ~1/20th of that.
+                self._clip_frames = split_mjpeg(path.read_bytes())
+                if not self._clip_frames or self._decode(self._clip_frames[0]) is None:
+                    raise RuntimeError(f"no decodable JPEG frames in {path}")
+            else:
+                self._clip_cap = cv2.VideoCapture(str(path))
+                if not self._clip_cap.isOpened():
+                    raise RuntimeError(f"cannot open clip {path}")
+        elif self.kind in PATTERNS:
+            self._base = self._bars() if self.kind != "noise" else None
+            self._rng = np.random.default_rng(0)
+        else:
+            raise RuntimeError(f"unknown synthetic source '{self.spec}' (use one of {PATTERNS} or clip=PATH)")
+        self._next_due = time.monotonic()
+
+    def _decode(self, jpeg: bytes):
+        return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _fit(self, img):
+        if img.shape[1] != self.width or img.shape[0] != self.height:
+            img = cv2.resize(img, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return img
+
+    def _bars(self):
+        img = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        bar_w = max(1, self.width // len(_BAR_COLOURS))
+        for i, colour in enumerate(_BAR_COLOURS):
+            img[:, i * bar_w:(i + 1) * bar_w] = colour
+        return img
+
+    def _generate(self):
+        n = self.frame_count
+        if self._clip_frames:
+            frames = self._clip_frames
+            for i in range(len(frames)):  # skip frames that fail to decode
+                img = self._decode(frames[(n + i) % len(frames)])
+                if img is not None:
+                    return self._fit(img)
+            raise RuntimeError("clip playback failed")
+        if self._clip_cap is not None:
+            ok, img = self._clip_cap.read()
+            if not ok:
+                self._clip_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, img = self._clip_cap.read()
+                if not ok:
+                    raise RuntimeError("clip playback failed")
+            return self._fit(img)
+        if self.kind == "static":
+            return self._base
+        if self.kind == "noise":
+            return self._rng.integers(0, 256, (self.height, self.width, 3), dtype=np.uint8)
+        img = self._base.copy()
+        box = max(8, self.height // 8)
+        x = (n * 8) % max(1, self.width - box)
+        y = (self.height - box) // 2
+        img[y:y + box, x:x + box] = 255
+        cv2.putText(img, f"{n:06d}", (16, 48), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        return img
+
+    def read(self):
+        if self._base is None and not self._clip_frames and self._clip_cap is None and self._rng is None:
+            raise RuntimeError("Camera not started")
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_due > now:
+                time.sleep(self._next_due - now)
+            self._next_due = max(self._next_due, now) + 1.0 / self.fps
+        frame = self._generate()
+        self.frame_count += 1
+        return frame
+
+    def stop(self):
+        if self._clip_cap is not None:
+            try:
+                self._clip_cap.release()
+            except Exception:
+                pass
+            self._clip_cap = None
+
+
+class SyntheticCapture:
+    """Minimal ``cv2.VideoCapture`` look-alike backed by :class:`SyntheticSource`."""
+
+    def __init__(self, spec: str, width: int, height: int, fps: int):
+        self.source = SyntheticSource(width, height, fps, spec)
+        self.source.start()
+        self._open = True
+
+    def isOpened(self) -> bool:
+        return self._open
+
+    def set(self, *_args) -> bool:
+        return False
+
+    def read(self):
+        if not self._open:
+            return False, None
+        return True, self.source.read()
+
+    def release(self) -> None:
+        self._open = False
+        self.source.stop()
@@ -0,0 +1,172 @@
+"""Cheap host CPU usage and temperature readers for the stats subsystem.
+
+:class:`CpuUsage` keeps ``/proc/stat`` open and turns the difference between
+two reads into total and per-core busy percentages. The stats sampler calls
+:meth:`CpuUsage.tick` in the background; readers get the last result without
+waiting.
+
+:class:`ThermalSensor` finds a working temperature source once: the first
+sane ``/sys/class/thermal/thermal_zone*/temp``, kept open and re-read with
+``pread``. ``vcgencmd measure_temp`` (a fork per read) is used only when no
+sysfs zone works, and psutil's sensors after that.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+from .log import get_logger
+
+log = get_logger("stats")
+
+PROC_STAT = "/proc/stat"
+THERMAL_ROOT = Path("/sys/class/thermal")
+
+Times = Tuple[int, int]  # (busy, total) jiffies
+
+
+def _parse_stat(text: str) -> Dict[str, Times]:
+    out: Dict[str, Times] = {}
+    for line in text.splitlines():
+        if not line.startswith("cpu"):
+            break  # the cpu lines come first
+        name, *fields = line.split()
+        values = [int(v) for v in fields[:8]]  # user nice system idle iowait irq softirq steal
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        total = sum(values)
+        out[name] = (total - idle, total)
+    return out
+
+
+class CpuUsage:
+    """Busy percentage (total and per core) between the two most recent ticks."""
+
+    def __init__(self, path: str = PROC_STAT):
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        try:
+            self._fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            log.info("%s unavailable; CPU usage comes from psutil", path)
+        self._prev: Optional[Dict[str, Times]] = None
+        self.percent: Optional[float] = None
+        self.per_core: List[float] = []
+        self.ts: Optional[float] = None
+
+    def _read(self) -> Optional[Dict[str, Times]]:
+        if self._fd is None:
+            return None
+        try:
+            return _parse_stat(os.pread(self._fd, 65536, 0).decode("ascii", "replace"))
+        except (OSError, ValueError):
+            return None
+
+    def tick(self) -> Optional[float]:
+        """Take a sample; returns total busy % since the previous tick."""
+        current = self._read()
+        with self._lock:
+            if current is None:
+                try:
+                    self.per_core = [float(v) for v in psutil.cpu_percent(interval=None, percpu=True)]
+                    self.percent = float(sum(self.per_core) / len(self.per_core)) if self.per_core else None
+                except Exception:
+                    self.percent = None
+            else:
+                prev, self._prev = self._prev, current
+                base = prev or {k: (0, 0) for k in current}  # first tick: average since boot
+
+                def busy(name: str) -> float:
+                    b, t = current[name]
+                    pb, pt = base.get(name, (0, 0))
+                    return round(100.0 * (b - pb) / (t - pt), 1) if t > pt else 0.0
+
+                self.percent = busy("cpu") if "cpu" in current else None
+                cores = sorted((k for k in current if k != "cpu"), key=lambda k: int(k[3:]))
+                self.per_core = [busy(k) for k in cores]
+            self.ts = time.time()
+            return self.percent
+
+    def read(self, max_age_s: float = 10.0) -> Optional[float]:
+        """Last total busy %, ticking first if no sampler has done so recently."""
+        if self.ts is None or time.time() - self.ts > max_age_s:
+            self.tick()
+        return self.percent
+
+    def status(self) -> Dict[str, Any]:
+        return {"percent": self.percent, "per_core": list(self.per_core), "ts": self.ts}
+
+
+class ThermalSensor:
+    """CPU temperature from the first working source, probed once."""
+
+    def __init__(self, root: Path = THERMAL_ROOT):
+        self.source = "none"
+        self._fd: Optional[int] = None
+        for path in sorted(root.glob("thermal_zone*/temp")):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            if self._parse(os.pread(fd, 32, 0)) is not None:
+                self._fd, self.source = fd, f"sysfs:{path.parent.name}"
+                break
+            os.close(fd)
+        if self._fd is None:
+            if self._vcgencmd() is not None:
+                self.source = "vcgencmd"
+            elif self._psutil() is not None:
+                self.source = "psutil"
+        log.info("CPU temperature source: %s", self.source)
+
+    @staticmethod
+    def _parse(raw: bytes) -> Optional[float]:
+        try:
+            v = float(raw.strip() or b"nan")
+        except ValueError:
+            return None
+        if v > 1000:  # millidegrees
+            v /= 1000.0
+        return v if 0.0 < v < 120.0 else None
+
+    @staticmethod
+    def _vcgencmd() -> Optional[float]:
+        try:
+            proc = subprocess.run(["vcgencmd", "measure_temp"], capture_output=True, text=True, timeout=0.4, check=False)
+        except Exception:
+            return None
+        out = (proc.stdout or "").strip()  # temp=49.2'C
+        if out.startswith("temp=") and "'C" in out:
+            try:
+                return float(out.split("=", 1)[1].split("'C", 1)[0])
+            except ValueError:
+                return None
+        return None
+
+    @staticmethod
+    def _psutil() -> Optional[float]:
+        try:
+            for entries in (psutil.sensors_temperatures(fahrenheit=False) or {}).values():
+                for e in entries:
+                    if e.current is not None and 0.0 < e.current < 120.0:
+                        return float(e.current)
+        except Exception:
+            pass
+        return None
+
+    def read(self) -> Optional[float]:
+        if self._fd is not None:
+            try:
+                return self._parse(os.pread(self._fd, 32, 0))
+            except OSError:
+                return None
+        if self.source == "vcgencmd":
+            return self._vcgencmd()
+        if self.source == "psutil":
+            return self._psutil()
+        return None
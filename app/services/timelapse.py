@@ -0,0 +1,357 @@
+"""Built-in time-lapse recorder with a segmented, indexed JPEG archive.
+
+Replaces the cron jobs that polled ``/camera/snapshot``. The recorder taps
+a camera's :class:`StreamingOutput` (a callback on every published frame,
+no extra encode or blocking wait) and keeps one frame per ``interval_s``.
+
+On-disk layout, one directory per camera::
+
+    <root>/<camera>/20261019T120000Z.mjpg   concatenated JPEG frames (plays as MJPEG)
+    <root>/<camera>/20261019T120000Z.idx    16-byte records: ts (f64), offset (u32), length (u32)
+
+Frames are buffered in memory and written in batches (``batch_bytes`` or
+``flush_s``, whichever comes first): one append to the segment and one to
+its index per batch, so the SD card sees a few large sequential writes
+instead of one small write per frame. The index is written after the data,
+both at the offsets the in-memory index accounts for (a retry after a
+failed batch overwrites its leftovers instead of appending past them), and
+on start-up a segment is trimmed back to its last indexed frame, so a
+power cut loses at most the unflushed batch.
+
+Segments roll over at ``segment_bytes`` (at most 4 GiB, the reach of the
+index's 32-bit offsets) or ``segment_s``. Retention deletes
+the oldest whole segments beyond ``retention_days`` or ``max_bytes``.
+Range queries and scrubbing (nearest frame at or before a time) bisect the
+in-memory copy of the indexes and read frames with ``os.pread``; frames
+still waiting in the batch are served from memory.
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .log import get_logger
+
+log = get_logger("timelapse")
+
+RECORD = struct.Struct("<dII")  # timestamp, offset, length
+MAX_SEGMENT_BYTES = (1 << 32) - 1  # offsets are u32 in the index
+
+
+class Entry(NamedTuple):
+    ts: float
+    offset: int
+    length: int
+
+
+def _write_at(path: Path, data: bytes, offset: int) -> None:
+    """Write ``data`` at ``offset``, cut the file off after it and fsync."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(fd, view, offset)
+            view, offset = view[n:], offset + n
+        os.ftruncate(fd, offset)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Segment:
+    """One data file plus its index; ``entries`` mirrors the index in memory."""
+
+    def __init__(self, data_path: Path):
+        self.data_path = data_path
+        self.index_path = data_path.with_suffix(".idx")
+        self.entries: List[Entry] = []
+        self.times: List[float] = []  # entries' timestamps, for bisect
+        self.size = 0
+
+    @property
+    def start(self) -> float:
+        return self.times[0] if self.times else 0.0
+
+    @property
+    def end(self) -> float:
+        return self.times[-1] if self.times else 0.0
+
+    def load(self) -> None:
+        """Read the index and drop anything a crash left half-written."""
+        raw = self.index_path.read_bytes() if self.index_path.exists() else b""
+        raw = raw[: len(raw) - len(raw) % RECORD.size]
+        data_size = self.data_path.stat().st_size if self.data_path.exists() else 0
+        entries = [Entry(*rec) for rec in RECORD.iter_unpack(raw)]
+        while entries and entries[-1].offset + entries[-1].length > data_size:
+            entries.pop()
+        valid = entries[-1].offset + entries[-1].length if entries else 0
+        if valid < data_size:
+            os.truncate(self.data_path, valid)
+        if len(entries) * RECORD.size < len(raw):
+            os.truncate(self.index_path, len(entries) * RECORD.size)
+        self.entries = entries
+        self.times = [e.ts for e in entries]
+        self.size = valid
+
+    def append(self, frames: List[Tuple[float, bytes]]) -> None:
+        offset = self.size
+        records = []
+        for ts, jpeg in frames:
+            records.append(Entry(ts, offset, len(jpeg)))
+            offset += len(jpeg)
+        # Written at the offsets the index already accounts for, not appended:
+        # a batch that failed half-way (data written, index not) leaves bytes
+        # past ``size`` that the retry overwrites and trims.
+        _write_at(self.data_path, b"".join(jpeg for _ts, jpeg in frames), self.size)
+        _write_at(self.index_path, b"".join(RECORD.pack(*r) for r in records), len(self.entries) * RECORD.size)
+        self.entries.extend(records)
+        self.times.extend(r.ts for r in records)
+        self.size = offset
+
+    def read(self, entry: Entry) -> bytes:
+        fd = os.open(self.data_path, os.O_RDONLY)
+        try:
+            return os.pread(fd, entry.length, entry.offset)
+        finally:
+            os.close(fd)
+
+    def delete(self) -> None:
+        for path in (self.data_path, self.index_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class TimelapseArchive:
+    """Archive and batched writer for one camera."""
+
+    def __init__(
+        self,
+        directory: Path,
+        interval_s: float = 60.0,
+        batch_bytes: int = 4 << 20,
+        flush_s: float = 300.0,
+        segment_bytes: int = 256 << 20,
+        segment_s: float = 86400.0,
+        retention_days: float = 0.0,
+        max_bytes: int = 0,
+    ):
+        self.directory = directory
+        self.interval_s = interval_s
+        self.batch_bytes = batch_bytes
+        self.flush_s = flush_s
+        if segment_bytes > MAX_SEGMENT_BYTES:
+            log.warning("time-lapse segment size capped at %d bytes (was %d)", MAX_SEGMENT_BYTES, segment_bytes)
+        self.segment_bytes = min(segment_bytes, MAX_SEGMENT_BYTES)
+        self.segment_s = segment_s
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending: List[Tuple[float, bytes]] = []
+        self._pending_bytes = 0
+        self._batch_started = 0.0
+        self._next_due = 0.0
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self.segments: List[_Segment] = []
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.segments_deleted = 0
+        self.write_errors = 0
+        self.last_batch_ms: Optional[float] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.glob("*.mjpg")):
+            segment = _Segment(path)
+            try:
+                segment.load()
+            except OSError as e:
+                log.warning("skipping unreadable segment %s: %s", path, e)
+                continue
+            if segment.entries:
+                self.segments.append(segment)
+            else:
+                segment.delete()
+
+    # --- recording ------------------------------------------------------------
+    def tap(self, jpeg: bytes, ts: float) -> None:
+        """Frame hook for StreamingOutput; keeps one frame per interval (no copy)."""
+        if ts < self._next_due:
+            return
+        with self._lock:
+            if ts < self._next_due:
+                return
+            self._next_due = ts + self.interval_s
+            if not isinstance(jpeg, bytes):  # picamera2 may hand over a reusable buffer
+                jpeg = bytes(jpeg)
+            if not self._pending:
+                self._batch_started = time.monotonic()
+            self._pending.append((ts, jpeg))
+            self._pending_bytes += len(jpeg)
+            if self._pending_bytes >= self.batch_bytes:
+                self._wake.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._stop:
+                    if self._pending and (
+                        self._pending_bytes >= self.batch_bytes
+                        or time.monotonic() - self._batch_started >= self.flush_s
+                    ):
+                        break
+                    self._wake.wait(timeout=min(self.flush_s, 5.0))
+                stopping = self._stop
+            written = self.flush()
+            if stopping:
+                return
+            if not written:
+                time.sleep(5.0)  # card full or read-only; retry later
+
+    def flush(self) -> bool:
+        """Write the pending batch (writer thread and stop); False if the write failed."""
+        with self._lock:
+            batch = list(self._pending)
+        if not batch:
+            return True
+        t0 = time.perf_counter()
+        try:
+            segment = self._segment_for(batch[0][0], sum(len(j) for _t, j in batch))
+            segment.append(batch)
+        except OSError as e:
+            # Keep the frames for the next flush, but don't grow without bound.
+            self.write_errors += 1
+            log.error("time-lapse write to %s failed: %s", self.directory, e)
+            with self._lock:
+                while self._pending and self._pending_bytes > 4 * self.batch_bytes:
+                    self._pending_bytes -= len(self._pending.pop(0)[1])
+            return False
+        with self._lock:
+            del self._pending[: len(batch)]
+            self._pending_bytes = sum(len(j) for _t, j in self._pending)
+            if self._pending:
+                self._batch_started = time.monotonic()
+        self.frames_written += len(batch)
+        self.bytes_written += sum(len(j) for _t, j in batch)
+        self.batches += 1
+        self.last_batch_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        self.enforce_retention()
+        return True
+
+    def _segment_for(self, ts: float, nbytes: int) -> _Segment:
+        current = self.segments[-1] if self.segments else None
+        if (
+            current is not None and current.size < self.segment_bytes and ts - current.start < self.segment_s
+            and current.size + nbytes <= MAX_SEGMENT_BYTES  # a backlog must not overflow the u32 offsets
+        ):
+            return current
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(ts)) + ".mjpg"
+        segment = _Segment(self.directory / name)
+        if segment.data_path.exists():  # same second as the previous segment
+            segment = _Segment(self.directory / name.replace(".mjpg", f"-{len(self.segments)}.mjpg"))
+        with self._lock:
+            self.segments.append(segment)
+        return segment
+
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """Delete the oldest whole segments beyond the age/size limits; returns how many."""
+        now = time.time() if now is None else now
+        deleted = 0
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            too_old = self.retention_days > 0 and now - oldest.end > self.retention_days * 86400
+            too_big = self.max_bytes > 0 and sum(s.size for s in self.segments) > self.max_bytes
+            if not (too_old or too_big):
+                break
+            with self._lock:
+                self.segments.pop(0)
+            oldest.delete()
+            deleted += 1
+        self.segments_deleted += deleted
+        return deleted
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name=f"timelapse-{self.directory.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=30.0)
+            self._thread = None
+
+    # --- queries ------------------------------------------------------------------
+    def timestamps(self, start: float = 0.0, end: float = float("inf"), step: float = 0.0, limit: int = 10000) -> List[float]:
+        """Frame times in [start, end], at least ``step`` seconds apart."""
+        with self._lock:
+            segments = list(self.segments)
+            pending = [ts for ts, _j in self._pending]
+        out: List[float] = []
+        last = float("-inf")
+        for times in [s.times for s in segments if s.times and s.end >= start and s.start <= end] + [pending]:
+            for ts in times[bisect.bisect_left(times, start):bisect.bisect_right(times, end)]:
+                if ts - last >= step:
+                    out.append(ts)
+                    last = ts
+                    if len(out) >= limit:
+                        return out
+        return out
+
+    def frame_at(self, ts: float) -> Optional[Tuple[float, bytes]]:
+        """Scrub: the last frame at or before ``ts`` (the first frame if ts precedes it)."""
+        with self._lock:
+            for p_ts, jpeg in reversed(self._pending):
+                if p_ts <= ts:
+                    return p_ts, jpeg
+            segments = list(self.segments)
+        for segment in reversed(segments):
+            if not segment.times or segment.start > ts:
+                continue
+            entry = segment.entries[bisect.bisect_right(segment.times, ts) - 1]
+            return entry.ts, segment.read(entry)
+        for segment in segments:
+            if segment.entries:
+                entry = segment.entries[0]
+                return entry.ts, segment.read(entry)
+        with self._lock:
+            return self._pending[0] if self._pending else None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = list(self.segments)
+            pending, pending_bytes = len(self._pending), self._pending_bytes
+        return {
+            "directory": str(self.directory),
+            "interval_s": self.interval_s,
+            "recording": self._thread is not None,
+            "segments": len(segments),
+            "frames": sum(len(s.entries) for s in segments) + pending,
+            "bytes": sum(s.size for s in segments),
+            "first": segments[0].start if segments else None,
+            "last": segments[-1].end if segments else None,
+            "pending_frames": pending,
+            "pending_bytes": pending_bytes,
+            "frames_written": self.frames_written,
+            "batches": self.batches,
+            "avg_batch_bytes": int(self.bytes_written / self.batches) if self.batches else None,
+            "last_batch_ms": self.last_batch_ms,
+            "segments_deleted": self.segments_deleted,
+            "write_errors": self.write_errors,
+        }
@@ -4,6 +4,8 @@
   - Serial input:
       'r' / 'R' => open valve (100 steps)
       'l' / 'L' => close valve (100 steps)
+      's' / 'S' => stop: abort the move in progress (checked between steps)
+                   and drop any pending command
 
   Safety:
   - Homes on startup toward close until limit switch triggers -> position = 0
@@ -34,10 +36,25 @@ const int CLOSING_DIR = LOW;   // DIR=LOW closes the valve
 const int OPENING_DIR = HIGH;  // DIR=HIGH opens the valve
 
 // ---------- Command handling ----------
-enum Cmd { CMD_NONE, CMD_OPEN, CMD_CLOSE };
+enum Cmd { CMD_NONE, CMD_OPEN, CMD_CLOSE, CMD_STOP };
 volatile Cmd pendingCmd = CMD_NONE;
 bool busy = false;
 
+Cmd readSerialCmd();
+
+// Polled between steps while moving. A stop aborts the move and clears any
+// pending command; an open/close received mid-move is queued as before.
+bool stopRequested() {
+  Cmd c = readSerialCmd();
+  if (c == CMD_STOP) {
+    pendingCmd = CMD_NONE;
+    Serial.println(">>> STOP");
+    return true;
+  }
+  if (c != CMD_NONE) pendingCmd = c;
+  return false;
+}
+
 // ---------- Motion helpers ----------
 inline void stepOnce(int delayUs) {
   digitalWrite(PUL_PIN, HIGH);
@@ -143,6 +160,7 @@ void doOpenCommand() {
       Serial.println(">>> Max open reached during opening.");
       break;
     }
+    if (stopRequested()) break;
     stepOnce(STEP_DELAY_US);
     currentPosition++;
   }
@@ -173,6 +191,7 @@ void doCloseCommand() {
       currentPosition = 0;
       break;
     }
+    if (stopRequested()) break;
     stepOnce(STEP_DELAY_US);
     if (currentPosition > 0) currentPosition--;
     else currentPosition = 0;
@@ -203,7 +222,7 @@ void setup() {
   performHoming();
 
   Serial.println("READY");
-  Serial.println(" - Serial: send 'r' (open) or 'l' (close)");
+  Serial.println(" - Serial: send 'r' (open), 'l' (close) or 's' (stop)");
 }
 
 // Read one meaningful command char from serial, ignoring whitespace/newlines.
@@ -217,6 +236,7 @@ Cmd readSerialCmd() {
 
     if (c == 'r' || c == 'R') return CMD_OPEN;
     if (c == 'l' || c == 'L') return CMD_CLOSE;
+    if (c == 's' || c == 'S') return CMD_STOP;
 
     // unknown char: ignore, but print for debugging
     Serial.print("[serial] ignored char: 0x");
@@ -236,7 +256,8 @@ void loop() {
 
   // Serial command -> pendingCmd
   Cmd c = readSerialCmd();
-  if (c != CMD_NONE) pendingCmd = c;
+  if (c == CMD_STOP) pendingCmd = CMD_NONE;
+  else if (c != CMD_NONE) pendingCmd = c;
 
   // Execute pending command (one at a time)
   if (!busy && pendingCmd != CMD_NONE) {
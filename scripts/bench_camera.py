@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Camera streaming benchmark using the synthetic frame source (no hardware).
+
+Measures, per resolution:
+  - capture_fps          raw frames/s the source can produce
+  - encode_ms            JPEG encode time per frame (mean / p95) and frame size
+  - latency_ms           capture -> client delivery latency across N simulated
+                         MJPEG clients driven through generate_frames() on
+                         the camera executor
+  - delivered_fps        frames/s each client actually received
+  - memory_per_client    traced Python allocations and RSS growth per client
+
+Results are written as JSON (stdout or --out) so CI can keep a baseline and
+fail on regressions with --compare.
+
+Usage:
+  python scripts/bench_camera.py --clients 4 --duration 5 --out bench.json
+  python scripts/bench_camera.py --compare bench.json --tolerance 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Keep the router's module-level camera off real hardware.
+os.environ.setdefault("CAMERA_DEVICE", "synthetic:bars")
+os.environ.setdefault("CAMERA_WIDTH", "320")
+os.environ.setdefault("CAMERA_HEIGHT", "240")
+
+import cv2  # noqa: E402
+import psutil  # noqa: E402
+
+from app.routers.camera import CameraController, generate_frames  # noqa: E402
+from app.services.synthetic import SyntheticSource  # noqa: E402
+
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080)}
+# metric path -> True when higher is better
+TRACKED = {
+    "capture_fps": True,
+    "encode_ms.mean": False,
+    "latency_ms.p95": False,
+    "delivered_fps": True,
+    "memory_per_client.traced_kb": False,
+}
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def bench_capture(width, height, fps, spec, frames):
+    src = SyntheticSource(width, height, fps, spec, realtime=False)
+    src.start()
+    t0 = time.perf_counter()
+    captured = [src.read().copy() for _ in range(frames)]
+    elapsed = time.perf_counter() - t0
+    src.stop()
+    return frames / elapsed, captured
+
+
+def bench_encode(frames, quality):
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    times, sizes = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        ok, buf = cv2.imencode(".jpg", frame, params)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if ok:
+            sizes.append(len(buf))
+    return {
+        "mean": statistics.fmean(times),
+        "p95": _pct(times, 0.95),
+        "bytes_per_frame": int(statistics.fmean(sizes)) if sizes else None,
+    }
+
+
+def bench_clients(width, height, fps, spec, clients, duration):
+    cam = CameraController(resolution=(width, height), framerate=fps, device=spec)
+    cam.start()
+    time.sleep(0.3)
+
+    latencies = []
+    delivered = [0] * clients
+    stop_at = time.monotonic() + duration
+    proc = psutil.Process()
+    memory = {}
+
+    async def client(idx):
+        gen = generate_frames(cam)
+        try:
+            async for chunk in gen:
+                # One chunk per frame; its part header carries the capture timestamp
+                start = chunk.find(b"X-Frame-Timestamp: ", 0, 256)
+                if start >= 0:
+                    end = chunk.index(b"\r\n", start)
+                    latencies.append((time.time() - float(chunk[start + 19:end])) * 1000.0)
+                    delivered[idx] += 1
+                if time.monotonic() >= stop_at:
+                    break
+        finally:
+            await gen.aclose()
+
+    async def sample_memory():
+        await asyncio.sleep(min(1.0, duration / 2))
+        memory["traced"] = tracemalloc.get_traced_memory()[0]
+        memory["rss"] = proc.memory_info().rss
+
+    async def drive():
+        await asyncio.gather(sample_memory(), *(client(i) for i in range(clients)))
+
+    rss_before = proc.memory_info().rss
+    tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    asyncio.run(drive())
+    tracemalloc.stop()
+    cam.stop()
+    traced_during, rss_during = memory["traced"], memory["rss"]
+
+    n = max(1, clients)
+    return {
+        "latency_ms": {
+            "p50": _pct(latencies, 0.50),
+            "p95": _pct(latencies, 0.95),
+            "max": max(latencies) if latencies else None,
+            "samples": len(latencies),
+        },
+        "delivered_fps": statistics.fmean(delivered) / duration,
+        "memory_per_client": {
+            "traced_kb": max(0, traced_during - traced_before) / 1024.0 / n,
+            "rss_kb": max(0, rss_during - rss_before) / 1024.0 / n,
+        },
+    }
+
+
+def run(args):
+    results = []
+    for label in args.resolutions:
+        width, height = RESOLUTIONS[label]
+        capture_fps, frames = bench_capture(width, height, args.fps, args.source, args.frames)
+        entry = {
+            "resolution": label,
+            "size": f"{width}x{height}",
+            "capture_fps": capture_fps,
+            "encode_ms": bench_encode(frames, args.quality),
+            "clients": args.clients,
+        }
+        del frames
+        entry.update(bench_clients(width, height, args.fps, args.source, args.clients, args.duration))
+        results.append(entry)
+        print(f"{label}: {entry['capture_fps']:.1f} fps capture, "
+              f"{entry['encode_ms']['mean']:.2f} ms/frame encode, "
+              f"p95 latency {entry['latency_ms']['p95']} ms", file=sys.stderr)
+    return {
+        "benchmark": "camera",
+        "version": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+        },
+        "config": {
+            "source": args.source,
+            "fps": args.fps,
+            "quality": args.quality,
+            "clients": args.clients,
+            "duration_s": args.duration,
+        },
+        "results": results,
+    }
+
+
+def _lookup(entry, path):
+    for part in path.split("."):
+        entry = entry.get(part) if isinstance(entry, dict) else None
+    return entry
+
+
+def compare(current, baseline, tolerance):
+    """Return human-readable regressions of current vs baseline."""
+    regressions = []
+    base_by_res = {r["resolution"]: r for r in baseline.get("results", [])}
+    for res in current["results"]:
+        base = base_by_res.get(res["resolution"])
+        if base is None:
+            continue
+        for path, higher_is_better in TRACKED.items():
+            now, ref = _lookup(res, path), _lookup(base, path)
+            if not now or not ref:
+                continue
+            change = (now - ref) / ref
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{res['resolution']} {path}: {ref:.2f} -> {now:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--source", default="synthetic:bars", help="synthetic:bars|noise|static|clip=PATH")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--frames", type=int, default=60, help="frames for capture/encode phases")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of simulated streaming")
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 if a tracked metric regresses")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in regressions:
+            print("REGRESSION:", line, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
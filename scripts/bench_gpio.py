@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""GPIO toggle rate and timing jitter across backends.
+
+For every backend that opens on this host (or those given with
+``--backends``), measures:
+
+* ``toggle``: back-to-back single-pin writes - rate and per-call latency;
+* ``dir_step``: updating DIR and STEP together, one bulk ``write_many``
+  versus two ``write`` calls;
+* ``pulse_train``: software-timed STEP pulses at ``--period-us``, the way
+  the stepper worker drives them - period error from the write timestamps
+  and, with a loopback, from edge event timestamps;
+* ``pwm``: with a loopback and a backend that has PWM, the period jitter of
+  its PWM output as seen by edge events.
+
+A loopback is a jumper from the STEP pin to ``--loopback``. The mock backend
+always loops back (its watchers see writes to their own pin), so the whole
+benchmark runs without hardware; its numbers are the Python floor.
+
+Usage:
+  python scripts/bench_gpio.py --out gpio.json
+  GPIO_CHIP=/dev/gpiochip4 python scripts/bench_gpio.py --backends lgpio --loopback 25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.gpio import BACKENDS, available_backends, open_backend  # noqa: E402
+
+
+def _summary_us(samples_ns):
+    us = sorted(v / 1000.0 for v in samples_ns)
+    if not us:
+        return None
+    return {
+        "p50": round(us[len(us) // 2], 3),
+        "p99": round(us[min(len(us) - 1, int(0.99 * (len(us) - 1)))], 3),
+        "max": round(us[-1], 3),
+        "mean": round(statistics.fmean(us), 3),
+        "samples": len(us),
+    }
+
+
+def _period_errors(stamps_ns, period_ns):
+    return [abs((b - a) - period_ns) for a, b in zip(stamps_ns, stamps_ns[1:])]
+
+
+def _wait_until(deadline_ns):
+    # Sleep most of the way, spin the rest: what a Python pulse loop can do.
+    remaining = deadline_ns - time.perf_counter_ns()
+    if remaining > 200_000:
+        time.sleep((remaining - 150_000) / 1e9)
+    while time.perf_counter_ns() < deadline_ns:
+        pass
+
+
+class _Edges:
+    def __init__(self):
+        self.rising = []
+        self._lock = threading.Lock()
+
+    def __call__(self, _pin, level, ts):
+        if level:
+            with self._lock:
+                self.rising.append(ts)
+
+
+def bench_backend(name, step_pin, dir_pin, loopback, toggles, pulses, period_us, pwm_hz):
+    gpio = open_backend(name)
+    try:
+        gpio.claim_outputs([step_pin, dir_pin], [0, 0])
+        result = {"info": gpio.info()}
+
+        lat = []
+        t0 = time.perf_counter_ns()
+        for i in range(toggles):
+            t = time.perf_counter_ns()
+            gpio.write(step_pin, i & 1)
+            lat.append(time.perf_counter_ns() - t)
+        elapsed = (time.perf_counter_ns() - t0) / 1e9
+        result["toggle"] = {"writes_per_s": round(toggles / elapsed), "call_us": _summary_us(lat)}
+
+        bulk, separate = [], []
+        for i in range(toggles // 2):
+            t = time.perf_counter_ns()
+            gpio.write_many({dir_pin: i & 1, step_pin: 0})
+            bulk.append(time.perf_counter_ns() - t)
+            t = time.perf_counter_ns()
+            gpio.write(dir_pin, (i + 1) & 1)
+            gpio.write(step_pin, 0)
+            separate.append(time.perf_counter_ns() - t)
+        result["dir_step"] = {"bulk_us": _summary_us(bulk), "separate_us": _summary_us(separate)}
+
+        edges = None
+        watch_pin = step_pin if name == "mock" else loopback
+        if watch_pin is not None:
+            edges = _Edges()
+            gpio.watch(watch_pin, edges, "rising")
+        period_ns = int(period_us * 1000)
+        written = []
+        next_ns = time.perf_counter_ns() + period_ns
+        for _ in range(pulses):
+            _wait_until(next_ns)
+            written.append(time.perf_counter_ns())
+            gpio.write(step_pin, 1)
+            gpio.write(step_pin, 0)
+            next_ns += period_ns
+        train = {"period_us": period_us, "write_error_us": _summary_us(_period_errors(written, period_ns))}
+        if edges is not None:
+            time.sleep(0.05)  # let the edge thread drain
+            train["edge_error_us"] = _summary_us(_period_errors(edges.rising[-pulses:], period_ns))
+        result["pulse_train"] = train
+
+        if edges is not None and gpio.supports_pwm and name != "mock":
+            edges.rising.clear()
+            gpio.pwm(step_pin, pwm_hz, 50.0)
+            time.sleep(1.0)
+            gpio.pwm(step_pin, pwm_hz, 0.0)
+            result["pwm"] = {"frequency_hz": pwm_hz, "edge_error_us": _summary_us(_period_errors(edges.rising, int(1e9 / pwm_hz)))}
+        return result
+    finally:
+        gpio.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", help=f"comma-separated subset of {','.join(BACKENDS)} (default: all that open)")
+    parser.add_argument("--step-pin", type=int, default=23)
+    parser.add_argument("--dir-pin", type=int, default=24)
+    parser.add_argument("--loopback", type=int, help="input pin jumpered to the STEP pin")
+    parser.add_argument("--toggles", type=int, default=20000)
+    parser.add_argument("--pulses", type=int, default=2000)
+    parser.add_argument("--period-us", type=float, default=1000.0)
+    parser.add_argument("--pwm-hz", type=float, default=1000.0)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    names = args.backends.split(",") if args.backends else available_backends()
+    results = {}
+    for name in names:
+        try:
+            results[name] = bench_backend(
+                name, args.step_pin, args.dir_pin, args.loopback,
+                args.toggles, args.pulses, args.period_us, args.pwm_hz,
+            )
+        except Exception as e:
+            results[name] = {"skipped": str(e)}
+
+    report = {
+        "benchmark": "gpio",
+        "version": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"machine": platform.machine(), "python": platform.python_version()},
+        "backends": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Timing fidelity of stepper moves against their plan.
+
+Runs the same move twice: on the real clock through the configured GPIO
+backend (``GPIO_BACKEND``; the mock off the Pi), and on a virtual clock
+through the simulated backend. Every write is timestamped as issued, the
+STEP rising edges are compared with the planned edge times, and the report
+gives per-edge error, per-interval error, pulse width error and the drift
+at the end of the move. The simulated run is the reference: its errors
+should all be zero, so anything in the real run is scheduling and backend
+overhead.
+
+``--controller stepper`` drives the single-axis StepperController (constant
+speed); ``motion`` drives a one-axis MotionController, which honours
+``--accel``.
+
+Usage:
+  python scripts/bench_motion_fidelity.py --steps 2000 --rpm 120 --out fidelity.json
+  python scripts/bench_motion_fidelity.py --controller motion --accel 4000
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.routers.stepper import StepperController  # noqa: E402
+from app.services.gpio import GPIO_BACKEND, open_backend  # noqa: E402
+from app.services.motion import AxisConfig, MotionController, tick_intervals  # noqa: E402
+from app.services.simulation import (  # noqa: E402
+    REAL_CLOCK, RecordingGpio, SimulatedGpio, VirtualClock, pulses, summarize,
+)
+
+STEP, DIR = 23, 24
+
+
+def _summary_us(errors_ns):
+    us = sorted(abs(v) / 1000.0 for v in errors_ns)
+    if not us:
+        return None
+    return {
+        "p50": round(us[len(us) // 2], 3),
+        "p99": round(us[min(len(us) - 1, int(0.99 * (len(us) - 1)))], 3),
+        "max": round(us[-1], 3),
+        "mean": round(statistics.fmean(us), 3),
+    }
+
+
+def _plan(args, steps_per_rev):
+    rate = args.rpm * steps_per_rev / 60.0
+    accel = args.accel if args.controller == "motion" else 0.0
+    intervals = list(tick_intervals(args.steps, rate, accel))
+    rises = [0.0] + list(itertools.accumulate(intervals[:-1]))
+    return [int(round(t * 1e9)) for t in rises], [int(round(i * 0.5e9)) for i in intervals]
+
+
+def _run(args, gpio, clock):
+    if args.controller == "stepper":
+        ctl = StepperController(
+            pin_step=STEP, pin_dir=DIR, pin_enable=None, steps_per_rev=args.steps_per_rev,
+            default_rpm=args.rpm, gpio=gpio, clock=clock,
+        )
+        ctl.step(args.steps)
+    else:
+        ctl = MotionController(
+            [AxisConfig("bench", STEP, DIR, None, args.steps_per_rev)],
+            gpio=gpio, clock=clock, default_rpm=args.rpm, accel_sps2=args.accel,
+        )
+        ctl.move({"bench": args.steps})
+    ctl.wait_idle()
+    return pulses(gpio.history, STEP, DIR)
+
+
+def _fidelity(train, planned_rises, planned_widths):
+    if not train:
+        return {"steps": 0}
+    t0 = train[0].rise_ns
+    edge = [(p.rise_ns - t0) - plan for p, plan in zip(train, planned_rises)]
+    interval = [
+        (b.rise_ns - a.rise_ns) - (pb - pa)
+        for a, b, pa, pb in zip(train, train[1:], planned_rises, planned_rises[1:])
+    ]
+    width = [(p.fall_ns - p.rise_ns) - w for p, w in zip(train, planned_widths) if p.fall_ns is not None]
+    return {
+        "timeline": summarize(train),
+        "edge_error_us": _summary_us(edge),
+        "interval_error_us": _summary_us(interval),
+        "width_error_us": _summary_us(width),
+        "end_drift_us": round(edge[-1] / 1000.0, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controller", choices=("stepper", "motion"), default="stepper")
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--rpm", type=float, default=120.0)
+    parser.add_argument("--steps-per-rev", type=int, default=200)
+    parser.add_argument("--accel", type=float, default=0.0, help="steps/s^2 (motion controller only)")
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    planned_rises, planned_widths = _plan(args, args.steps_per_rev)
+    backend = RecordingGpio(open_backend(GPIO_BACKEND), REAL_CLOCK)
+    t0 = time.perf_counter()
+    real = _run(args, backend, REAL_CLOCK)
+    real_wall = time.perf_counter() - t0
+    backend.close()
+
+    clock = VirtualClock()
+    t0 = time.perf_counter()
+    sim = _run(args, SimulatedGpio(clock), clock)
+    sim_wall = time.perf_counter() - t0
+
+    report = {
+        "benchmark": "motion_fidelity",
+        "version": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"machine": platform.machine(), "python": platform.python_version()},
+        "move": {
+            "controller": args.controller, "steps": args.steps, "rpm": args.rpm,
+            "accel_sps2": args.accel, "planned_s": round(planned_rises[-1] / 1e9, 6) if planned_rises else 0.0,
+        },
+        "real": {"backend": backend.name, "wall_s": round(real_wall, 4), **_fidelity(real, planned_rises, planned_widths)},
+        "simulated": {"wall_s": round(sim_wall, 4), **_fidelity(sim, planned_rises, planned_widths)},
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Emergency stop latency benchmark for the stepper and the serial valve.
+
+Stepper: starts long moves on a StepperController (on the GPIO_BACKEND
+backend; the in-memory mock off the Pi) and aborts them at random
+points. Reports how long ``abort()`` takes to return and the worst-case
+time until the worker has actually stopped pulsing.
+
+Valve: opens a pseudo-terminal in place of /dev/ttyACM0, floods the serial
+executor with open/close writes, sends a stop and measures how long until
+'s' arrives on the other end and how many queued writes still got through
+after it.
+
+Usage:
+  python scripts/bench_stop_latency.py --trials 50 --out stop.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.routers import valve  # noqa: E402
+from app.routers.stepper import StepperController  # noqa: E402
+from app.services.executors import get_executor  # noqa: E402
+
+
+def _summary(samples_s):
+    ms = sorted(v * 1000.0 for v in samples_s)
+    if not ms:
+        return None
+    return {
+        "p50": ms[len(ms) // 2],
+        "p95": ms[min(len(ms) - 1, int(0.95 * (len(ms) - 1)))],
+        "max": ms[-1],
+        "mean": statistics.fmean(ms),
+        "samples": len(ms),
+    }
+
+
+def bench_stepper(trials, rpm, steps_per_rev):
+    ctl = StepperController(
+        pin_step=int(os.getenv("STEPPER_PIN_STEP", "23")),
+        pin_dir=int(os.getenv("STEPPER_PIN_DIR", "24")),
+        pin_enable=None,
+        steps_per_rev=steps_per_rev,
+        default_rpm=rpm,
+    )
+    returns, stops = [], []
+    for _ in range(trials):
+        ctl.step(1_000_000, rpm=rpm)
+        time.sleep(random.uniform(0.005, 0.05))
+        t0 = time.perf_counter()
+        ctl.abort()
+        returns.append(time.perf_counter() - t0)
+        while ctl.moving:
+            time.sleep(0.0005)
+        stops.append(ctl.last_stop_latency)
+    return {
+        "backend": ctl.gpio.name,
+        "rpm": rpm,
+        "step_period_ms": 60_000.0 / (rpm * steps_per_rev),
+        "abort_return_ms": _summary(returns),
+        "stop_latency_ms": _summary(stops),
+    }
+
+
+def bench_valve(trials, queued):
+    import pty
+    import select
+
+    master, slave = pty.openpty()
+    valve.DEVICE_PATH = os.ttyname(slave)
+    latencies, leaked = [], []
+    serial_ex = get_executor("serial")
+    try:
+        if valve._get_serial_connection() is None:
+            return {"skipped": "pyserial not installed or pty unusable"}
+        for _ in range(trials):
+            for i in range(queued):
+                try:
+                    valve._submit_write("r" if i % 2 else "l", "bench")
+                except Exception:
+                    break  # queue full (HTTP 503 in the API) is fine; we only need a backlog
+            t0 = time.perf_counter()
+            valve._send_stop()
+            seen_stop, after = False, 0
+            deadline = t0 + 1.0
+            while time.perf_counter() < deadline:
+                ready, _, _ = select.select([master], [], [], 0.01)
+                if not ready:
+                    m = serial_ex.metrics()
+                    if seen_stop and m["active"] == 0 and m["queued"] == 0:
+                        break
+                    continue
+                data = os.read(master, 1024)
+                if not seen_stop and b"s" in data:
+                    latencies.append(time.perf_counter() - t0)
+                    seen_stop = True
+                    data = data[data.index(b"s") + 1:]
+                if seen_stop:
+                    after += len(data.replace(b"s", b""))
+            leaked.append(after)
+    finally:
+        valve._close_serial_connection()
+        valve._serial_connection = None
+        os.close(master)
+        os.close(slave)
+    return {
+        "queued_writes": queued,
+        "stop_latency_ms": _summary(latencies),
+        "writes_after_stop": {"max": max(leaked) if leaked else None, "mean": statistics.fmean(leaked) if leaked else None},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--rpm", type=float, default=60.0)
+    parser.add_argument("--steps-per-rev", type=int, default=200)
+    parser.add_argument("--queued", type=int, default=16, help="valve writes queued before each stop")
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "stop_latency",
+        "version": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"machine": platform.machine(), "python": platform.python_version()},
+        "stepper": bench_stepper(args.trials, args.rpm, args.steps_per_rev),
+        "valve": bench_valve(args.trials, args.queued),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
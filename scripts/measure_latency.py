@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Glass-to-glass latency of the MJPEG stream, using the X-Frame-Timestamp part headers.
+
+Every part of /camera/stream.mjpg carries the frame's capture time
+(``X-Frame-Timestamp``, Unix seconds). Two modes:
+
+  pipeline (default)  capture -> received, per frame. Run it on the Pi itself,
+                      or on a viewer whose clock is NTP-synced to the Pi.
+  --flash             point the camera at this machine's screen: the script
+                      toggles a full-screen window black/white and times when
+                      the change shows up in the stream. Splits the total into
+                      sensor+driver (flash -> capture timestamp) and pipeline
+                      (capture -> received). Needs a display and OpenCV.
+
+Results are printed as JSON (p50/p95/max in ms).
+
+Usage:
+  python scripts/measure_latency.py --url http://pi.local:8000/camera/stream.mjpg --duration 10
+  python scripts/measure_latency.py --flash --flashes 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))], 1)
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {"p50": _pct(values, 0.5), "p95": _pct(values, 0.95),
+            "max": round(max(values), 1) if values else None, "samples": len(values)}
+
+
+def parts(url: str, timeout: float = 10.0) -> Iterator[Tuple[float, Optional[float], bytes]]:
+    """Yield (received_at, capture timestamp or None, jpeg) for each part of an MJPEG stream."""
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        while True:
+            line = resp.readline()
+            if not line:
+                return
+            if not line.startswith(b"--"):
+                continue
+            headers = {}
+            while True:
+                line = resp.readline().strip()
+                if not line:
+                    break
+                key, _, value = line.partition(b":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get(b"content-length", b"0"))
+            if not length:
+                continue
+            body = resp.read(length)
+            received = time.time()
+            ts = headers.get(b"x-frame-timestamp")
+            yield received, float(ts) if ts else None, body
+
+
+def measure_pipeline(url: str, duration: float) -> dict:
+    lags, frames, first = [], 0, None
+    for received, ts, _jpeg in parts(url):
+        first = first or received
+        frames += 1
+        if ts is not None:
+            lags.append((received - ts) * 1000.0)
+        if received - first >= duration:
+            break
+    if frames and not lags:
+        print("stream has no X-Frame-Timestamp headers; is the API up to date?", file=sys.stderr)
+    elapsed = max(1e-6, (time.time() - first) if first else 1e-6)
+    return {"mode": "pipeline", "fps": round(frames / elapsed, 2), "capture_to_received_ms": _summary(lags)}
+
+
+def measure_flash(url: str, flashes: int, period: float, threshold: float) -> dict:
+    import cv2  # noqa: WPS433 - only this mode needs a display
+    import numpy as np
+
+    state = {"white": False, "since": 0.0}
+    results: List[Tuple[float, float, float]] = []  # (total, sensor, pipeline) in ms
+    stop = threading.Event()
+
+    def watch() -> None:
+        seen_white: Optional[bool] = None
+        for received, ts, jpeg in parts(url):
+            if stop.is_set():
+                return
+            img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                continue
+            white = float(img.mean()) > threshold
+            if white != seen_white and white == state["white"] and state["since"]:
+                flash = state["since"]
+                capture = ts if ts is not None else received
+                results.append(((received - flash) * 1000.0, (capture - flash) * 1000.0, (received - capture) * 1000.0))
+                state["since"] = 0.0
+            seen_white = white
+
+    threading.Thread(target=watch, daemon=True).start()
+    cv2.namedWindow("latency", cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty("latency", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    screen = np.zeros((720, 1280), np.uint8)
+    try:
+        for _ in range(flashes * 2):
+            state["white"] = not state["white"]
+            screen[:] = 255 if state["white"] else 0
+            cv2.imshow("latency", screen)
+            cv2.waitKey(1)  # the frame is on its way to the display once this returns
+            state["since"] = time.time()
+            deadline = time.time() + period
+            while time.time() < deadline:
+                cv2.waitKey(20)
+    finally:
+        stop.set()
+        cv2.destroyAllWindows()
+    return {
+        "mode": "flash",
+        "glass_to_glass_ms": _summary([r[0] for r in results]),
+        "flash_to_capture_ms": _summary([r[1] for r in results]),
+        "capture_to_received_ms": _summary([r[2] for r in results]),
+        "missed": flashes * 2 - len(results),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/camera/stream.mjpg")
+    parser.add_argument("--duration", type=float, default=10.0, help="pipeline mode: seconds to sample")
+    parser.add_argument("--flash", action="store_true", help="screen-flash glass-to-glass mode")
+    parser.add_argument("--flashes", type=int, default=10)
+    parser.add_argument("--period", type=float, default=1.5, help="seconds each black/white screen is held")
+    parser.add_argument("--threshold", type=float, default=128.0, help="mean luma that counts as white")
+    args = parser.parse_args()
+
+    if args.flash:
+        report = measure_flash(args.url, args.flashes, args.period, args.threshold)
+    else:
+        report = measure_pipeline(args.url, args.duration)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
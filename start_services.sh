@@ -38,6 +38,8 @@ done
 # Start FastAPI application
 echo "Starting FastAPI application..."
 source venv/bin/activate
+echo "Building dashboard assets..."
+python3 -m app.services.static_assets > /dev/null || echo "WARNING: asset build failed, serving unbuilt assets"
 nohup python3 -m uvicorn app.main:app --host 127.0.0.1 --port 8000 > /tmp/uuplastination-api.log 2>&1 &
 API_PID=$!
 echo "API started with PID $API_PID"
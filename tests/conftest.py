@@ -0,0 +1,22 @@
+"""Keep the test run away from the host's real state files and hardware.
+
+Settings are read from the environment at import time, so they are set
+here, before any test module imports ``app``: no lifespan warm-up (which
+would restore the stepper journal and claim GPIO pins), the mock GPIO
+backend, and state files in a temporary directory.
+"""
+import os
+import shutil
+import tempfile
+
+_STATE_DIR = tempfile.mkdtemp(prefix="uuplastination-tests-")
+
+os.environ["HARDWARE_WARMUP"] = "0"
+os.environ["GPIO_BACKEND"] = "mock"
+os.environ["GOVERNOR_STATE_FILE"] = os.path.join(_STATE_DIR, "governor.env")
+os.environ["STEPPER_JOURNAL"] = os.path.join(_STATE_DIR, "stepper.journal")
+os.environ["TIMELAPSE_DIR"] = os.path.join(_STATE_DIR, "timelapse")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_STATE_DIR, ignore_errors=True)
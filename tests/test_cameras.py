@@ -0,0 +1,98 @@
+"""Multi-camera configuration and per-camera frame pacing."""
+import time
+
+from app.routers import camera as camera_mod
+from app.routers.camera import FramePacer, load_camera_configs
+
+
+def test_configs_from_env(monkeypatch):
+    monkeypatch.setenv("CAMERAS", "main,chamber")
+    monkeypatch.setenv("CAMERA_DEVICE", "synthetic:bars")
+    monkeypatch.setenv("CAMERA_CHAMBER_NUM", "1")
+    monkeypatch.setenv("CAMERA_CHAMBER_MAX_FPS", "10")
+    monkeypatch.setenv("CAMERA_CHAMBER_CPU_BUDGET", "0.25")
+    configs = load_camera_configs()
+    assert list(configs) == ["main", "chamber"]
+    assert configs["main"].device == "synthetic:bars" and configs["main"].primary
+    chamber = configs["chamber"]
+    assert chamber.device == "/dev/video1"  # never inherits the primary camera's device
+    assert (chamber.max_fps, chamber.cpu_budget, chamber.primary) == (10.0, 0.25, False)
+
+
+def test_cpu_budget_stretches_frame_period():
+    pacer = FramePacer(max_fps=100, cpu_budget=0.1)
+    t0 = time.monotonic()
+    for _ in range(5):
+        pacer.frame_done(0.004)  # 4 ms of CPU per frame at 10% of a core -> 40 ms period
+    elapsed = time.monotonic() - t0
+    assert elapsed >= 0.15
+    assert pacer.budget_limited == 5
+
+
+def test_unknown_camera_is_404(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    monkeypatch.setenv("HARDWARE_WARMUP", "0")
+    assert "missing" not in camera_mod.CAMERA_CONFIGS
+    with TestClient(app) as client:
+        assert client.get("/camera/missing/snapshot").status_code == 404
+        assert client.get("/camera/list").json()["default"] == camera_mod.DEFAULT_CAMERA
+
+
+class _QueuedCapture:
+    """Driver with a 4-deep queue: queued frames grab instantly, the next waits for the sensor."""
+
+    def __init__(self, queued: int):
+        self.queued = queued
+        self.grabbed = 0
+
+    def grab(self):
+        if self.queued:
+            self.queued -= 1
+        else:
+            time.sleep(0.02)
+        self.grabbed += 1
+        return True
+
+    def get(self, _prop):
+        return 0.0
+
+    def retrieve(self):
+        return True, self.grabbed
+
+
+def test_low_latency_capture_drains_stale_buffers():
+    cam = camera_mod.CameraController(framerate=30, device="synthetic:bars", low_latency=True)
+    cam.cap, cam.synthetic, cam.drain_stale = _QueuedCapture(queued=3), False, True
+    ok, frame, captured = cam._read_latest()
+    assert ok and frame == 4 and cam.stale_drained == 3  # the fresh frame, not the oldest queued one
+    assert abs(captured - time.time()) < 0.5
+
+
+def test_snapshot_serves_the_current_frame_without_waiting(monkeypatch):
+    import asyncio
+
+    camera = camera_mod.CameraController.__new__(camera_mod.CameraController)  # no hardware probing
+    camera.camera_id, camera.is_running = "still", True
+    camera.output = camera_mod.StreamingOutput()
+    camera.output.write(b"\xff\xd8still\xff\xd9", 5.0)  # a static scene: no newer frame for seconds
+    monkeypatch.setitem(camera_mod._cameras, "still", camera)
+
+    t0 = time.monotonic()
+    resp = asyncio.run(camera_mod._snapshot("still"))
+    assert time.monotonic() - t0 < 0.5
+    assert resp.status_code == 200 and resp.body == b"\xff\xd8still\xff\xd9"
+
+
+def test_capture_status_reports_cached_driver_settings():
+    class _Busy:
+        def get(self, _prop):  # owned by the capture thread
+            raise AssertionError("status must not query the capture")
+
+    cam = camera_mod.CameraController(framerate=30, device="synthetic:bars", low_latency=True)
+    cam.cap, cam.synthetic = _Busy(), False
+    cam.cap_fourcc, cam.cap_buffer_size = "MJPG", 1
+    status = cam._capture_status()
+    assert status["fourcc"] == "MJPG" and status["buffer_size"] == 1
@@ -0,0 +1,26 @@
+"""Static-scene frame skipping."""
+import numpy as np
+
+from app.services.changedetect import ChangeDetector
+
+
+def test_static_scene_sends_only_keepalives_and_motion_at_once():
+    det = ChangeDetector(keepalive_s=2.0)
+    rng = np.random.default_rng(0)
+    scene = rng.integers(0, 200, size=(720, 1280, 3), dtype=np.uint8)
+
+    assert det.check(scene, now=0.0) == "change"  # first frame
+    det.sent(0.01, 50_000)
+    noisy = np.clip(scene.astype(np.int16) + rng.integers(-4, 5, size=scene.shape), 0, 255).astype(np.uint8)
+    decisions = [det.check(noisy, now=0.1 * i) for i in range(1, 30)]
+    assert decisions.count("keepalive") == 1 and decisions.count(None) == 28
+    for _ in range(28):
+        det.skip(clients=2)
+
+    moved = scene.copy()
+    moved[100:200, 100:200] = 255
+    assert det.check(moved, now=3.05) == "change"
+
+    status = det.status()
+    assert status["skipped"] == 28
+    assert status["saved_mbytes"] > 0 and status["saved_cpu_s"] > 0
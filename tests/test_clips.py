@@ -0,0 +1,37 @@
+"""Recent-frame ring buffer, incident freezing and MJPEG export."""
+from app.services.clips import ClipBuffer, to_mjpeg
+
+
+def _jpeg(n: int) -> bytes:
+    return b"\xff\xd8" + bytes([n % 256]) * 1000 + b"\xff\xd9"
+
+
+def test_ring_is_bounded_by_age_and_memory():
+    ring = ClipBuffer("main", seconds=2.0, max_bytes=1 << 20)
+    for i in range(100):
+        ring.tap(_jpeg(i), 100.0 + i * 0.1)
+    frames = ring.window(0, 1e9)
+    assert frames[0][0] >= 109.9 - 2.0 and len(frames) == 21
+
+    small = ClipBuffer("main", seconds=60.0, max_bytes=5 * 1004)
+    for i in range(10):
+        small.tap(_jpeg(i), 100.0 + i)
+    assert len(small.window(0, 1e9)) == 5 and small.evicted_for_memory == 5
+
+
+def test_freeze_keeps_pre_and_post_event_frames_once_per_burst():
+    ring = ClipBuffer("main", seconds=5.0, post_s=1.0)
+    for i in range(50):
+        ring.tap(_jpeg(i), 100.0 + i * 0.1)
+    clip_id = ring.freeze("valve write failed", now=104.95)
+    assert clip_id == "main-1"
+    assert ring.freeze("valve write failed", now=105.0) is None  # still collecting
+    for i in range(50, 70):  # 105.0 .. 106.9: only up to 105.95 belongs to the clip
+        ring.tap(_jpeg(i), 100.0 + i * 0.1)
+    assert ring.freeze("valve write failed", now=107.0) is None  # same error, same burst
+
+    frames = ring.clip(clip_id)
+    assert frames[0][0] == 100.0 and frames[-1][0] <= 105.95
+    assert len(frames) == 60
+    assert to_mjpeg(frames).count(b"\xff\xd8") == 60
+    assert ring.freeze("stepper: pulse failed", now=107.0) == "main-2"
@@ -0,0 +1,56 @@
+"""Derived (resized/cropped) snapshots and their LRU cache."""
+import cv2
+import numpy as np
+
+from app.services.derived import Crop, Derived, DerivedCache, derive, jpeg_size
+
+
+def _frame(width=640, height=480) -> bytes:
+    img = np.zeros((height, width, 3), np.uint8)
+    img[:, width // 2:] = 255  # right half white
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def test_resize_crop_and_format():
+    jpeg = _frame()
+    assert jpeg_size(jpeg) == (640, 480)
+
+    thumb = derive(jpeg, width=80)  # 1/8: decoded in the DCT domain, no resize pass needed
+    assert cv2.imdecode(np.frombuffer(thumb.data, np.uint8), 1).shape == (60, 80, 3)
+
+    tile = derive(jpeg, crop=Crop(320, 0, 10000, 240), width=100, fmt="webp")
+    img = cv2.imdecode(np.frombuffer(tile.data, np.uint8), 1)
+    assert tile.media_type == "image/webp" and tile.crop == Crop(320, 0, 320, 240)  # clamped to the frame
+    assert img.shape == (75, 100, 3) and img.mean() > 240  # only the white half
+
+
+def test_cache_is_lru_and_byte_bounded():
+    cache = DerivedCache(max_bytes=250)
+    item = Derived(b"x" * 100, "image/jpeg", None, False)
+    cache.put(("main", 1, "a"), item)
+    cache.put(("main", 1, "b"), item)
+    assert cache.get(("main", 1, "a")) is item  # now most recently used
+    cache.put(("main", 2, "a"), item)
+    assert cache.get(("main", 1, "b")) is None and cache.evictions == 1
+    assert cache.status()["entries"] == 2 and cache.status()["hits"] == 1
+
+
+def test_concurrent_requests_for_one_view_share_a_derivation():
+    import asyncio
+
+    from app.routers import camera as camera_mod
+
+    jpeg = _frame()
+    params = camera_mod.SnapshotParams(320, None, None, "jpeg")
+
+    async def run():
+        return await asyncio.gather(*(
+            camera_mod._derived_response("wall", 7, 1.0, jpeg, params) for _ in range(12)
+        ))
+
+    before = camera_mod.derived_cache.status()
+    responses = asyncio.run(run())
+    states = sorted(r.headers["X-Derived-Cache"] for r in responses)
+    assert states == ["miss"] + ["shared"] * 11  # not 12 derivations racing for 2 encode workers
+    assert all(r.status_code == 200 and r.body == responses[0].body for r in responses)
+    assert camera_mod.derived_cache.status()["misses"] == before["misses"] + 1
@@ -0,0 +1,56 @@
+"""Per-subsystem executors: admission control and abort isolation."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.executors import BoundedExecutor, ExecutorSaturated, get_executor
+
+
+def test_rejects_when_workers_and_queue_are_full():
+    ex = BoundedExecutor("test", max_workers=1, max_queue=1)
+    gate = threading.Event()
+    ex.submit(gate.wait)
+    ex.submit(gate.wait)
+    with pytest.raises(ExecutorSaturated):
+        ex.submit(gate.wait)
+    metrics = ex.metrics()
+    assert metrics["saturated"] and metrics["rejected"] == 1
+    assert metrics["active"] == 1 and metrics["queued"] == 1
+    gate.set()
+    ex.shutdown()
+
+
+def test_run_returns_result_and_records_timing():
+    ex = BoundedExecutor("test", max_workers=2, max_queue=0)
+    assert asyncio.run(ex.run(lambda a, b: a + b, 2, 3)) == 5
+    metrics = ex.metrics()
+    assert metrics["completed"] == 1 and metrics["run_ms"]["max"] is not None
+    ex.shutdown()
+
+
+def test_abort_stays_fast_while_camera_and_stats_pools_are_saturated():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    gate = threading.Event()
+    for name in ("camera", "stats"):
+        ex = get_executor(name)
+        try:
+            while True:
+                ex.submit(gate.wait)
+        except ExecutorSaturated:
+            pass
+    try:
+        with TestClient(app) as client:
+            t0 = time.monotonic()
+            resp = client.post("/api/stepper/abort")
+            elapsed = time.monotonic() - t0
+            assert resp.status_code == 200
+            assert elapsed < 0.5
+            assert client.get("/api/stats").status_code == 503
+            assert client.get("/api/executors").json()["camera"]["saturated"]
+    finally:
+        gate.set()
@@ -0,0 +1,45 @@
+"""Thermal/load governor: hysteresis, motor headroom and published state."""
+from app.services.governor import Governor, read_state
+
+
+def _sample(temp, cpu):
+    return {"cpu_temp_c": temp, "cpu_percent": cpu}
+
+
+def test_steps_up_on_sustained_heat_and_down_only_after_cooldown(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.governor.time.time", lambda: clock[0])
+    gov = Governor(cooldown_s=30.0, state_file=tmp_path / "gov.env")
+    seen = []
+    gov.add_listener(lambda level: seen.append(level.name))
+
+    gov.update(_sample(72.0, 20.0))
+    assert gov.level.name == "full"  # a single hot sample is not enough
+    gov.update(_sample(72.0, 20.0))
+    assert gov.level.name == "warm"
+    assert read_state(tmp_path / "gov.env")["GOVERNOR_BITRATE_KBPS"] == "1750"
+
+    # Inside the hysteresis band (70 - 5 <= t < 70): stay warm
+    clock[0] += 60
+    gov.update(_sample(67.0, 20.0))
+    assert gov.level.name == "warm"
+
+    gov.update(_sample(60.0, 20.0))
+    clock[0] += 29
+    gov.update(_sample(60.0, 20.0))
+    assert gov.level.name == "warm"
+    clock[0] += 2
+    gov.update(_sample(60.0, 20.0))
+    assert gov.level.name == "full"
+    assert seen == ["full", "warm", "full"]
+    assert [d["to"] for d in gov.status()["decisions"]] == ["warm", "full"]
+
+
+def test_motor_headroom_escalates_immediately_while_moving():
+    gov = Governor()
+    gov.update(_sample(50.0, 80.0))
+    assert gov.level.name == "full"  # over the CPU bar once, nothing moving
+    gov.motion_active = lambda: True
+    gov.update(_sample(50.0, 80.0))
+    assert gov.level.name == "warm"
+    assert gov.decisions[-1]["reason"].startswith("motor headroom")
@@ -0,0 +1,52 @@
+"""GPIO backend selection and the stepper's use of bulk writes (mock backend)."""
+import time
+
+import pytest
+
+from app.routers.stepper import StepperController
+from app.services.gpio import GpioBackend, GpioUnavailable, MockBackend, open_backend
+
+
+def test_mock_bulk_write_is_one_call_and_loops_back_to_watchers():
+    gpio = MockBackend()
+    gpio.claim_outputs([23, 24], [0, 0])
+    seen = []
+    gpio.watch(23, lambda pin, level, ts: seen.append((pin, level)), "rising")
+    gpio.write_many({23: 1, 24: 1})
+    gpio.write(23, 0)
+    assert gpio.calls == 2 and gpio.levels == {23: 0, 24: 1}
+    assert seen == [(23, 1)]
+    with pytest.raises(KeyError):
+        gpio.write(5, 1)  # never claimed
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(GpioUnavailable):
+        open_backend("pigpio")
+
+    class Partial(GpioBackend):
+        def write(self, pin, level):
+            pass
+
+    with pytest.raises(TypeError):  # claim_outputs is abstract
+        Partial()
+
+
+def test_stepper_sets_dir_with_step_low_before_pulsing():
+    gpio = MockBackend()
+    ctl = StepperController(pin_step=23, pin_dir=24, pin_enable=18, default_rpm=600, gpio=gpio)
+    assert gpio.levels == {23: 0, 24: 0, 18: 1}  # active-low ENABLE starts disabled
+    ctl.enable()
+    ctl.step(-3)
+    deadline = time.monotonic() + 1.0
+    while ctl.moving and time.monotonic() < deadline:
+        time.sleep(0.001)
+    ctl.step(2)
+    while ctl.moving and time.monotonic() < deadline:
+        time.sleep(0.001)
+    transitions = [(pin, level) for _, pin, level in gpio.history]
+    assert transitions[0] == (18, 0)
+    first_fwd = transitions.index((24, 1))
+    assert transitions[first_fwd + 1] == (23, 1)  # DIR settled before the next rising STEP
+    assert transitions.count((23, 1)) == 5 and ctl.status()["position_steps"] == -1
+    assert ctl.status()["gpio"]["backend"] == "mock"
@@ -0,0 +1,45 @@
+"""Publisher health record round trips through the memory-mapped file."""
+import time
+
+from app.services import health as health_mod
+from app.services.health import HealthReader, HealthWriter
+
+
+def test_missing_until_written(tmp_path):
+    reader = HealthReader(tmp_path / "health.mmap")
+    assert reader.read()["status"] == "missing"
+
+
+def test_running_publisher_reports_rate_and_errors(tmp_path):
+    path = tmp_path / "health.mmap"
+    writer = HealthWriter(path)
+    reader = HealthReader(path)
+    writer.write("error", detail="boom")
+    writer.write("running", detail="capturing")
+    for _ in range(3):
+        writer.frame()
+    state = reader.read()
+    assert state["status"] == "running"
+    assert state["detail"] == "capturing"
+    assert state["frames"] == 3 and state["errors"] == 1
+    assert state["last_frame_age_s"] < 1.0 and not state["stalled"]
+
+
+def test_stalled_publisher_is_flagged(tmp_path, monkeypatch):
+    path = tmp_path / "health.mmap"
+    writer = HealthWriter(path)
+    writer.write("running")
+    writer.frame(ts=time.time() - 60)
+    monkeypatch.setattr(health_mod, "STALL_AFTER_S", 5.0)
+    state = HealthReader(path).read()
+    assert state["stalled"] and state["status"] == "stalled"
+
+
+def test_reader_never_returns_torn_record(tmp_path):
+    path = tmp_path / "health.mmap"
+    writer = HealthWriter(path)
+    writer.write("running")
+    # Leave the seqlock odd, as if the writer died mid-update.
+    writer._seq += 1
+    health_mod._SEQ.pack_into(writer._map, health_mod._SEQ_OFFSET, writer._seq)
+    assert HealthReader(path).read(retries=3)["status"] == "busy"
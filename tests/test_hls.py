@@ -0,0 +1,90 @@
+"""MPEG-TS splitting into HLS segments/parts and playlist rendering."""
+from app.services.hls import PTS_WRAP, TS_PACKET, TsSegmenter
+
+VIDEO_PID = 0x100
+PMT_PID = 0x1000
+
+
+def _pat() -> bytes:
+    section = bytes([0x00, 0xB0, 0x0D, 0x00, 0x01, 0xC1, 0x00, 0x00, 0x00, 0x01, 0xE0 | PMT_PID >> 8, PMT_PID & 0xFF])
+    payload = b"\x00" + section + b"\x00" * 4
+    return bytes([0x47, 0x40, 0x00, 0x10]) + payload.ljust(TS_PACKET - 4, b"\xff")
+
+
+def _pmt() -> bytes:
+    return bytes([0x47, 0x40 | PMT_PID >> 8, PMT_PID & 0xFF, 0x10]) + b"\x00\x02".ljust(TS_PACKET - 4, b"\xff")
+
+
+def _frame(pts_s: float, keyframe: bool) -> bytes:
+    pts = int(pts_s * 90000) % PTS_WRAP
+    pts_bytes = bytes([
+        0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, 0x01 | ((pts >> 14) & 0xFE),
+        (pts >> 7) & 0xFF, 0x01 | ((pts << 1) & 0xFE),
+    ])
+    pes = b"\x00\x00\x01\xe0\x00\x00\x80\x80\x05" + pts_bytes
+    # Adaptation field carrying the random_access_indicator on keyframes
+    af = bytes([1, 0x40 if keyframe else 0x00])
+    first = bytes([0x47, 0x40 | VIDEO_PID >> 8, VIDEO_PID & 0xFF, 0x30]) + af + pes
+    cont = bytes([0x47, VIDEO_PID >> 8, VIDEO_PID & 0xFF, 0x10]) + b"\x00" * (TS_PACKET - 4)
+    return first.ljust(TS_PACKET, b"\xff") + cont
+
+
+def _stream(seconds: float, fps: int = 10, gop_s: float = 1.0, start_s: float = 0.0) -> bytes:
+    out = bytearray()
+    for i in range(int(seconds * fps)):
+        t = start_s + i / fps
+        key = i % int(gop_s * fps) == 0
+        if key:
+            out += _pat() + _pmt()
+        out += _frame(t, key)
+    return bytes(out)
+
+
+def test_segments_start_at_keyframes_and_are_split_into_parts():
+    seg = TsSegmenter("s1", segment_s=1.0, part_s=0.5, list_size=3)
+    data = _stream(5.05)
+    for i in range(0, len(data), 1000):  # arbitrary read sizes, not packet aligned
+        seg.feed(data[i:i + 1000])
+    status = seg.status()
+    assert status["first_msn"] == 0 and status["last_msn"] == 3  # segment 4 is still open
+
+    segment = seg.lookup("s1-1.ts")
+    assert segment is not None and len(segment) % TS_PACKET == 0
+    assert segment[:TS_PACKET] == _pat()  # decodable on its own
+    assert seg.lookup("s1-1.0.ts") + seg.lookup("s1-1.1.ts") == segment
+    assert seg.lookup("other-1.ts") is None and seg.lookup("s1-1.7.ts") is None
+
+    playlist = seg.playlist()
+    assert "#EXT-X-MEDIA-SEQUENCE:1" in playlist  # only list_size complete segments listed
+    assert "#EXTINF:1.000,\ns1-3.ts" in playlist
+    assert 'URI="s1-4.0.ts",INDEPENDENT=YES' in playlist  # open segment: parts only
+    assert 'PRELOAD-HINT:TYPE=PART,URI="s1-4.1.ts"' in playlist
+    assert seg.playlist() is playlist  # cached until the next part
+    assert seg.has(3, None) and seg.has(4, None) is False and not seg.has(9, 0)
+
+
+def test_cache_evicts_oldest_segments():
+    seg = TsSegmenter("s2", segment_s=1.0, part_s=0.0, list_size=2)
+    seg.feed(_stream(10.05))
+    assert seg.status()["segments"] <= 4 and seg.evicted > 0
+    assert seg.lookup("s2-0.ts") is None and seg.lookup("s2-8.ts") is not None
+    assert "EXT-X-PART" not in seg.playlist()
+
+
+def test_segments_keep_closing_across_the_pts_wrap():
+    seg = TsSegmenter("s3", segment_s=1.0, part_s=0.5, list_size=3)
+    seg.feed(_stream(6.05, start_s=PTS_WRAP / 90000 - 2.5))  # wraps 2.5 s in
+    status = seg.status()
+    assert status["last_msn"] == 4 and status["overflows"] == 0
+    assert "#EXTINF:1.000,\ns3-4.ts" in seg.playlist()
+    assert "PART:DURATION=0.500" in seg.playlist()
+
+
+def test_open_segment_without_boundaries_is_capped():
+    seg = TsSegmenter("s4", segment_s=1.0, part_s=0.0, max_bytes=8 << 20)
+    seg.feed(_stream(1.0, fps=10, gop_s=1.0))  # opens segment 0 ...
+    # ... then a keyframe-less stream: the segment never closes
+    seg.feed(b"".join(_frame(1.0 + i / 10, False) for i in range(4000)))
+    assert seg.overflows == 1 and len(seg._part) * TS_PACKET <= seg.max_open_bytes
+    seg.feed(_stream(3.05, start_s=500.0))
+    assert seg.status()["last_msn"] is not None
@@ -28,3 +28,22 @@ def test_publisher_module_import():
     # Publisher should import even if picamera2/OpenCV missing
     mod = import_module("app.services.publisher")
     assert hasattr(mod, "main")
+
+
+def test_app_import_defers_hardware_and_heavy_imports():
+    # Fresh interpreter: other tests may already have imported OpenCV.
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    code = (
+        "import sys, app.main\n"
+        "from app.routers import camera, stepper\n"
+        "assert not camera._cameras and stepper._controller is None\n"
+        "assert 'cv2' not in sys.modules and 'jwt' not in sys.modules\n"
+        "print([p['name'] for p in app.main.startup.report()['phases']])\n"
+    )
+    root = Path(__file__).resolve().parent.parent
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert "import.routers" in out.stdout
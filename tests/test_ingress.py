@@ -0,0 +1,130 @@
+"""Ingress reuse against an in-process stand-in for the LiveKit API."""
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+from app.services.ingress import IngressManager
+
+
+class FakeLiveKit:
+    """Just enough of ``livekit.api``: one shared server, clients count their pools."""
+
+    ListIngressRequest = CreateIngressRequest = DeleteIngressRequest = SimpleNamespace
+    IngressInput = SimpleNamespace(RTMP_INPUT=0)
+
+    def __init__(self):
+        self.ingresses = {}
+        self.clients = 0
+        self.calls = []
+        self._ids = itertools.count(1)
+        fake = self
+
+        class Ingress:
+            async def list_ingress(self, req):
+                fake.calls.append("list")
+                items = [
+                    i for i in fake.ingresses.values()
+                    if getattr(req, "ingress_id", "") in ("", i.ingress_id)
+                    and getattr(req, "room_name", "") in ("", i.room_name)
+                ]
+                return SimpleNamespace(items=items)
+
+            async def create_ingress(self, req):
+                fake.calls.append("create")
+                return fake.add(req.name, req.room_name)
+
+            async def delete_ingress(self, req):
+                fake.calls.append("delete")
+                return fake.ingresses.pop(req.ingress_id)
+
+        class LiveKitAPI:
+            def __init__(self, url, api_key, api_secret):
+                fake.clients += 1
+                self.ingress = Ingress()
+                self.closed = False
+
+            async def aclose(self):
+                self.closed = True
+
+        self.LiveKitAPI = LiveKitAPI
+
+    def add(self, name, room):
+        n = next(self._ids)
+        info = SimpleNamespace(
+            ingress_id=f"IN_{n}", name=name, room_name=room, stream_key=f"key{n}", url="rtmp://sfu/live",
+        )
+        self.ingresses[info.ingress_id] = info
+        return info
+
+
+def _manager(fake, tmp_path, revalidate_s=300.0):
+    return IngressManager(
+        "https://sfu", "k", "s", cache_path=str(tmp_path / "cache.json"), revalidate_s=revalidate_s, lk=fake,
+        key_file=str(tmp_path / "ingress_key.txt"),
+    )
+
+
+def test_create_once_then_reuse_from_memory_cache_and_listing(tmp_path):
+    fake = FakeLiveKit()
+
+    async def scenario():
+        api = _manager(fake, tmp_path)
+        first, *others = await asyncio.gather(*(api.ensure("lab", "pi-cam") for _ in range(5)))
+        assert first["source"] == "created" and {o["source"] for o in others} == {"memory"}
+        assert fake.calls == ["list", "create"] and fake.clients == 1
+        assert (tmp_path / "cache.json").stat().st_mode & 0o777 == 0o600  # holds the stream key
+        await api.aclose()
+
+        # A restart (new manager) validates the cached ID with one call
+        restarted = _manager(fake, tmp_path)
+        again = await restarted.ensure("lab", "pi-cam")
+        assert again["source"] == "cache" and again["stream_key"] == first["stream_key"]
+
+        # Cache lost: found by listing the room instead of creating another
+        (tmp_path / "cache.json").unlink()
+        listed = await _manager(fake, tmp_path).ensure("lab", "pi-cam")
+        assert listed["source"] == "listed" and listed["ingress_id"] == first["ingress_id"]
+        assert len(fake.ingresses) == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_cache_and_duplicates(tmp_path):
+    fake = FakeLiveKit()
+    fake.add("pi-cam", "lab")
+    fake.add("pi-cam", "lab")  # leaked by the old always-create script
+    fake.add("other", "lab")
+
+    async def scenario():
+        api = _manager(fake, tmp_path, revalidate_s=0.0)
+        got = await api.ensure("lab", "pi-cam", prune=True)
+        assert got["ingress_id"] == "IN_1" and sorted(fake.ingresses) == ["IN_1", "IN_3"]
+
+        del fake.ingresses["IN_1"]  # deleted on the server behind our back
+        replaced = await api.ensure("lab", "pi-cam")
+        assert replaced["source"] == "created" and replaced["ingress_id"] != "IN_1"
+
+    asyncio.run(scenario())
+
+
+def test_prune_keeps_the_ingress_in_use(tmp_path):
+    fake = FakeLiveKit()
+    for _ in range(3):
+        fake.add("pi-cam", "lab")
+    fake.ingresses["IN_3"].state = SimpleNamespace(status=2)  # ENDPOINT_PUBLISHING
+    (tmp_path / "ingress_key.txt").write_text("RTMP_URL=rtmp://sfu/live\nSTREAM_KEY=key2\n")
+
+    async def scenario():
+        got = await _manager(fake, tmp_path).ensure("lab", "pi-cam", prune=True)
+        assert got["ingress_id"] == "IN_3" and sorted(fake.ingresses) == ["IN_3"]
+
+        # Nobody publishing: the one whose key the publisher already has wins
+        fake.ingresses.clear()
+        (tmp_path / "cache.json").unlink()
+        for _ in range(3):
+            fake.add("pi-cam", "lab")  # IN_4..IN_6 -> key4..key6
+        (tmp_path / "ingress_key.txt").write_text("STREAM_KEY=key5\n")
+        got = await _manager(fake, tmp_path).ensure("lab", "pi-cam", prune=True)
+        assert got["ingress_id"] == "IN_5" and sorted(fake.ingresses) == ["IN_5"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+"""Stepper position journal: restore after clean stops, crashes and torn writes."""
+from app.routers.stepper import StepperController
+from app.services.gpio import MockBackend
+from app.services.journal import PositionJournal
+from app.services.simulation import SimulatedGpio, VirtualClock
+
+
+def _controller(path, clock=None):
+    clock = clock or VirtualClock()
+    return StepperController(
+        pin_step=23, pin_dir=24, pin_enable=18, default_rpm=60,
+        gpio=SimulatedGpio(clock), clock=clock, journal=PositionJournal(str(path), fsync_interval_s=0.01),
+    )
+
+
+def test_clean_restart_restores_position_and_enable_without_homing(tmp_path):
+    path = tmp_path / "stepper.journal"
+    ctl = _controller(path)
+    ctl.enable()
+    ctl.step(1500)
+    ctl.wait_idle(5.0)
+    ctl.step(-300)
+    ctl.wait_idle(5.0)
+    assert ctl.journal.syncs < 20  # not one per step
+    ctl.journal.close()
+
+    gpio = MockBackend()
+    again = StepperController(pin_step=23, pin_dir=24, pin_enable=18, gpio=gpio, journal=PositionJournal(str(path)))
+    status = again.status()
+    assert status["position_steps"] == 1200 and status["enabled"] and gpio.levels[18] == 0
+    assert status["homing_required"] is False and status["journal"]["records"] == 1  # compacted
+
+
+def test_crash_mid_move_reports_the_possible_range(tmp_path):
+    path = tmp_path / "stepper.journal"
+    journal = PositionJournal(str(path), fsync_interval_s=3600)
+    journal.restore()
+    journal.set_position(100)
+    journal.begin_move(100, 600)
+    journal.progress(350)
+    journal.flush()
+    journal.progress(360)  # never flushed: the process dies here
+    with open(path, "ab") as f:
+        f.write(b"1234abcd {\"t\":\"pos\"")  # torn last write
+
+    restored = PositionJournal(str(path)).restore()
+    assert (restored.position, restored.min_position, restored.max_position) == (350, 350, 600)
+    assert not restored.consistent and restored.torn and restored.in_flight["target"] == 600
+
+    # The doubt survives another restart until the position is declared
+    again = PositionJournal(str(path))
+    assert not again.restore().consistent and again.homing_required
+    again.set_position(0)
+    assert PositionJournal(str(path)).restore().consistent
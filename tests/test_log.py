@@ -0,0 +1,60 @@
+"""Queue-backed logger: rate limiting, structured output, never blocking callers."""
+import io
+import json
+import threading
+import time
+
+from app.services import log as log_mod
+
+
+def _capture(monkeypatch, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    log_mod.shutdown()
+    buf = io.StringIO()
+    log_mod.configure(stream=buf)
+    return buf
+
+
+def test_repeats_are_folded_and_fields_rendered(monkeypatch):
+    buf = _capture(monkeypatch, LOG_FORMAT="json", LOG_RATE_LIMIT_S="0.2", LOG_LEVELS="valve=INFO")
+    log = log_mod.get_logger("valve")
+    try:
+        for _ in range(50):
+            log.error("write failed: %s", "EIO", extra={"fields": {"ch": "r"}})
+        log.error("write failed: %s", "EBUSY")
+        time.sleep(0.25)
+        log.error("write failed: %s", "EIO")
+        log.debug("hidden")
+    finally:
+        log_mod.shutdown()
+        log_mod.configure()
+    lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert [d["msg"] for d in lines] == ["write failed: EIO", "write failed: EBUSY", "write failed: EIO"]
+    assert lines[0]["subsystem"] == "valve" and lines[0]["ch"] == "r"
+    assert lines[2]["suppressed"] == 49
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    gate = threading.Event()
+
+    class SlowStream(io.StringIO):
+        def write(self, s):
+            gate.wait()
+            return super().write(s)
+
+    for key, value in {"LOG_QUEUE_SIZE": "4", "LOG_RATE_LIMIT_S": "0"}.items():
+        monkeypatch.setenv(key, value)
+    log_mod.shutdown()
+    log_mod.configure(stream=SlowStream())
+    log = log_mod.get_logger("camera")
+    try:
+        t0 = time.perf_counter()
+        for i in range(200):
+            log.warning("probe failed on /dev/video%d", i)
+        assert time.perf_counter() - t0 < 0.5
+        assert log_mod.stats()["dropped"] > 0
+    finally:
+        gate.set()
+        log_mod.shutdown()
+        log_mod.configure()
@@ -0,0 +1,66 @@
+"""Route timing middleware and the sampling profiler."""
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.metrics import Histogram, RouteMetrics, TimingMiddleware, sample_profile
+
+
+def test_middleware_groups_by_route_template():
+    metrics = RouteMetrics()
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for i in range(3):
+        assert client.get(f"/items/{i}").status_code == 200
+    client.get("/missing")
+
+    routes = metrics.snapshot()["routes"]
+    assert routes["GET /items/{item_id}"]["duration_ms"]["count"] == 3
+    assert routes["GET /items/{item_id}"]["status"] == {"2xx": 3}
+    assert routes["GET (unmatched)"]["status"] == {"4xx": 1}
+    assert metrics.snapshot()["in_flight"] == 0
+
+
+def test_reset_keeps_requests_that_are_still_open():
+    metrics = RouteMetrics()
+    metrics.begin("GET /stream")
+    metrics.reset()
+    assert metrics.snapshot()["routes"]["GET /stream"]["in_flight"] == 1
+    metrics.end("GET /stream", 200, 1.0, 2.0)
+    snap = metrics.snapshot()
+    assert snap["in_flight"] == 0 and snap["routes"]["GET /stream"]["in_flight"] == 0  # not -1
+
+
+def test_histogram_quantiles_are_bucket_bounds_capped_at_max():
+    h = Histogram()
+    for ms in (0.5, 3, 3, 40):
+        h.observe(ms)
+    assert h.quantile(0.5) == 5.0
+    assert h.quantile(1.0) == 40.0  # bucket bound 50 capped at the observed max
+
+
+def test_profile_sees_busy_thread():
+    stop = threading.Event()
+
+    def spin_for_profile():
+        while not stop.is_set():
+            sum(range(100))
+
+    t = threading.Thread(target=spin_for_profile, name="spinner")
+    t.start()
+    try:
+        result = sample_profile(seconds=0.2, hz=200)
+    finally:
+        stop.set()
+        t.join()
+    assert result["samples"] > 5
+    lines = [line for line in result["collapsed"].splitlines() if line.startswith("spinner;")]
+    assert any("spin_for_profile" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,79 @@
+"""Coordinated multi-axis moves (mock GPIO)."""
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import motion
+from app.services.gpio import MockBackend
+from app.services.motion import AxisConfig, MotionController, dda, parse_axes, tick_intervals
+
+
+def _wait(ctl, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while ctl.moving and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not ctl.moving
+
+
+def test_dda_spreads_every_axis_over_the_master_ticks():
+    ticks = list(dda({"a": 10, "b": 4, "c": 1}))
+    assert len(ticks) == 10 and all("a" in t for t in ticks)
+    assert sum("b" in t for t in ticks) == 4 and sum("c" in t for t in ticks) == 1
+    b_ticks = [i for i, t in enumerate(ticks) if "b" in t]
+    c_ticks = [i for i, t in enumerate(ticks) if "c" in t]
+    # Centred error: minor axes lead and trail the master by half their own interval
+    assert b_ticks == [1, 3, 6, 8] and c_ticks == [4]
+    assert parse_axes("pump_a:5:6:12, valve:20:21:-1:400") == [
+        AxisConfig("pump_a", 5, 6, 12, 200), AxisConfig("valve", 20, 21, None, 400),
+    ]
+    ramp = list(tick_intervals(100, 1000.0, 20000.0))
+    assert ramp[0] > ramp[50] == 0.001 and ramp[0] == ramp[-1]
+
+
+def test_coordinated_move_from_one_loop():
+    gpio = MockBackend()
+    ctl = MotionController(
+        [AxisConfig("a", 1, 2, 3), AxisConfig("b", 4, 5)], gpio=gpio, default_rpm=3000,
+    )
+    assert ctl.enabled == {"a": False, "b": True}
+    ctl.set_enabled(True)
+    plan = ctl.move({"a": 40, "b": -10})
+    assert plan["master"] == "a" and plan["ticks"] == 40
+    _wait(ctl)
+    assert ctl.position == {"a": 40, "b": -10}
+    rises = [(ts, pin) for ts, pin, level in gpio.history if level == 1 and pin in (1, 4)]
+    both = {ts for ts, pin in rises if pin == 4}
+    assert both <= {ts for ts, pin in rises if pin == 1}  # b's edges ride a's ticks (same write)
+    assert rises[0][0] <= min(both) and max(both) <= rises[-1][0]
+
+
+def test_motion_routes(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setenv("HARDWARE_WARMUP", "0")
+    ctl = MotionController([AxisConfig("pump", 1, 2), AxisConfig("valve", 4, 5)], gpio=MockBackend(), default_rpm=6000)
+    monkeypatch.setattr(motion, "_motion", ctl)
+    with TestClient(app) as client:
+        assert client.get("/api/stepper/nope/status").status_code == 404
+        r = client.post("/api/motion/move", json={"steps": {"pump": 20, "valve": 5}})
+        assert r.status_code == 200 and r.json()["plan"]["ticks"] == 20
+        _wait(ctl)
+        assert client.get("/api/stepper/valve/status").json()["position_steps"] == 5
+        assert client.post("/api/stepper/pump/step", params={"steps": -4}).status_code == 200
+        _wait(ctl)
+        assert client.get("/api/motion/status").json()["axes"]["pump"]["position_steps"] == 16
+        assert client.post("/api/motion/move", json={"steps": {"pump": 0}}).status_code == 400
+
+
+def test_bad_axes_config_is_503_and_abort_needs_no_controller(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setenv("HARDWARE_WARMUP", "0")
+    monkeypatch.setattr(motion, "_motion", None)
+    monkeypatch.setattr(motion, "STEPPER_AXES", "pump_a:5")
+    with TestClient(app) as client:
+        assert client.post("/api/motion/abort").status_code == 200
+        assert client.post("/api/stepper/pump_a/abort").status_code == 503
+        r = client.get("/api/motion/status")
+        assert r.status_code == 503 and "STEPPER_AXES" in r.json()["detail"]
+    assert motion._motion is None
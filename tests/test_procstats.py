@@ -0,0 +1,28 @@
+"""Per-service resource accounting from cgroup PID lists."""
+import os
+import time
+
+from app.services import procstats
+from app.services.procstats import ServiceAccounting
+
+
+def test_services_are_accounted_from_their_cgroup(tmp_path, monkeypatch):
+    (tmp_path / "cgroup.procs").write_text(f"{os.getpid()}\n999999999\n")  # second PID is long gone
+    monkeypatch.setattr(procstats, "_unit_cgroup", lambda unit: tmp_path if unit == "camera.service" else None)
+    accounting = ServiceAccounting({"camera": "camera.service", "missing": "missing.service"})
+
+    first = accounting.sample(now=100.0)
+    assert first["services"]["camera"]["cpu_percent"] is None  # no interval yet
+    t0 = time.thread_time()
+    while time.thread_time() - t0 < 0.2:  # burn ~0.2 s of CPU
+        pass
+    second = accounting.sample(now=101.0)
+
+    camera = second["services"]["camera"]
+    assert camera["processes"] == 1 and camera["threads"] >= 1 and camera["rss_mb"] > 0
+    assert camera["cpu_percent"] >= 15.0
+    # The same process is also the API; it is read once per sample, not diffed to zero
+    assert second["services"]["api"]["cpu_percent"] >= camera["cpu_percent"]
+    assert second["services"]["missing"]["processes"] == 0
+    assert os.getpid() in accounting._procs and 999999999 not in accounting._procs
+    assert all(nic != "lo" for nic in second["network"])
@@ -0,0 +1,57 @@
+"""Stepper moves on a virtual clock: long moves in milliseconds, exact timelines."""
+import time
+
+from app.routers.stepper import StepperController
+from app.services.motion import AxisConfig, MotionController
+from app.services.simulation import SimulatedGpio, VirtualClock, pulses, summarize
+
+
+def _stepper(clock, gpio, **kwargs):
+    return StepperController(pin_step=23, pin_dir=24, pin_enable=None, gpio=gpio, clock=clock, **kwargs)
+
+
+def test_long_move_runs_in_virtual_time():
+    clock = VirtualClock()
+    gpio = SimulatedGpio(clock)
+    ctl = _stepper(clock, gpio, default_rpm=60)
+    t0 = time.perf_counter()
+    ctl.step(10_000)
+    assert ctl.wait_idle(5.0)
+    ctl.step(-200)
+    assert ctl.wait_idle(5.0)
+    assert time.perf_counter() - t0 < 5.0  # 52 s of pulses at 60 RPM
+    summary = summarize(pulses(gpio.history, 23, 24))
+    assert (summary["forward"], summary["reverse"], summary["direction_changes"]) == (10_000, 200, 1)
+    assert summary["interval_us"]["min"] == summary["interval_us"]["max"] == 5000.0
+    assert summary["width_us"] == {"min": 2500.0, "max": 2500.0}
+    assert ctl.position == 9_800
+
+
+def test_abort_lands_within_the_pulse_it_interrupts():
+    clock = VirtualClock()
+    gpio = SimulatedGpio(clock)
+    ctl = _stepper(clock, gpio, default_rpm=60)  # 5 ms per step
+    clock.call_at(0.0125, ctl.abort)  # halfway through the third pulse's high phase
+    ctl.step(1000)
+    ctl.wait_idle(5.0)
+    train = pulses(gpio.history, 23, 24)
+    assert len(train) == ctl.position == 3
+    assert train[-1].fall_ns == 12_500_000  # STEP dropped at the abort instant
+    assert ctl.last_stop_latency == 0.0
+
+
+def test_coordinated_ramp_profile():
+    clock = VirtualClock()
+    gpio = SimulatedGpio(clock)
+    ctl = MotionController(
+        [AxisConfig("a", 1, 2), AxisConfig("b", 3, 4)], gpio=gpio, clock=clock, default_rpm=300, accel_sps2=10_000,
+    )
+    ctl.move({"a": 400, "b": 100})
+    ctl.wait_idle(5.0)
+    a = pulses(gpio.history, 1, 2)
+    intervals = [y.rise_ns - x.rise_ns for x, y in zip(a, a[1:])]
+    assert len(a) == 400 and len(pulses(gpio.history, 3, 4)) == 100
+    cruise = min(intervals)
+    assert cruise == 1_000_000  # 300 RPM * 200 / 60 = 1000 steps/s
+    assert intervals[0] > 3 * cruise and intervals[-1] > 3 * cruise  # ramps at both ends
+    assert intervals[:20] == sorted(intervals[:20], reverse=True)
@@ -0,0 +1,76 @@
+"""Fingerprinted, precompressed dashboard build and its HTTP caching."""
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services.static_assets import IMMUTABLE, StaticAssetServer, build_assets
+
+CSS = "body { background: url('/assets/img/bg.png'); }\n" + "/* padding */\n" * 40
+
+
+def _tree(root):
+    (root / "assets" / "styles").mkdir(parents=True)
+    (root / "assets" / "img").mkdir()
+    (root / "assets" / "styles" / "site.css").write_text(CSS)
+    (root / "assets" / "img" / "bg.png").write_bytes(b"\x89PNG fake")
+    (root / "index.html").write_text('<link rel="stylesheet" href="assets/styles/site.css">' + " " * 300)
+
+
+def _client(server):
+    app = FastAPI()
+
+    @app.get("/")
+    async def index(request: Request):
+        return server.index(request)
+
+    @app.get("/assets/{path:path}")
+    async def asset(path: str, request: Request):
+        return server.asset(path, request)
+
+    return TestClient(app)
+
+
+def test_build_fingerprints_and_rewrites(tmp_path):
+    _tree(tmp_path / "src")
+    out = tmp_path / "build"
+    manifest = build_assets(tmp_path / "src", out)
+    css = manifest["assets/styles/site.css"]
+    png = manifest["assets/img/bg.png"]
+    assert css.startswith("assets/styles/site.") and css != "assets/styles/site.css"
+    assert png in (out / css).read_text()  # CSS points at the hashed image
+    assert css in (out / "index.html").read_text()
+    assert gzip.decompress((out / (css + ".gz")).read_bytes()).decode() == (out / css).read_text()
+    assert not (out / (png + ".gz")).exists()  # binary assets are not compressed
+
+
+def test_serving_negotiates_gzip_and_revalidates(tmp_path):
+    _tree(tmp_path / "src")
+    out = tmp_path / "build"
+    manifest = build_assets(tmp_path / "src", out)
+    client = _client(StaticAssetServer(tmp_path / "src", build_dir=out))
+
+    hashed = client.get("/" + manifest["assets/styles/site.css"], headers={"Accept-Encoding": "gzip"})
+    assert hashed.status_code == 200
+    assert hashed.headers["content-encoding"] == "gzip"
+    assert hashed.headers["cache-control"] == IMMUTABLE
+    assert hashed.text.startswith("body")
+
+    page = client.get("/")
+    assert page.headers["cache-control"] == "no-cache"
+    again = client.get("/", headers={"If-None-Match": page.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+
+    assert client.get("/assets/styles/site.css").status_code == 200  # unhashed URL still works
+    # Percent-encoded so the client sends the ".." instead of normalising it away;
+    # the server decodes it back to "../index.html", which exists under src/.
+    assert client.get("/assets/%2e%2e/index.html").status_code == 404
+
+
+def test_unbuilt_tree_is_served_from_source(tmp_path):
+    _tree(tmp_path)
+    server = StaticAssetServer(tmp_path, build_dir=tmp_path / "missing")
+    resp = _client(server).get("/assets/styles/site.css", headers={"Accept-Encoding": "br, gzip"})
+    assert resp.status_code == 200 and resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["cache-control"] == "no-cache"
+    assert server.stats()["built"] is False
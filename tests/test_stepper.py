@@ -0,0 +1,49 @@
+"""Stepper emergency stop (mock GPIO, so no real pins are touched on a Pi)."""
+import time
+
+from app.routers.stepper import StepperController
+from app.services.gpio import MockBackend
+
+
+def _controller(rpm: float = 1.0) -> StepperController:
+    # 1 RPM at 200 steps/rev is a 300 ms pulse: long enough that only an
+    # abort that interrupts the pulse itself can meet the deadlines below.
+    return StepperController(pin_step=23, pin_dir=24, pin_enable=None, default_rpm=rpm, gpio=MockBackend())
+
+
+def test_abort_returns_immediately_and_stops_within_a_pulse():
+    ctl = _controller()
+    ctl.step(1000)
+    time.sleep(0.05)
+    t0 = time.perf_counter()
+    ctl.abort()
+    assert time.perf_counter() - t0 < 0.01
+    deadline = time.monotonic() + 0.1
+    while ctl.moving and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not ctl.moving
+    status = ctl.status()
+    assert status["position_steps"] == 1  # the interrupted pulse already rose
+    assert status["last_stop_latency_ms"] < 50
+
+
+def test_step_after_abort_starts_a_new_move():
+    ctl = _controller(rpm=600)
+    ctl.step(1000)
+    ctl.abort()
+    ctl.step(2)
+    deadline = time.monotonic() + 1.0
+    while ctl.moving and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not ctl.moving
+    assert ctl.status()["position_steps"] >= 2
+
+
+def test_abort_before_first_use_does_not_create_the_controller(monkeypatch):
+    import asyncio
+
+    from app.routers import stepper as stepper_mod
+
+    monkeypatch.setattr(stepper_mod, "_controller", None)
+    assert asyncio.run(stepper_mod.api_abort()) == {"result": "aborted"}
+    assert stepper_mod._controller is None  # no pins claimed, no journal replayed on the event loop
@@ -0,0 +1,76 @@
+"""Stream admission, slow-client deadline and per-client delivery metrics."""
+import asyncio
+
+from app.services.streaming import DeadlineStreamingResponse, StreamRegistry
+
+
+def test_admission_cap_and_skip_accounting():
+    registry = StreamRegistry(max_streams=1)
+    client = registry.admit("main", "10.0.0.2")
+    assert client is not None and registry.admit("main") is None and registry.rejected == 1
+
+    for seq in (1, 2, 5, 9):  # a slow viewer got every frame up to 2, then only the newest
+        client.delivered(seq, frame_ts=0.0, size=1000, send_s=0.01)
+    status = client.status()
+    assert status["frames_sent"] == 4 and status["frames_skipped"] == 5
+
+    registry.release(client)
+    assert registry.admit("main") is not None
+
+
+def test_stalled_reader_is_closed_and_releases_its_slot():
+    registry = StreamRegistry(max_streams=4)
+    client = registry.admit("main")
+    closed = []
+
+    async def frames():
+        try:
+            while True:
+                yield b"frame"
+        finally:
+            closed.append(True)
+
+    async def run():
+        sent = []
+        stall = asyncio.Event()
+
+        async def send(message):
+            if len(sent) >= 3:
+                await stall.wait()  # the viewer stopped reading; the socket never drains
+            sent.append(message)
+
+        async def receive():
+            await stall.wait()
+
+        response = DeadlineStreamingResponse(frames(), client=client, registry=registry, deadline_s=0.05)
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        await asyncio.wait_for(response(scope, receive, send), 2.0)
+        return sent
+
+    sent = asyncio.run(run())
+    assert sent[0]["type"] == "http.response.start" and len(sent) == 3
+    assert registry.deadline_closed == 1 and closed == [True]
+    assert registry.clients() == []
+
+
+def test_viewers_wait_on_the_loop_not_the_camera_pool():
+    import threading
+
+    from app.routers.camera import CameraController, StreamingOutput
+
+    camera = CameraController.__new__(CameraController)  # no hardware probing
+    camera.output = StreamingOutput()
+    camera.output.write(b"first", 1.0)
+
+    async def run():
+        viewers = [asyncio.ensure_future(camera.next_frame(1)) for _ in range(64)]
+        await asyncio.sleep(0.01)
+        assert threading.active_count() < 64 and not any(v.done() for v in viewers)
+        threading.Timer(0.02, camera.output.write, (b"second", 2.0)).start()
+        got = await asyncio.wait_for(asyncio.gather(*viewers), 1.0)
+        assert set(got) == {(2, 2.0, b"second")}
+        assert await camera.next_frame(2, timeout=0.01) is None  # nothing newer: times out
+        assert await camera.next_frame(0) == (2, 2.0, b"second")  # behind: newest at once
+        assert camera.output._waiters == {}
+
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+"""CPU usage from /proc/stat deltas and the kept-open thermal sensor."""
+from app.services.sysmon import CpuUsage, ThermalSensor
+
+STAT = """cpu  {0} 0 0 {1} 0 0 0 0 0 0
+cpu0 {0} 0 0 {1} 0 0 0 0 0 0
+cpu1 0 0 0 {2} 0 0 0 0 0 0
+intr 1 2 3
+"""
+
+
+def test_cpu_usage_is_the_delta_between_ticks(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text(STAT.format(100, 900, 1000))
+    cpu = CpuUsage(str(stat))
+    assert cpu.tick() == 10.0  # first tick: average since boot
+    stat.write_text(STAT.format(175, 925, 1100))  # +75 busy of +100 on cpu0, idle cpu1
+    assert cpu.tick() == 75.0
+    assert cpu.per_core == [75.0, 0.0]
+    assert cpu.read() == 75.0  # served from the last tick
+
+
+def test_thermal_source_is_probed_once_and_kept_open(tmp_path):
+    (tmp_path / "thermal_zone0").mkdir()
+    (tmp_path / "thermal_zone0" / "temp").write_text("garbage\n")
+    zone = tmp_path / "thermal_zone1" / "temp"
+    zone.parent.mkdir()
+    zone.write_text("48312\n")
+    sensor = ThermalSensor(tmp_path)
+    assert sensor.source == "sysfs:thermal_zone1" and sensor.read() == 48.312
+    zone.write_text("51000\n")
+    assert sensor.read() == 51.0
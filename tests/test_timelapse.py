@@ -0,0 +1,91 @@
+"""Segmented time-lapse archive: batching, recovery, retention and queries."""
+import os
+import time
+
+from app.services import timelapse
+from app.services.timelapse import RECORD, TimelapseArchive
+
+
+def _jpeg(n: int) -> bytes:
+    return b"\xff\xd8" + bytes([n % 256]) * 100 + b"\xff\xd9"
+
+
+def test_interval_batching_and_scrub(tmp_path):
+    archive = TimelapseArchive(tmp_path / "main", interval_s=10.0, batch_bytes=1 << 20)
+    for i in range(100):  # 1 fps for 100 s -> 10 frames kept
+        archive.tap(_jpeg(i), 1000.0 + i)
+    assert archive.status()["pending_frames"] == 10
+    assert archive.frame_at(1015.0) == (1010.0, _jpeg(10))  # served from the pending batch
+
+    archive.flush()
+    assert archive.batches == 1 and len(archive.segments) == 1
+    assert archive.timestamps(1020.0, 1050.0) == [1020.0, 1030.0, 1040.0, 1050.0]
+    assert archive.timestamps(step=25.0) == [1000.0, 1030.0, 1060.0, 1090.0]
+    assert archive.frame_at(1049.9) == (1040.0, _jpeg(40))
+    assert archive.frame_at(0.0) == (1000.0, _jpeg(0))
+
+
+def test_reload_trims_a_torn_batch(tmp_path):
+    archive = TimelapseArchive(tmp_path / "main", interval_s=1.0)
+    for i in range(3):
+        archive.tap(_jpeg(i), 1000.0 + i)
+    archive.flush()
+    segment = archive.segments[0]
+    with open(segment.data_path, "ab") as f:  # data of a batch whose index never landed
+        f.write(_jpeg(99))
+    with open(segment.index_path, "ab") as f:
+        f.write(RECORD.pack(1003.0, segment.size, 5000)[:10])
+
+    reloaded = TimelapseArchive(tmp_path / "main")
+    assert reloaded.timestamps() == [1000.0, 1001.0, 1002.0]
+    assert os.path.getsize(segment.data_path) == segment.size
+    assert reloaded.frame_at(1002.0)[1] == _jpeg(2)
+
+
+def test_retention_drops_oldest_segments(tmp_path):
+    base = time.time() - 2 * 86400 - 100
+    archive = TimelapseArchive(tmp_path / "main", interval_s=1.0, segment_s=100.0, retention_days=1.5)
+    for day in range(3):
+        archive.tap(_jpeg(day), base + day * 86400)
+        archive.flush()
+    assert len(archive.segments) == 2  # one segment per day; the first is over 1.5 days old
+    assert archive.timestamps()[0] == base + 86400
+    assert len(list((tmp_path / "main").glob("*.mjpg"))) == 2
+
+
+def test_failed_index_write_does_not_shift_later_frames(tmp_path, monkeypatch):
+    archive = TimelapseArchive(tmp_path / "main", interval_s=1.0)
+    archive.tap(_jpeg(0), 1000.0)
+    archive.flush()
+
+    real, failed = timelapse._write_at, []
+
+    def flaky(path, data, offset):
+        if path.suffix == ".idx" and not failed:
+            failed.append(path)
+            real(path, data[:5], offset)  # a torn index record, then ENOSPC
+            raise OSError(28, "No space left on device")
+        real(path, data, offset)
+
+    monkeypatch.setattr(timelapse, "_write_at", flaky)
+    archive.tap(_jpeg(1), 1001.0)
+    assert archive.flush() is False  # data landed, index did not
+    archive.tap(_jpeg(2), 1002.0)
+    assert archive.flush() is True
+
+    for reader in (archive, TimelapseArchive(tmp_path / "main")):
+        assert reader.timestamps() == [1000.0, 1001.0, 1002.0]
+        assert [reader.frame_at(t)[1] for t in (1000.0, 1001.0, 1002.0)] == [_jpeg(0), _jpeg(1), _jpeg(2)]
+
+
+def test_segments_stay_within_32_bit_offsets(tmp_path):
+    archive = TimelapseArchive(tmp_path / "main", interval_s=1.0, segment_bytes=8 << 30)
+    assert archive.segment_bytes == timelapse.MAX_SEGMENT_BYTES
+    t0 = time.time()
+    archive.tap(_jpeg(1), t0)
+    archive.flush()
+    archive.segments[-1].size = timelapse.MAX_SEGMENT_BYTES - 50  # as if nearly full
+    archive.tap(_jpeg(2), t0 + 1)
+    archive.flush()
+    assert len(archive.segments) == 2  # the frame would not fit below 4 GiB: a new segment
+    assert archive.segments[-1].entries[0].offset == 0
@@ -0,0 +1,57 @@
+"""Valve stop ordering: no queued open/close may reach the Arduino after 's'."""
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.routers import valve
+from app.services.executors import get_executor
+
+
+class FakeSerial:
+    is_open = True
+
+    def __init__(self):
+        self.written = []
+        self.in_write = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, data):
+        if data != b"s" and not self.release.is_set():
+            self.in_write.set()
+            self.release.wait(2.0)
+        self.written.append(data)
+
+    def flush(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+
+def test_stop_waits_for_the_write_in_flight_and_drops_the_queue(monkeypatch):
+    ser = FakeSerial()
+    monkeypatch.setattr(valve, "_serial_connection", ser)
+    valve._submit_write("r", "open")  # passes its generation check, then blocks in write
+    assert ser.in_write.wait(2.0)
+    valve._submit_write("l", "close")  # still queued
+    stopper = threading.Thread(target=valve._send_stop)
+    stopper.start()
+    time.sleep(0.05)
+    assert ser.written == []  # the stop is waiting for the write lock
+    ser.release.set()
+    stopper.join(2.0)
+    get_executor("serial").submit(lambda: None).result(2.0)
+    assert ser.written == [b"r", b"s"]
+
+
+def test_stop_never_opens_the_port(monkeypatch):
+    monkeypatch.setenv("HARDWARE_WARMUP", "0")
+    monkeypatch.setattr(valve, "_serial_connection", None)
+    opened = []
+    monkeypatch.setattr(valve, "_open_serial_connection", lambda: opened.append(1))
+    from app.main import app
+
+    with TestClient(app) as client:
+        assert client.post("/api/valve/stop").status_code == 503
+    assert opened == []
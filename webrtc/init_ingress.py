@@ -2,6 +2,12 @@
 """Create or reuse a LiveKit RTMP ingress and write stream key to file.
 Run this at boot (systemd ExecStartPre) so your Pi publisher service can read the key.
 
+The ingress for --name in --room is reused when LiveKit already has one
+(validated against the local cache in INGRESS_CACHE_PATH, else found by
+listing the room); a new one is created only when there is none. --prune
+deletes duplicates left behind by older versions of this script, keeping the
+one being published to or whose key is already in --out.
+
 Usage:
   LIVEKIT_HOST=https://livekit.example.com \
   LIVEKIT_API_KEY=xxx LIVEKIT_API_SECRET=yyy \
@@ -9,45 +15,57 @@ Usage:
 """
 from __future__ import annotations
 import argparse
+import asyncio
 import os
 import sys
 from pathlib import Path
 
-try:
-    from livekit import api as lk  # type: ignore
-except Exception as e:
-    print(f"livekit-api not installed: {e}", file=sys.stderr)
-    sys.exit(1)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.ingress import IngressManager, IngressUnavailable  # noqa: E402
 
 HOST = os.getenv("LIVEKIT_HOST", "")
 KEY = os.getenv("LIVEKIT_API_KEY", "")
 SECRET = os.getenv("LIVEKIT_API_SECRET", "")
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--room", default="plastination")
-parser.add_argument("--name", default="pi-cam")
-parser.add_argument("--out", default="webrtc/ingress_key.txt")
-args = parser.parse_args()
-
-if not HOST or not KEY or not SECRET:
-    print("Missing LIVEKIT_HOST / LIVEKIT_API_KEY / LIVEKIT_API_SECRET", file=sys.stderr)
-    sys.exit(2)
-
-client = lk.ApiClient(host=HOST, api_key=KEY, api_secret=SECRET)
-
-# Simple approach: always create a new ingress (could be optimized to reuse)
-req = lk.CreateIngressRequest(
-    input_type=lk.IngressInput.RTMP_INPUT,
-    name=args.name,
-    room_name=args.room,
-)
-try:
-    resp = client.ingress.create_ingress(req)
-except Exception as e:
-    print(f"Failed to create ingress: {e}", file=sys.stderr)
-    sys.exit(3)
-
-out_path = Path(args.out)
-out_path.parent.mkdir(parents=True, exist_ok=True)
-out_path.write_text(f"RTMP_URL={resp.rtmp.url}\nSTREAM_KEY={resp.stream_key}\nROOM={args.room}\nINGRESS_ID={resp.ingress_id}\n")
-print(f"Ingress created. Stream key written to {out_path}")
+
+async def _ensure(room: str, name: str, prune: bool, key_file: str) -> dict:
+    manager = IngressManager(HOST, KEY, SECRET, key_file=key_file)
+    try:
+        return await manager.ensure(room, name, prune=prune)
+    finally:
+        await manager.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--room", default="plastination")
+    parser.add_argument("--name", default="pi-cam")
+    parser.add_argument("--out", default="webrtc/ingress_key.txt")
+    parser.add_argument("--prune", action="store_true", help="delete duplicate ingresses with the same name and room")
+    args = parser.parse_args()
+
+    if not HOST or not KEY or not SECRET:
+        print("Missing LIVEKIT_HOST / LIVEKIT_API_KEY / LIVEKIT_API_SECRET", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        ingress = asyncio.run(_ensure(args.room, args.name, args.prune, args.out))
+    except IngressUnavailable as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Failed to get ingress: {e}", file=sys.stderr)
+        sys.exit(3)
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(
+        f"RTMP_URL={ingress['rtmp_url']}\nSTREAM_KEY={ingress['stream_key']}\nROOM={args.room}\nINGRESS_ID={ingress['ingress_id']}\n"
+    )
+    verb = "created" if ingress["source"] == "created" else f"reused ({ingress['source']})"
+    print(f"Ingress {verb}. Stream key written to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ LOG_FILE="$LOG_DIR/publisher.log"
 CAMERA_WIDTH=${CAMERA_WIDTH:-1280}
 CAMERA_HEIGHT=${CAMERA_HEIGHT:-720}
 CAMERA_FPS=${CAMERA_FPS:-30}
+FFMPEG_VIDEO_BITRATE=${FFMPEG_VIDEO_BITRATE:-2500}  # kbps
+# Written by the API's thermal/load governor; re-read before every launch.
+# Values from it are validated before use, but keep it out of shared dirs like /tmp.
+GOVERNOR_STATE_FILE=${GOVERNOR_STATE_FILE:-$ROOT_DIR/data/governor.env}
 
 # Read from file if present
 if [[ -f "$KEY_FILE" ]]; then
@@ -42,11 +46,52 @@ fi
 BACKOFF=2
 MAX_BACKOFF=30
 
+governor_level() {
+  sed -n 's/^GOVERNOR_LEVEL=\([a-z]*\)$/\1/p' "$GOVERNOR_STATE_FILE" 2>/dev/null | head -n1 || true
+}
+
+# Restart the running pipeline when the governor changes level, so new
+# frame-rate/bitrate limits apply within GOVERNOR_POLL_S seconds.
+watch_governor() {
+  local launched="$1" parent="$2" now
+  while sleep "${GOVERNOR_POLL_S:-10}"; do
+    now=$(governor_level)
+    if [[ -n "$now" && "$now" != "$launched" ]]; then
+      echo "Governor level $launched -> $now; restarting pipeline" >>"$LOG_FILE"
+      pkill -TERM -P "$parent" -x 'rpicam-vid|libcamera-vid|ffmpeg' || true
+      return
+    fi
+  done
+}
+
 echo "Starting Pi RTMP publisher -> $TARGET" | tee -a "$LOG_FILE"
 
 while true; do
   START_TS=$(date -Is)
-  echo "[$START_TS] Launching pipeline..." | tee -a "$LOG_FILE"
+  BITRATE_KBPS=$FFMPEG_VIDEO_BITRATE
+  FPS=$CAMERA_FPS
+  GOVERNOR_LEVEL=off
+  if [[ -f "$GOVERNOR_STATE_FILE" ]]; then
+    GOVERNOR_LEVEL=$(governor_level)
+    GOV_BITRATE=$(sed -n 's/^GOVERNOR_BITRATE_KBPS=//p' "$GOVERNOR_STATE_FILE" | head -n1)
+    GOV_FPS_FACTOR=$(sed -n 's/^GOVERNOR_FPS_FACTOR=//p' "$GOVERNOR_STATE_FILE" | head -n1)
+    # Never let file contents reach $(( )) or awk unchecked; ignore anything malformed
+    if [[ "$GOV_BITRATE" =~ ^[1-9][0-9]{0,5}$ ]]; then
+      BITRATE_KBPS=$GOV_BITRATE
+    elif [[ -n "$GOV_BITRATE" ]]; then
+      echo "Ignoring invalid GOVERNOR_BITRATE_KBPS in $GOVERNOR_STATE_FILE" >>"$LOG_FILE"
+    fi
+    if [[ -n "$GOV_FPS_FACTOR" && ! "$GOV_FPS_FACTOR" =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
+      echo "Ignoring invalid GOVERNOR_FPS_FACTOR in $GOVERNOR_STATE_FILE" >>"$LOG_FILE"
+      GOV_FPS_FACTOR=
+    fi
+    if [[ -n "$GOV_FPS_FACTOR" ]]; then
+      FPS=$(awk -v f="$CAMERA_FPS" -v k="$GOV_FPS_FACTOR" 'BEGIN { v = int(f * k); print (v < 1 ? 1 : v) }')
+    fi
+  fi
+  echo "[$START_TS] Launching pipeline (governor=${GOVERNOR_LEVEL:-off} ${FPS}fps ${BITRATE_KBPS}kbps)..." | tee -a "$LOG_FILE"
+  watch_governor "$GOVERNOR_LEVEL" $$ &
+  WATCHER=$!
   # Try rpicam-vid first (new naming), fall back to libcamera-vid
   if command -v rpicam-vid >/dev/null 2>&1; then
     # rpicam produces H.264 Annex B. We wrap to FLV via ffmpeg.
@@ -55,7 +100,8 @@ while true; do
     rpicam-vid \
       -t 0 \
       --width "$CAMERA_WIDTH" --height "$CAMERA_HEIGHT" \
-      --framerate "$CAMERA_FPS" \
+      --framerate "$FPS" \
+      --bitrate $(( BITRATE_KBPS * 1000 )) \
       --inline \
       --codec h264 \
       -o - \
@@ -70,7 +116,8 @@ while true; do
     libcamera-vid \
       -t 0 \
       --width "$CAMERA_WIDTH" --height "$CAMERA_HEIGHT" \
-      --framerate "$CAMERA_FPS" \
+      --framerate "$FPS" \
+      --bitrate $(( BITRATE_KBPS * 1000 )) \
       --inline \
       --codec h264 \
       -o - \
@@ -83,14 +130,18 @@ while true; do
     # Fallback: capture via v4l2 (USB UVC cams)
     set +e
     ffmpeg -loglevel warning -f v4l2 -input_format mjpeg \
-      -video_size ${CAMERA_WIDTH}x${CAMERA_HEIGHT} -framerate "$CAMERA_FPS" \
+      -video_size ${CAMERA_WIDTH}x${CAMERA_HEIGHT} -framerate "$FPS" \
       -i /dev/video0 \
-      -c:v libx264 -preset veryfast -tune zerolatency -b:v 2500k \
+      -c:v libx264 -preset veryfast -tune zerolatency -b:v "${BITRATE_KBPS}k" \
       -pix_fmt yuv420p -g 60 -f flv "$TARGET" 2>>"$LOG_FILE"
     RC=$?
     set -e
   fi
+  kill "$WATCHER" 2>/dev/null || true
   echo "Pipeline exited rc=$RC" | tee -a "$LOG_FILE"
+  if [[ -f "$GOVERNOR_STATE_FILE" && "$(governor_level)" != "$GOVERNOR_LEVEL" ]]; then
+    continue  # restarted by the governor, not a failure
+  fi
   sleep "$BACKOFF"
   BACKOFF=$(( BACKOFF < MAX_BACKOFF ? BACKOFF * 2 : MAX_BACKOFF ))
 